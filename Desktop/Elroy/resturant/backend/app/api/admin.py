@@ -1,17 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List
 from app.database import get_db
 from app.models.order import Order, OrderItem, OrderStatus, OrderItemStatus
 from app.models.user import User
 from app.schemas.order import OrderResponse, OrderStatusUpdate, OrderItemStatusUpdate, OrderItemResponse
 from app.auth import get_current_user
+from app.api.orders import order_with_items
 from datetime import datetime
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
 
-def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
     """Verify user is admin (you can add admin role logic here)"""
     # For now, we'll allow any authenticated user to be admin
     # In production, you should check for admin role
@@ -19,35 +22,36 @@ def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
 
 
 @router.get("/orders", response_model=List[OrderResponse])
-def get_all_orders(
+async def get_all_orders(
     current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all orders for admin"""
-    orders = db.query(Order).order_by(Order.created_at.desc()).all()
-    return orders
+    result = await db.execute(order_with_items().order_by(Order.created_at.desc()))
+    return result.scalars().all()
 
 
 @router.get("/orders/pending", response_model=List[OrderResponse])
-def get_pending_orders(
+async def get_pending_orders(
     current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all pending orders"""
-    orders = db.query(Order).filter(
+    result = await db.execute(order_with_items().where(
         Order.status == OrderStatus.PENDING
-    ).order_by(Order.created_at.asc()).all()
-    return orders
+    ).order_by(Order.created_at.asc()))
+    return result.scalars().all()
 
 
 @router.get("/orders/{order_id}", response_model=OrderResponse)
-def get_order_details(
+async def get_order_details(
     order_id: int,
     current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get specific order details for admin"""
-    order = db.query(Order).filter(Order.id == order_id).first()
+    result = await db.execute(order_with_items().where(Order.id == order_id))
+    order = result.scalars().first()
     
     if not order:
         raise HTTPException(
@@ -59,14 +63,15 @@ def get_order_details(
 
 
 @router.patch("/orders/{order_id}/status", response_model=OrderResponse)
-def update_order_status(
+async def update_order_status(
     order_id: int,
     status_update: OrderStatusUpdate,
     current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update order status"""
-    order = db.query(Order).filter(Order.id == order_id).first()
+    result = await db.execute(order_with_items().where(Order.id == order_id))
+    order = result.scalars().first()
     
     if not order:
         raise HTTPException(
@@ -78,25 +83,25 @@ def update_order_status(
     order.admin_notes = status_update.admin_notes
     order.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(order)
+    await db.commit()
     
     return order
 
 
 @router.patch("/orders/{order_id}/items/{item_id}/status", response_model=OrderItemResponse)
-def update_order_item_status(
+async def update_order_item_status(
     order_id: int,
     item_id: int,
     status_update: OrderItemStatusUpdate,
     current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update specific order item status"""
-    order_item = db.query(OrderItem).filter(
+    result = await db.execute(select(OrderItem).where(
         OrderItem.id == item_id,
         OrderItem.order_id == order_id
-    ).first()
+    ).options(selectinload(OrderItem.menu_item)))
+    order_item = result.scalars().first()
     
     if not order_item:
         raise HTTPException(
@@ -109,9 +114,10 @@ def update_order_item_status(
     order_item.updated_at = datetime.utcnow()
     
     # Update order status based on item statuses
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await db.get(Order, order_id)
     if order:
-        all_items = db.query(OrderItem).filter(OrderItem.order_id == order_id).all()
+        result = await db.execute(select(OrderItem).where(OrderItem.order_id == order_id))
+        all_items = result.scalars().all()
         
         # Check if all items are ready
         if all(item.status == OrderItemStatus.READY for item in all_items):
@@ -125,22 +131,22 @@ def update_order_item_status(
         
         order.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(order_item)
+    await db.commit()
     
     return order_item
 
 
 @router.get("/orders/{order_id}/items", response_model=List[OrderItemResponse])
-def get_order_items(
+async def get_order_items(
     order_id: int,
     current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all items for a specific order"""
-    order_items = db.query(OrderItem).filter(
+    result = await db.execute(select(OrderItem).where(
         OrderItem.order_id == order_id
-    ).all()
+    ).options(selectinload(OrderItem.menu_item)))
+    order_items = result.scalars().all()
     
     if not order_items:
         raise HTTPException(
@@ -152,13 +158,13 @@ def get_order_items(
 
 
 @router.post("/orders/{order_id}/accept")
-def accept_order(
+async def accept_order(
     order_id: int,
     current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Accept an order and all its items"""
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await db.get(Order, order_id)
     
     if not order:
         raise HTTPException(
@@ -177,24 +183,25 @@ def accept_order(
     order.updated_at = datetime.utcnow()
     
     # Update all items to accepted
-    order_items = db.query(OrderItem).filter(OrderItem.order_id == order_id).all()
+    result = await db.execute(select(OrderItem).where(OrderItem.order_id == order_id))
+    order_items = result.scalars().all()
     for item in order_items:
         item.status = OrderItemStatus.ACCEPTED
         item.updated_at = datetime.utcnow()
     
-    db.commit()
+    await db.commit()
     
     return {"message": "Order accepted successfully"}
 
 
 @router.post("/orders/{order_id}/ready")
-def mark_order_ready(
+async def mark_order_ready(
     order_id: int,
     current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Mark order as ready for delivery"""
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await db.get(Order, order_id)
     
     if not order:
         raise HTTPException(
@@ -213,25 +220,26 @@ def mark_order_ready(
     order.updated_at = datetime.utcnow()
     
     # Update all items to ready
-    order_items = db.query(OrderItem).filter(OrderItem.order_id == order_id).all()
+    result = await db.execute(select(OrderItem).where(OrderItem.order_id == order_id))
+    order_items = result.scalars().all()
     for item in order_items:
         if item.status != OrderItemStatus.CANCELLED:
             item.status = OrderItemStatus.READY
             item.updated_at = datetime.utcnow()
     
-    db.commit()
+    await db.commit()
     
     return {"message": "Order marked as ready"}
 
 
 @router.post("/orders/{order_id}/deliver")
-def deliver_order(
+async def deliver_order(
     order_id: int,
     current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Mark order as delivered"""
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await db.get(Order, order_id)
     
     if not order:
         raise HTTPException(
@@ -250,12 +258,13 @@ def deliver_order(
     order.updated_at = datetime.utcnow()
     
     # Update all items to delivered
-    order_items = db.query(OrderItem).filter(OrderItem.order_id == order_id).all()
+    result = await db.execute(select(OrderItem).where(OrderItem.order_id == order_id))
+    order_items = result.scalars().all()
     for item in order_items:
         if item.status != OrderItemStatus.CANCELLED:
             item.status = OrderItemStatus.DELIVERED
             item.updated_at = datetime.utcnow()
     
-    db.commit()
+    await db.commit()
     
     return {"message": "Order delivered successfully"} 
\ No newline at end of file
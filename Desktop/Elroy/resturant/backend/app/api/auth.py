@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import PhoneLogin, OTPVerify, UserResponse, Token
@@ -11,12 +12,13 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
 @router.post("/phone-login")
-def phone_login(phone_data: PhoneLogin, db: Session = Depends(get_db)):
+async def phone_login(phone_data: PhoneLogin, db: AsyncSession = Depends(get_db)):
     """Send OTP for login/registration - creates user if doesn't exist"""
     phone = phone_data.phone
     
     # Check if user exists
-    user = db.query(User).filter(User.phone == phone).first()
+    result = await db.execute(select(User).where(User.phone == phone))
+    user = result.scalars().first()
     
     if not user:
         # Create new user if doesn't exist
@@ -26,8 +28,8 @@ def phone_login(phone_data: PhoneLogin, db: Session = Depends(get_db)):
             is_verified=False
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
         print(f"🆕 Created new user with phone: {phone}")
     
     # Generate OTP
@@ -37,7 +39,7 @@ def phone_login(phone_data: PhoneLogin, db: Session = Depends(get_db)):
     # Update user with OTP
     user.otp = otp
     user.otp_expires_at = otp_expires_at
-    db.commit()
+    await db.commit()
     
     # Print OTP for development
     print(f"📱 OTP for {phone}: {otp}")
@@ -53,9 +55,10 @@ def phone_login(phone_data: PhoneLogin, db: Session = Depends(get_db)):
 
 
 @router.post("/verify-otp", response_model=Token)
-def verify_otp(otp_data: OTPVerify, db: Session = Depends(get_db)):
+async def verify_otp(otp_data: OTPVerify, db: AsyncSession = Depends(get_db)):
     """Verify OTP and return access token"""
-    user = db.query(User).filter(User.phone == otp_data.phone).first()
+    result = await db.execute(select(User).where(User.phone == otp_data.phone))
+    user = result.scalars().first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -79,7 +82,8 @@ def verify_otp(otp_data: OTPVerify, db: Session = Depends(get_db)):
     user.is_verified = True
     user.otp = None
     user.otp_expires_at = None
-    db.commit()
+    await db.commit()
+    await db.refresh(user)
     
     # Create access token
     access_token = create_access_token(data={"sub": user.phone})
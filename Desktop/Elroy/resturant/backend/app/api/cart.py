@@ -1,5 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from app.database import get_db
 from app.models.user import User
 from app.models.cart import Cart, CartItem
@@ -11,42 +13,44 @@ from app.auth import get_current_user
 router = APIRouter(prefix="/cart", tags=["Cart"])
 
 
-def get_or_create_cart(user: User, db: Session) -> Cart:
-    """Get existing cart or create new one for user"""
-    cart = db.query(Cart).filter(Cart.user_id == user.id).first()
+async def get_or_create_cart(user: User, db: AsyncSession) -> Cart:
+    """Get existing cart or create new one for user.
+
+    The cart, its items and their menu items come back from one joined
+    query, whatever the number of items. populate_existing reloads items
+    changed since the cart was last read in this session.
+    """
+    query = (
+        select(Cart)
+        .where(Cart.user_id == user.id)
+        .options(joinedload(Cart.items).joinedload(CartItem.menu_item))
+        .execution_options(populate_existing=True)
+    )
+    cart = (await db.execute(query)).unique().scalars().first()
     if not cart:
-        cart = Cart(user_id=user.id)
-        db.add(cart)
-        db.commit()
-        db.refresh(cart)
+        db.add(Cart(user_id=user.id))
+        await db.commit()
+        cart = (await db.execute(query)).unique().scalars().first()
     return cart
 
 
-@router.get("/", response_model=CartResponse)
-def get_cart(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get user's cart"""
-    cart = get_or_create_cart(current_user, db)
-    
-    # Calculate totals
-    total_items = sum(item.quantity for item in cart.items)
-    subtotal = sum(item.quantity * item.price_at_time for item in cart.items)
-    
-    # Convert to response model
+def cart_response(cart: Cart) -> CartResponse:
+    """Build the cart response and its totals in one pass over the loaded items"""
     cart_items = []
+    total_items = 0
+    subtotal = 0
     for item in cart.items:
-        # Get menu item details
-        menu_item = db.query(MenuItem).filter(MenuItem.id == item.menu_item_id).first()
-        menu_item_response = MenuItemResponse.from_orm(menu_item) if menu_item else None
-        
-        cart_item_response = CartItemResponse(
+        total_items += item.quantity
+        subtotal += item.quantity * item.price_at_time
+        menu_item = MenuItemResponse.from_orm(item.menu_item) if item.menu_item else None
+        cart_items.append(CartItemResponse(
             id=item.id,
             menu_item_id=item.menu_item_id,
             quantity=item.quantity,
             price_at_time=item.price_at_time,
             created_at=item.created_at,
-            menu_item=menu_item_response.dict() if menu_item_response else None
-        )
-        cart_items.append(cart_item_response)
+            menu_item=menu_item.dict() if menu_item else None
+        ))
     
     return CartResponse(
         id=cart.id,
@@ -59,18 +63,25 @@ def get_cart(current_user: User = Depends(get_current_user), db: Session = Depen
     )
 
 
+@router.get("/", response_model=CartResponse)
+async def get_cart(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Get user's cart"""
+    return cart_response(await get_or_create_cart(current_user, db))
+
+
 @router.post("/add", response_model=CartResponse)
-def add_to_cart(
+async def add_to_cart(
     item_data: CartItemCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Add item to cart"""
     # Check if menu item exists and is available
-    menu_item = db.query(MenuItem).filter(
+    result = await db.execute(select(MenuItem).where(
         MenuItem.id == item_data.menu_item_id,
         MenuItem.is_available == True
-    ).first()
+    ))
+    menu_item = result.scalars().first()
     
     if not menu_item:
         raise HTTPException(
@@ -78,13 +89,12 @@ def add_to_cart(
             detail="Menu item not found or not available"
         )
     
-    cart = get_or_create_cart(current_user, db)
+    cart = await get_or_create_cart(current_user, db)
     
     # Check if item already exists in cart
-    existing_item = db.query(CartItem).filter(
-        CartItem.cart_id == cart.id,
-        CartItem.menu_item_id == item_data.menu_item_id
-    ).first()
+    existing_item = next(
+        (item for item in cart.items if item.menu_item_id == item_data.menu_item_id), None
+    )
     
     if existing_item:
         # Update quantity
@@ -100,27 +110,24 @@ def add_to_cart(
         )
         db.add(cart_item)
     
-    db.commit()
-    db.refresh(cart)
+    await db.commit()
     
-    # Return updated cart using the same logic as get_cart
-    return get_cart(current_user, db)
+    # Reload the cart in one query; the statements per add do not grow
+    # with the cart
+    return cart_response(await get_or_create_cart(current_user, db))
 
 
 @router.put("/update/{item_id}")
-def update_cart_item(
+async def update_cart_item(
     item_id: int,
     quantity: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update cart item quantity"""
-    cart = get_or_create_cart(current_user, db)
+    cart = await get_or_create_cart(current_user, db)
     
-    cart_item = db.query(CartItem).filter(
-        CartItem.id == item_id,
-        CartItem.cart_id == cart.id
-    ).first()
+    cart_item = next((item for item in cart.items if item.id == item_id), None)
     
     if not cart_item:
         raise HTTPException(
@@ -129,28 +136,25 @@ def update_cart_item(
         )
     
     if quantity <= 0:
-        db.delete(cart_item)
+        await db.delete(cart_item)
     else:
         cart_item.quantity = quantity
     
-    db.commit()
+    await db.commit()
     
     return {"message": "Cart updated successfully"}
 
 
 @router.delete("/remove/{item_id}")
-def remove_from_cart(
+async def remove_from_cart(
     item_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Remove item from cart"""
-    cart = get_or_create_cart(current_user, db)
+    cart = await get_or_create_cart(current_user, db)
     
-    cart_item = db.query(CartItem).filter(
-        CartItem.id == item_id,
-        CartItem.cart_id == cart.id
-    ).first()
+    cart_item = next((item for item in cart.items if item.id == item_id), None)
     
     if not cart_item:
         raise HTTPException(
@@ -158,23 +162,22 @@ def remove_from_cart(
             detail="Cart item not found"
         )
     
-    db.delete(cart_item)
-    db.commit()
+    await db.delete(cart_item)
+    await db.commit()
     
     return {"message": "Item removed from cart"}
 
 
 @router.delete("/clear")
-def clear_cart(
+async def clear_cart(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Clear all items from cart"""
-    cart = get_or_create_cart(current_user, db)
-    
-    for item in cart.items:
-        db.delete(item)
+    cart = await get_or_create_cart(current_user, db)
     
-    db.commit()
+    # One DELETE for all items
+    await db.execute(delete(CartItem).where(CartItem.cart_id == cart.id))
+    await db.commit()
     
     return {"message": "Cart cleared successfully"} 
\ No newline at end of file
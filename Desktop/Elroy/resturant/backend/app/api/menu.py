@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from app.database import get_db
 from app.models.restaurant import Restaurant
@@ -11,9 +12,10 @@ router = APIRouter(prefix="/menu", tags=["Menu"])
 
 
 @router.get("/restaurant", response_model=RestaurantResponse)
-def get_restaurant(db: Session = Depends(get_db)):
+async def get_restaurant(db: AsyncSession = Depends(get_db)):
     """Get restaurant information"""
-    restaurant = db.query(Restaurant).first()
+    result = await db.execute(select(Restaurant).limit(1))
+    restaurant = result.scalars().first()
     if not restaurant:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -23,28 +25,28 @@ def get_restaurant(db: Session = Depends(get_db)):
 
 
 @router.get("/items", response_model=List[MenuItemResponse])
-def get_menu_items(
+async def get_menu_items(
     category: str = None,
     available_only: bool = True,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all menu items with optional filtering"""
-    query = db.query(MenuItem)
+    query = select(MenuItem)
     
     if available_only:
-        query = query.filter(MenuItem.is_available == True)
+        query = query.where(MenuItem.is_available == True)
     
     if category:
-        query = query.filter(MenuItem.category == category)
+        query = query.where(MenuItem.category == category)
     
-    items = query.all()
-    return items
+    result = await db.execute(query)
+    return result.scalars().all()
 
 
 @router.get("/items/{item_id}", response_model=MenuItemResponse)
-def get_menu_item(item_id: int, db: Session = Depends(get_db)):
+async def get_menu_item(item_id: int, db: AsyncSession = Depends(get_db)):
     """Get a specific menu item"""
-    item = db.query(MenuItem).filter(MenuItem.id == item_id).first()
+    item = await db.get(MenuItem, item_id)
     if not item:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -54,7 +56,8 @@ def get_menu_item(item_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/categories")
-def get_categories(db: Session = Depends(get_db)):
+async def get_categories(db: AsyncSession = Depends(get_db)):
     """Get all available categories"""
-    categories = db.query(MenuItem.category).distinct().all()
+    result = await db.execute(select(MenuItem.category).distinct())
+    categories = result.all()
     return [category[0] for category in categories if category[0]] 
\ No newline at end of file
@@ -1,5 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List
 from app.database import get_db
 from app.models.user import User
@@ -17,18 +19,25 @@ from app.models.table import Table
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
 
+def order_with_items():
+    """Select orders with their items and the items' menu entries, which
+    OrderResponse reads, loaded up front"""
+    return select(Order).options(selectinload(Order.items).selectinload(OrderItem.menu_item))
+
+
 @router.post("/place", response_model=OrderResponse)
-def place_order(
+async def place_order(
     order_data: OrderCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Place an order from cart"""
     # Check if user has an active table session
-    session = db.query(TableSession).filter(
+    result = await db.execute(select(TableSession).where(
         TableSession.user_id == current_user.id,
         TableSession.is_active == True
-    ).first()
+    ))
+    session = result.scalars().first()
     
     if not session:
         raise HTTPException(
@@ -44,7 +53,10 @@ def place_order(
         )
     
     # Get user's cart
-    cart = db.query(Cart).filter(Cart.user_id == current_user.id).first()
+    result = await db.execute(
+        select(Cart).where(Cart.user_id == current_user.id).options(selectinload(Cart.items))
+    )
+    cart = result.scalars().first()
     if not cart or not cart.items:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -72,8 +84,8 @@ def place_order(
         special_instructions=order_data.special_instructions
     )
     db.add(order)
-    db.commit()
-    db.refresh(order)
+    await db.commit()
+    await db.refresh(order)
     
     # Create order items with PENDING status
     for cart_item in cart.items:
@@ -89,32 +101,33 @@ def place_order(
     
     # Clear cart
     for item in cart.items:
-        db.delete(item)
+        await db.delete(item)
     
-    db.commit()
-    db.refresh(order)
+    await db.commit()
     
-    return order
+    result = await db.execute(order_with_items().where(Order.id == order.id))
+    return result.scalars().one()
 
 
 @router.get("/", response_model=List[OrderResponse])
-def get_user_orders(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_user_orders(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Get all orders for the current user"""
-    orders = db.query(Order).filter(Order.user_id == current_user.id).all()
-    return orders
+    result = await db.execute(order_with_items().where(Order.user_id == current_user.id))
+    return result.scalars().all()
 
 
 @router.get("/{order_id}", response_model=OrderResponse)
-def get_order(
+async def get_order(
     order_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get specific order details"""
-    order = db.query(Order).filter(
+    result = await db.execute(order_with_items().where(
         Order.id == order_id,
         Order.user_id == current_user.id
-    ).first()
+    ))
+    order = result.scalars().first()
     
     if not order:
         raise HTTPException(
@@ -126,16 +139,17 @@ def get_order(
 
 
 @router.get("/{order_id}/bill", response_model=Bill)
-def get_order_bill(
+async def get_order_bill(
     order_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get bill for a specific order"""
-    order = db.query(Order).filter(
+    result = await db.execute(order_with_items().where(
         Order.id == order_id,
         Order.user_id == current_user.id
-    ).first()
+    ))
+    order = result.scalars().first()
     
     if not order:
         raise HTTPException(
@@ -144,12 +158,13 @@ def get_order_bill(
         )
     
     # Get restaurant info
-    restaurant = db.query(Restaurant).first()
+    result = await db.execute(select(Restaurant).limit(1))
+    restaurant = result.scalars().first()
     
-    # Get order items with menu item details
+    # Order items with menu item details (loaded with the order)
     items = []
     for item in order.items:
-        menu_item = db.query(MenuItem).filter(MenuItem.id == item.menu_item_id).first()
+        menu_item = item.menu_item
         items.append({
             "name": menu_item.name if menu_item else "Unknown Item",
             "quantity": item.quantity,
@@ -159,7 +174,7 @@ def get_order_bill(
         })
     
     # Get table info
-    table = db.query(Table).filter(Table.id == order.table_id).first()
+    table = await db.get(Table, order.table_id)
     
     return Bill(
         order_number=order.order_number,
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from app.database import get_db
 from app.models.table import Table, TableStatus
@@ -13,29 +14,30 @@ router = APIRouter(prefix="/tables", tags=["Tables"])
 
 
 @router.get("/", response_model=List[TableResponse])
-def get_all_tables(db: Session = Depends(get_db)):
+async def get_all_tables(db: AsyncSession = Depends(get_db)):
     """Get all tables"""
-    tables = db.query(Table).filter(Table.is_active == True).all()
-    return tables
+    result = await db.execute(select(Table).where(Table.is_active == True))
+    return result.scalars().all()
 
 
 @router.get("/available", response_model=List[TableResponse])
-def get_available_tables(db: Session = Depends(get_db)):
+async def get_available_tables(db: AsyncSession = Depends(get_db)):
     """Get all available tables"""
-    tables = db.query(Table).filter(
+    result = await db.execute(select(Table).where(
         Table.is_active == True,
         Table.status == TableStatus.AVAILABLE
-    ).all()
-    return tables
+    ))
+    return result.scalars().all()
 
 
 @router.get("/{table_number}", response_model=TableWithSession)
-def get_table_by_number(table_number: str, db: Session = Depends(get_db)):
+async def get_table_by_number(table_number: str, db: AsyncSession = Depends(get_db)):
     """Get table by table number"""
-    table = db.query(Table).filter(
+    result = await db.execute(select(Table).where(
         Table.table_number == table_number,
         Table.is_active == True
-    ).first()
+    ))
+    table = result.scalars().first()
     
     if not table:
         raise HTTPException(
@@ -43,21 +45,27 @@ def get_table_by_number(table_number: str, db: Session = Depends(get_db)):
             detail="Table not found"
         )
     
-    return table
+    # The table's active session, if any; ended sessions stay on the table
+    result = await db.execute(select(TableSession).where(
+        TableSession.table_id == table.id,
+        TableSession.is_active == True
+    ))
+    return {"table": table, "current_session": result.scalars().first()}
 
 
 @router.post("/{table_number}/start-session", response_model=TableSessionResponse)
-def start_table_session(
+async def start_table_session(
     table_number: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Start a new table session"""
     # Check if table exists and is available
-    table = db.query(Table).filter(
+    result = await db.execute(select(Table).where(
         Table.table_number == table_number,
         Table.is_active == True
-    ).first()
+    ))
+    table = result.scalars().first()
     
     if not table:
         raise HTTPException(
@@ -72,10 +80,11 @@ def start_table_session(
         )
     
     # Check if user already has an active session
-    existing_session = db.query(TableSession).filter(
+    result = await db.execute(select(TableSession).where(
         TableSession.user_id == current_user.id,
         TableSession.is_active == True
-    ).first()
+    ))
+    existing_session = result.scalars().first()
     
     if existing_session:
         raise HTTPException(
@@ -93,24 +102,25 @@ def start_table_session(
     # Update table status
     table.status = TableStatus.OCCUPIED
     
-    db.commit()
-    db.refresh(session)
+    await db.commit()
+    await db.refresh(session)
     
     return session
 
 
 @router.post("/{table_number}/end-session")
-def end_table_session(
+async def end_table_session(
     table_number: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """End the current table session"""
     # Find the table
-    table = db.query(Table).filter(
+    result = await db.execute(select(Table).where(
         Table.table_number == table_number,
         Table.is_active == True
-    ).first()
+    ))
+    table = result.scalars().first()
     
     if not table:
         raise HTTPException(
@@ -119,11 +129,12 @@ def end_table_session(
         )
     
     # Find active session for this user at this table
-    session = db.query(TableSession).filter(
+    result = await db.execute(select(TableSession).where(
         TableSession.table_id == table.id,
         TableSession.user_id == current_user.id,
         TableSession.is_active == True
-    ).first()
+    ))
+    session = result.scalars().first()
     
     if not session:
         raise HTTPException(
@@ -138,18 +149,19 @@ def end_table_session(
     # Update table status
     table.status = TableStatus.AVAILABLE
     
-    db.commit()
+    await db.commit()
     
     return {"message": "Session ended successfully"}
 
 
 @router.get("/session/current", response_model=TableSessionResponse)
-def get_current_session(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_current_session(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Get current active session for the user"""
-    session = db.query(TableSession).filter(
+    result = await db.execute(select(TableSession).where(
         TableSession.user_id == current_user.id,
         TableSession.is_active == True
-    ).first()
+    ))
+    session = result.scalars().first()
     
     if not session:
         raise HTTPException(
@@ -161,10 +173,10 @@ def get_current_session(current_user: User = Depends(get_current_user), db: Sess
 
 
 @router.post("/qr/{table_number}/scan")
-def scan_table_qr(
+async def scan_table_qr(
     table_number: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Scan QR code for table (same as start session)"""
-    return start_table_session(table_number, current_user, db) 
\ No newline at end of file
+    return await start_table_session(table_number, current_user, db) 
\ No newline at end of file
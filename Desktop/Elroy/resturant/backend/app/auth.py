@@ -3,8 +3,10 @@ from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import TokenData
@@ -23,12 +25,14 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# bcrypt spends tens of milliseconds of CPU per call; both run in the
+# threadpool so the event loop keeps serving other requests meanwhile
+async def verify_password(plain_password, hashed_password):
+    return await run_in_threadpool(pwd_context.verify, plain_password, hashed_password)
 
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await run_in_threadpool(pwd_context.hash, password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -54,9 +58,9 @@ def verify_token(token: str) -> Optional[TokenData]:
         return None
 
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -69,7 +73,8 @@ def get_current_user(
     if token_data is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.phone == token_data.phone).first()
+    result = await db.execute(select(User).where(User.phone == token_data.phone))
+    user = result.scalars().first()
     if user is None:
         raise credentials_exception
     
@@ -1,26 +1,47 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
 
-# Create database engine
+# Create database engine (scripts, migrations and create_tables)
 engine = create_engine(
     settings.database_url,
     pool_pre_ping=True,
     pool_recycle=300,
-    pool_size=5,
-    max_overflow=10
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow
 )
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the API. Requests wait on the database without holding
+# a threadpool thread, so a rush queues on the connection pool only
+async_engine = create_async_engine(
+    settings.get_async_database_url(),
+    pool_pre_ping=True,
+    pool_recycle=300,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow
+)
+
+# Objects stay readable after commit: an async session cannot lazily
+# reload expired attributes, so routers refresh what the database changed
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Create base class for models
 Base = declarative_base()
 
 
-def get_db():
-    """Dependency to get database session"""
+async def get_db():
+    """Dependency to get an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_sync_db():
+    """Dependency to get a sync database session (sync routes, benchmarks)"""
     db = SessionLocal()
     try:
         yield db
@@ -35,4 +56,4 @@ def create_tables():
 
 def drop_tables():
     """Drop all database tables"""
-    Base.metadata.drop_all(bind=engine) 
\ No newline at end of file
+    Base.metadata.drop_all(bind=engine)
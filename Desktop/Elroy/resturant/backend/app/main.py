@@ -33,7 +33,7 @@ app.include_router(admin.router, prefix="/api/v1")
 
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {
         "message": "Restaurant Table Booking API",
         "version": "1.0.0",
@@ -42,7 +42,7 @@ def read_root():
 
 
 @app.get("/health")
-def health_check():
+async def health_check():
     return {
         "status": "healthy",
         "environment": settings.environment
@@ -2,6 +2,7 @@ from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 from enum import Enum
+from app.schemas.menu_item import MenuItemResponse
 
 
 class OrderStatus(str, Enum):
@@ -32,7 +33,7 @@ class OrderItemResponse(BaseModel):
     admin_notes: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
-    menu_item: Optional[dict] = None
+    menu_item: Optional[MenuItemResponse] = None
     
     class Config:
         from_attributes = True
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Compare sync and async database access under concurrent load.
+
+Serves the menu listing (GET /api/v1/menu/items) twice from one uvicorn
+process: once as a sync `def` route on the sync engine, which runs in
+Starlette's threadpool, and once as an `async def` route on the async
+engine used by the API. Both run the same query against DATABASE_URL, so
+seed it first (python seed_data.py). Then it drives each route with 50, 200
+and 1000 concurrent keep-alive clients and prints throughput and latency.
+
+    python bench_async.py
+    python bench_async.py --concurrency 50 200 1000 --duration 20 --delay-ms 20
+
+--delay-ms adds a pg_sleep to every request (PostgreSQL only), standing in
+for slower queries at rush hour, when the threadpool runs out first.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import time
+from typing import List
+
+import httpx
+import uvicorn
+from fastapi import Depends, FastAPI
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database import get_db, get_sync_db
+from app.models.menu_item import MenuItem
+
+HOST = "127.0.0.1"
+
+
+def build_app(delay_ms: int) -> FastAPI:
+    bench_app = FastAPI()
+    delay = text("SELECT pg_sleep(:seconds)").bindparams(seconds=delay_ms / 1000)
+
+    @bench_app.get("/sync/items")
+    def sync_items(db: Session = Depends(get_sync_db)):
+        if delay_ms:
+            db.execute(delay)
+        items = db.query(MenuItem).filter(MenuItem.is_available == True).all()
+        return [{"id": item.id, "name": item.name, "price": item.price} for item in items]
+
+    @bench_app.get("/async/items")
+    async def async_items(db: AsyncSession = Depends(get_db)):
+        if delay_ms:
+            await db.execute(delay)
+        result = await db.execute(select(MenuItem).where(MenuItem.is_available == True))
+        return [{"id": item.id, "name": item.name, "price": item.price} for item in result.scalars()]
+
+    @bench_app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    return bench_app
+
+
+def serve(port: int, delay_ms: int):
+    uvicorn.run(build_app(delay_ms), host=HOST, port=port, log_level="warning")
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[max(int(round(pct / 100 * len(ordered))) - 1, 0)]
+
+
+async def load(url: str, concurrency: int, duration: float) -> dict:
+    """Keep ``concurrency`` clients requesting ``url`` for ``duration`` seconds"""
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50) * 1000 if latencies else 0,
+        "p95": percentile(latencies, 95) * 1000 if latencies else 0,
+        "p99": percentile(latencies, 99) * 1000 if latencies else 0,
+    }
+
+
+async def wait_ready(base_url: str):
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                await client.get(f"{base_url}/ping")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise SystemExit("Benchmark server did not start")
+
+
+async def run(args):
+    base_url = f"http://{HOST}:{args.port}"
+    await wait_ready(base_url)
+    print(f"{'mode':<6} {'clients':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for concurrency in args.concurrency:
+        for mode in ("sync", "async"):
+            # Warm both pools before measuring
+            await load(f"{base_url}/{mode}/items", min(concurrency, 20), 1)
+            result = await load(f"{base_url}/{mode}/items", concurrency, args.duration)
+            print(
+                f"{mode:<6} {concurrency:>7} {result['rps']:>9.1f} {result['p50']:>9.2f} "
+                f"{result['p95']:>9.2f} {result['p99']:>9.2f} {result['errors']:>7}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs async database throughput")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per measured case")
+    parser.add_argument("--delay-ms", type=int, default=0, help="pg_sleep per request (PostgreSQL)")
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=serve, args=(args.port, args.delay_ms), daemon=True)
+    server.start()
+    try:
+        asyncio.run(run(args))
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+
+# Both engines read DATABASE_URL when app.database is imported, so point it
+# at a throwaway SQLite file first; the API reaches it through aiosqlite
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.database import SessionLocal, async_engine, create_tables, drop_tables
+from app.main import app
+from app.models.menu_item import MenuItem
+from app.models.restaurant import Restaurant
+from app.models.table import Table
+
+
+@pytest_asyncio.fixture
+async def client():
+    drop_tables()
+    create_tables()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    # Pooled aiosqlite connections belong to this test's event loop
+    await async_engine.dispose()
+
+
+@pytest.fixture
+def menu(client):
+    """A restaurant with 15 available menu items and table T1; returns the item ids"""
+    with SessionLocal() as db:
+        restaurant = Restaurant(name="Test Kitchen", address="1 Main Street")
+        db.add(restaurant)
+        db.flush()
+        items = [
+            MenuItem(name=f"Dish {i}", price=100.0 + i, category="Mains", restaurant_id=restaurant.id)
+            for i in range(15)
+        ]
+        db.add_all(items)
+        db.add(Table(table_number="T1", capacity=4))
+        db.commit()
+        return [item.id for item in items]
+
+
+@pytest_asyncio.fixture
+async def auth(client):
+    """Log in through the OTP flow; returns the Authorization header"""
+    phone = "9876543210"
+    otp = (await client.post("/api/v1/auth/phone-login", json={"phone": phone})).json()["otp"]
+    response = await client.post("/api/v1/auth/verify-otp", json={"phone": phone, "otp": otp})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,45 @@
+"""The cart endpoints run the same number of statements whatever the cart holds"""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app.database import async_engine
+
+pytestmark = pytest.mark.asyncio
+
+
+@contextmanager
+def count_statements():
+    """Count the statements the API's engine sends while the block runs"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def statements_per_request(client, menu, auth, items):
+    """Statements for GET /cart and for the POST /cart/add that brings the cart to ``items`` items"""
+    # Creating the cart is a one-off; it exists before anything is counted
+    await client.get("/api/v1/cart/", headers=auth)
+    for menu_item_id in menu[:items - 1]:
+        await client.post("/api/v1/cart/add", json={"menu_item_id": menu_item_id}, headers=auth)
+    with count_statements() as added:
+        response = await client.post("/api/v1/cart/add", json={"menu_item_id": menu[items - 1]}, headers=auth)
+    assert len(response.json()["items"]) == items
+    with count_statements() as read:
+        response = await client.get("/api/v1/cart/", headers=auth)
+    assert len(response.json()["items"]) == items
+    return len(read), len(added)
+
+
+async def test_statements_do_not_grow_with_the_cart(client, menu, auth):
+    one = await statements_per_request(client, menu, auth, 1)
+    await client.delete("/api/v1/cart/clear", headers=auth)
+    assert await statements_per_request(client, menu, auth, 15) == one
@@ -0,0 +1,98 @@
+"""One request path through each router, on the async engine over aiosqlite"""
+import pytest
+
+pytestmark = pytest.mark.asyncio
+
+API = "/api/v1"
+
+
+async def test_auth(client):
+    response = await client.post(f"{API}/auth/phone-login", json={"phone": "9876543210"})
+    assert response.status_code == 200
+    assert response.json()["is_new_user"] is True
+
+    otp = response.json()["otp"]
+    wrong = "000000" if otp != "000000" else "111111"
+    response = await client.post(f"{API}/auth/verify-otp", json={"phone": "9876543210", "otp": wrong})
+    assert response.status_code == 400
+    response = await client.post(f"{API}/auth/verify-otp", json={"phone": "9876543210", "otp": otp})
+    assert response.status_code == 200
+    assert response.json()["user"]["is_verified"] is True
+
+
+async def test_menu(client, menu):
+    assert (await client.get(f"{API}/menu/restaurant")).json()["name"] == "Test Kitchen"
+    assert len((await client.get(f"{API}/menu/items")).json()) == 15
+    assert (await client.get(f"{API}/menu/items/{menu[0]}")).json()["name"] == "Dish 0"
+    assert (await client.get(f"{API}/menu/items/999")).status_code == 404
+    assert (await client.get(f"{API}/menu/categories")).json() == ["Mains"]
+
+
+async def test_cart(client, menu, auth):
+    response = await client.post(f"{API}/cart/add", json={"menu_item_id": menu[0], "quantity": 2}, headers=auth)
+    assert response.status_code == 200
+    await client.post(f"{API}/cart/add", json={"menu_item_id": menu[0]}, headers=auth)
+    cart = (await client.get(f"{API}/cart/", headers=auth)).json()
+    assert (cart["total_items"], cart["subtotal"]) == (3, 300.0)
+    assert cart["items"][0]["menu_item"]["name"] == "Dish 0"
+
+    item_id = cart["items"][0]["id"]
+    response = await client.put(f"{API}/cart/update/{item_id}", params={"quantity": 1}, headers=auth)
+    assert response.status_code == 200
+    assert (await client.get(f"{API}/cart/", headers=auth)).json()["total_items"] == 1
+    assert (await client.delete(f"{API}/cart/remove/{item_id}", headers=auth)).status_code == 200
+    await client.post(f"{API}/cart/add", json={"menu_item_id": menu[1]}, headers=auth)
+    assert (await client.delete(f"{API}/cart/clear", headers=auth)).status_code == 200
+    assert (await client.get(f"{API}/cart/", headers=auth)).json()["items"] == []
+    assert (await client.get(f"{API}/cart/")).status_code in (401, 403)
+
+
+async def test_tables(client, menu, auth):
+    assert [t["table_number"] for t in (await client.get(f"{API}/tables/")).json()] == ["T1"]
+    response = await client.post(f"{API}/tables/T1/start-session", headers=auth)
+    assert response.status_code == 200
+    assert (await client.get(f"{API}/tables/available")).json() == []
+    assert (await client.get(f"{API}/tables/T1")).json()["current_session"]["id"] == response.json()["id"]
+    assert (await client.get(f"{API}/tables/session/current", headers=auth)).status_code == 200
+    assert (await client.post(f"{API}/tables/T1/end-session", headers=auth)).status_code == 200
+    assert len((await client.get(f"{API}/tables/available")).json()) == 1
+
+
+async def place_order(client, menu, auth):
+    session = (await client.post(f"{API}/tables/T1/start-session", headers=auth)).json()
+    await client.post(f"{API}/cart/add", json={"menu_item_id": menu[0], "quantity": 2}, headers=auth)
+    response = await client.post(f"{API}/orders/place", json={
+        "table_id": session["table_id"], "table_session_id": session["id"],
+    }, headers=auth)
+    assert response.status_code == 200
+    return response.json()
+
+
+async def test_orders(client, menu, auth):
+    order = await place_order(client, menu, auth)
+    assert (order["subtotal"], order["total_amount"]) == (200.0, 236.0)
+    assert (await client.get(f"{API}/cart/", headers=auth)).json()["items"] == []
+
+    assert [o["id"] for o in (await client.get(f"{API}/orders/", headers=auth)).json()] == [order["id"]]
+    assert (await client.get(f"{API}/orders/{order['id']}", headers=auth)).status_code == 200
+    bill = (await client.get(f"{API}/orders/{order['id']}/bill", headers=auth)).json()
+    assert (bill["table_number"], bill["items"][0]["name"]) == ("T1", "Dish 0")
+
+
+async def test_admin(client, menu, auth):
+    order = await place_order(client, menu, auth)
+    url = f"{API}/admin/orders/{order['id']}"
+    assert len((await client.get(f"{API}/admin/orders/pending", headers=auth)).json()) == 1
+    assert (await client.post(f"{url}/accept", headers=auth)).status_code == 200
+    items = (await client.get(f"{url}/items", headers=auth)).json()
+    assert [item["status"] for item in items] == ["accepted"]
+    response = await client.patch(
+        f"{url}/items/{items[0]['id']}/status", json={"status": "preparing"}, headers=auth,
+    )
+    assert response.status_code == 200
+    assert (await client.get(url, headers=auth)).json()["status"] == "preparing"
+    assert (await client.post(f"{url}/ready", headers=auth)).status_code == 200
+    assert (await client.post(f"{url}/deliver", headers=auth)).status_code == 200
+    response = await client.patch(f"{url}/status", json={"status": "delivered", "admin_notes": "Done"}, headers=auth)
+    assert response.json()["admin_notes"] == "Done"
+    assert len((await client.get(f"{API}/admin/orders", headers=auth)).json()) == 1
@@ -1,27 +1,124 @@
-from django.contrib import admin
-from .models import Appointment
+from django.contrib import admin, messages
+from .models import Appointment, AppointmentSeries, ClinicHours, OutboxMessage, Patient, WaitlistEntry
+from .pagination import EstimatedCountPaginator
+from .patients import link_patients
+from .transitions import transition
+
+
+def status_action(status, description):
+    """Changelist action moving the selection to ``status`` in one UPDATE"""
+    def action(modeladmin, request, queryset):
+        selected = queryset.count()
+        updated = len(transition(queryset, status))
+        modeladmin.message_user(
+            request,
+            f'{updated} appointment(s) marked {status}; '
+            f'{selected - updated} skipped because their status does not allow it.',
+            messages.SUCCESS if updated == selected else messages.WARNING,
+        )
+    action.__name__ = f'mark_{status}'
+    return admin.action(description=description, permissions=['change'])(action)
+
 
 @admin.register(Appointment)
 class AppointmentAdmin(admin.ModelAdmin):
     list_display = ('name', 'email', 'phone', 'date', 'time', 'status', 'created_at')
     list_filter = ('status', 'date', 'created_at')
     search_fields = ('name', 'email', 'phone')
+    # Saves one row per changed status; the actions below change any number
+    # of rows in a single statement
     list_editable = ('status',)
-    ordering = ('-created_at',)
-    readonly_fields = ('created_at', 'updated_at')
+    actions = [
+        status_action('confirmed', 'Mark selected appointments as confirmed'),
+        status_action('completed', 'Mark selected appointments as completed'),
+        status_action('cancelled', 'Mark selected appointments as cancelled'),
+    ]
+    # Matches the (created_at, id) index, so pages come straight off it
+    ordering = ('-created_at', '-id')
+    # Avoid COUNT(*) over the whole table on every changelist load
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = (
+        'patient', 'series', 'occurrence_date', 'created_at', 'updated_at', 'remind_at', 'version',
+    )
     
     fieldsets = (
         ('Personal Information', {
-            'fields': ('name', 'email', 'phone')
+            'fields': ('name', 'email', 'phone', 'patient')
         }),
         ('Appointment Details', {
-            'fields': ('date', 'time', 'message')
+            'fields': ('date', 'time', 'message', 'series', 'occurrence_date')
         }),
         ('Status', {
-            'fields': ('status',)
+            'fields': ('status', 'version', 'remind_at')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
+
+    def save_model(self, request, obj, form, change):
+        # Follow an edited phone or email to the matching patient
+        if not change or {'name', 'email', 'phone'} & set(form.changed_data):
+            link_patients([obj])
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(AppointmentSeries)
+class AppointmentSeriesAdmin(admin.ModelAdmin):
+    # Create series through the API, which checks every occurrence's slot;
+    # here they can be looked up, ended early (``ends_on``) or deleted
+    list_display = ('name', 'phone', 'time', 'frequency', 'interval', 'starts_on', 'ends_on', 'status')
+    list_filter = ('frequency', 'status')
+    search_fields = ('name', 'email', 'phone')
+    ordering = ('-id',)
+    readonly_fields = ('patient', 'time', 'frequency', 'interval', 'starts_on', 'created_at', 'updated_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Patient)
+class PatientAdmin(admin.ModelAdmin):
+    list_display = ('name', 'phone', 'email', 'created_at')
+    # Contacts are stored normalized; search with '+91...' and lowercase
+    search_fields = ('=phone', '=email', 'name')
+    ordering = ('-id',)
+    show_full_result_count = False
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    # Entries join through the API; setting one to withdrawn takes it out of
+    # the queue (signals.waitlist_entry_saved)
+    list_display = ('name', 'phone', 'date_from', 'date_to', 'status', 'offered_date', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('name', 'email', 'phone')
+    ordering = ('-id',)
+    show_full_result_count = False
+    readonly_fields = ('patient', 'offered_date', 'offered_minute', 'hold', 'offered_at', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ClinicHours)
+class ClinicHoursAdmin(admin.ModelAdmin):
+    list_display = ('weekday', 'opens_at', 'closes_at', 'slot_minutes')
+    list_filter = ('weekday',)
+    ordering = ('weekday', 'opens_at')
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'channel', 'recipient', 'status', 'attempts', 'available_at', 'sent_at')
+    list_filter = ('status', 'channel', 'kind')
+    search_fields = ('recipient',)
+    ordering = ('-id',)
+    show_full_result_count = False
+    readonly_fields = [field.name for field in OutboxMessage._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,190 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import F
+from .cache import get_cache
+from .holds import held_slots, holder
+from .models import Appointment, ClinicHours, DayOccupancy
+from .series import series_conflict, series_slots
+from .slots import format_minute, is_booked, occupancy_bitmap
+
+# Longest range the availability endpoint will expand in one request
+MAX_AVAILABILITY_DAYS = 62
+
+SCHEDULE_KEY = 'appointments:clinic-schedule'
+# Bounds how long other processes keep a schedule after clinic hours change
+SCHEDULE_CACHE_SECONDS = 60
+
+# Days rebuilt per transaction by refresh_occupancy
+OCCUPANCY_CHUNK = 500
+
+# How far ahead next_available looks for a free slot
+NEXT_AVAILABLE_DAYS = 62
+
+
+def _build_schedule(sessions):
+    schedule = defaultdict(list)
+    for session in sessions:
+        schedule[session.weekday].extend(session.slot_starts())
+    return dict(schedule)
+
+
+def clinic_schedule():
+    """Slot start minutes per weekday, from the configured clinic hours.
+
+    Cached, since every booking validates against it; ClinicHours changes
+    clear the entry (see signals).
+    """
+    cache = get_cache()
+    schedule = cache.get(SCHEDULE_KEY)
+    if schedule is None:
+        schedule = _build_schedule(ClinicHours.objects.all())
+        cache.set(SCHEDULE_KEY, schedule, SCHEDULE_CACHE_SECONDS)
+    return schedule
+
+
+async def aclinic_schedule():
+    """Async ORM version of ``clinic_schedule``"""
+    cache = get_cache()
+    schedule = await cache.aget(SCHEDULE_KEY)
+    if schedule is None:
+        schedule = _build_schedule([session async for session in ClinicHours.objects.all()])
+        await cache.aset(SCHEDULE_KEY, schedule, SCHEDULE_CACHE_SECONDS)
+    return schedule
+
+
+def is_bookable(schedule, day, minute):
+    """Whether ``minute`` starts a slot on ``day``.
+
+    With no clinic hours configured at all every time is accepted, so a
+    fresh install keeps taking bookings.
+    """
+    if not schedule:
+        return True
+    return minute in schedule.get(day.weekday(), ())
+
+
+def lock_days(dates):
+    """Create and lock the occupancy rows of ``dates`` until the transaction
+    ends; returns the locked dates. Bookings hold the lock from their
+    occupancy refresh on, and new series take it for every occurrence."""
+    DayOccupancy.objects.bulk_create(
+        [DayOccupancy(date=day) for day in dates], ignore_conflicts=True
+    )
+    return list(
+        DayOccupancy.objects.select_for_update()
+        .filter(date__in=dates).values_list('date', flat=True)
+    )
+
+
+def refresh_occupancy(dates):
+    """Recompute the occupancy bitmap of each date from its live bookings.
+
+    The day rows are locked first so concurrent bookings on the same day
+    rebuild them one after another and none of their bits is lost. Dates
+    are handled in chunks with a fixed number of queries each, so bulk
+    paths can pass thousands of them at once.
+    """
+    dates = sorted(set(dates), key=str)
+    for i in range(0, len(dates), OCCUPANCY_CHUNK):
+        chunk = dates[i:i + OCCUPANCY_CHUNK]
+        with transaction.atomic():
+            days = lock_days(chunk)
+            booked = defaultdict(list)
+            slots = (
+                Appointment.objects
+                .filter(date__in=chunk, start_minute__isnull=False)
+                .exclude(status='cancelled')
+                .values_list('date', 'start_minute')
+            )
+            for day, minute in slots:
+                booked[day].append(minute)
+            DayOccupancy.objects.bulk_create(
+                [DayOccupancy(date=day, booked=occupancy_bitmap(booked[day])) for day in days],
+                update_conflicts=True, unique_fields=['date'], update_fields=['booked'],
+            )
+
+
+def free_slots(start, end):
+    """Free slots per day between ``start`` and ``end`` inclusive.
+
+    Reads only the clinic hours, one occupancy row per day, the series
+    overlapping the range and, in one cache read, the slot holds; each
+    slot is a single bit test and set lookup.
+    """
+    schedule = clinic_schedule()
+    occupancy = {
+        row.date: bytes(row.booked)
+        for row in DayOccupancy.objects.filter(date__range=(start, end))
+    }
+    # Series occurrences are not in the bitmaps; they are expanded here
+    occurrences = series_slots(start, end, cached=True)
+
+    free = []
+    day = start
+    while day <= end:
+        bitmap = occupancy.get(day)
+        free.append((day, [
+            minute for minute in schedule.get(day.weekday(), ())
+            if (bitmap is None or not is_booked(bitmap, minute)) and minute not in occurrences.get(day, ())
+        ]))
+        day += timedelta(days=1)
+
+    held = held_slots((day, minute) for day, minutes in free for minute in minutes)
+    return [
+        {
+            'date': day.strftime('%Y-%m-%d'),
+            'free_slots': [format_minute(minute) for minute in minutes if (day, minute) not in held],
+        }
+        for day, minutes in free
+    ]
+
+
+def slot_taken(day, minute):
+    """Whether an appointment or a series occurrence has the slot"""
+    bitmap = DayOccupancy.objects.filter(date=day).values_list('booked', flat=True).first()
+    return (bitmap is not None and is_booked(bytes(bitmap), minute)) or series_conflict(day, minute)
+
+
+def day_schedule(day):
+    """Appointments of ``day`` in clock order, straight off the
+    (date, start_minute) index; legacy free-text times sort last"""
+    return (
+        Appointment.objects
+        .filter(date=day)
+        .order_by(F('start_minute').asc(nulls_last=True), 'id')
+    )
+
+
+def next_available(day, minute=0, days=NEXT_AVAILABLE_DAYS):
+    """First free ``(date, start_minute)`` at or after ``minute`` on ``day``.
+
+    Booked slots come from one index range scan ordered by (date,
+    start_minute), plus the series occurrences in the window; held slots
+    are skipped. Returns None when nothing is free within ``days`` days or
+    no clinic hours are configured.
+    """
+    schedule = clinic_schedule()
+    if not schedule:
+        return None
+
+    end = day + timedelta(days=days - 1)
+    booked = set(
+        Appointment.objects
+        .filter(date__range=(day, end), start_minute__isnull=False)
+        .exclude(status='cancelled')
+        .order_by('date', 'start_minute')
+        .values_list('date', 'start_minute')
+    )
+    occurrences = series_slots(day, end, cached=True)
+    current = day
+    while current <= end:
+        for start in sorted(schedule.get(current.weekday(), ())):
+            if current == day and start < minute:
+                continue
+            if (current, start) in booked or start in occurrences.get(current, ()):
+                continue
+            if holder(current, start) is None:
+                return current, start
+        current += timedelta(days=1)
+    return None
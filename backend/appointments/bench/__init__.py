@@ -0,0 +1,111 @@
+"""Benchmark helpers for the appointments app.
+
+Scenarios live in sibling modules and are run through
+``manage.py bench_appointments <scenario>``. They always execute against a
+throwaway test database, never the configured one.
+"""
+import random
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from django.conf import settings
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from ..models import Appointment
+
+TIMES = ['9:00 AM', '10:00 AM', '11:00 AM', '1:00 PM', '2:00 PM', '3:00 PM', '4:00 PM', '5:00 PM']
+STATUS_WEIGHTS = [('pending', 2), ('confirmed', 3), ('cancelled', 1), ('completed', 6)]
+
+
+@contextmanager
+def bench_database(keepdb=False):
+    """Create a test database for the duration of a benchmark run.
+
+    Unlike the test runner this leaves template rendering uninstrumented:
+    capturing every rendered context doubles the cost of template-heavy
+    pages such as the admin and keeps the contexts alive.
+    """
+    with override_settings(
+        ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+        EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        DEBUG=False,
+    ):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+
+
+def synthetic_appointments(count, offset=0, seed=0):
+    """Yield unsaved appointments with a realistic spread of values.
+
+    ``offset`` keeps generated patients and timestamps distinct when a
+    table is grown in several steps.
+    """
+    rng = random.Random(seed + offset)
+    statuses = [status for status, weight in STATUS_WEIGHTS for _ in range(weight)]
+    now = timezone.now()
+    first_day = date.today() - timedelta(days=730)
+    patients = max(count // 3, 1)
+    for i in range(offset, offset + count):
+        patient = offset + rng.randrange(patients)
+        yield Appointment(
+            name=f'Patient {patient}',
+            email=f'patient{patient}@example.com',
+            phone=f'+9198{patient:08d}',
+            date=first_day + timedelta(days=rng.randrange(820)),
+            time=rng.choice(TIMES),
+            message='',
+            status=rng.choice(statuses),
+            created_at=now - timedelta(seconds=(offset + count - i) * 60),
+        )
+
+
+def seed_appointments(count, offset=0, batch_size=5000):
+    """Bulk insert ``count`` synthetic appointments"""
+    batch = []
+    for appointment in synthetic_appointments(count, offset=offset):
+        batch.append(appointment)
+        if len(batch) == batch_size:
+            Appointment.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Appointment.objects.bulk_create(batch)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[index]
+
+
+def measure(fn, repeat):
+    """Call ``fn`` ``repeat`` times and return the wall time of each call"""
+    samples = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def latency_summary(samples):
+    """p50/p95/p99 of a list of second samples, in milliseconds"""
+    return {f'p{pct}_ms': round(percentile(samples, pct) * 1000, 3) for pct in (50, 95, 99)}
+
+
+def format_latency(samples):
+    """Render p50/p95/p99 of a list of second samples in milliseconds"""
+    return '  '.join(f'{name[:3]}={value:8.2f}ms' for name, value in latency_summary(samples).items())
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MiB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10)
@@ -0,0 +1,40 @@
+"""Latency of AppointmentAdmin changelist searches and filters as the table grows"""
+import random
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+from ..models import Appointment
+from . import format_latency, measure, seed_appointments
+
+
+def run(command, options):
+    client = Client()
+    admin = get_user_model().objects.create_superuser('bench', 'bench@example.com', 'bench')
+    client.force_login(admin)
+    url = reverse('admin:appointments_appointment_changelist')
+    repeat = options['requests']
+    rng = random.Random(0)
+    seeded = 0
+
+    for rows in sorted(options['rows']):
+        command.stdout.write(f'Seeding {rows - seeded:,} appointments...')
+        seed_appointments(rows - seeded, offset=seeded)
+        seeded = rows
+
+        last_id = Appointment.objects.order_by('-id').values_list('id', flat=True).first()
+        sample = list(
+            Appointment.objects
+            .filter(id__in=[rng.randint(1, last_id) for _ in range(repeat)])
+            .values_list('name', 'email', 'phone')
+        )
+        cases = [
+            ('changelist', lambda i: client.get(url)),
+            ('status filter', lambda i: client.get(url, {'status__exact': 'pending'})),
+            ('search name', lambda i: client.get(url, {'q': sample[i % len(sample)][0]})),
+            ('search email', lambda i: client.get(url, {'q': sample[i % len(sample)][1].split('@')[0]})),
+            ('search phone', lambda i: client.get(url, {'q': sample[i % len(sample)][2][-6:]})),
+        ]
+
+        for name, fn in cases:
+            latencies = measure(fn, repeat)
+            command.stdout.write(f'rows={rows:>10,}  {name:<14} {format_latency(latencies)}')
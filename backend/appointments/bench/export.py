@@ -0,0 +1,43 @@
+"""Time to first byte, throughput and peak memory of the streaming export"""
+import time
+import tracemalloc
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+from . import seed_appointments
+
+
+def _export(client, url, params):
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get(url, params)
+    first_byte = None
+    size = 0
+    for chunk in response.streaming_content:
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        size += len(chunk)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_byte, elapsed, size, peak
+
+
+def run(command, options):
+    client = Client()
+    staff = get_user_model().objects.create_user('bench', password='bench', is_staff=True)
+    client.force_login(staff)
+    url = reverse('appointments:appointment-export')
+
+    seeded = 0
+    for rows in options['rows']:
+        seed_appointments(rows - seeded, offset=seeded)
+        seeded = rows
+        for params in ({'format': 'csv'}, {'format': 'ndjson'}, {'format': 'csv', 'gzip': '1'}):
+            first_byte, elapsed, size, peak = _export(client, url, params)
+            label = params['format'] + (' gzip' if 'gzip' in params else '')
+            command.stdout.write(
+                f'rows={rows:>10,}  {label:<10}  ttfb={first_byte * 1000:8.1f}ms  '
+                f'{rows / elapsed:>10,.0f} rows/s  {size / 2**20:8.1f}MiB out  '
+                f'peak heap={peak / 2**20:6.1f}MiB'
+            )
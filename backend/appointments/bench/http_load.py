@@ -0,0 +1,124 @@
+"""Closed-loop HTTP load generator for comparing WSGI and ASGI deployments.
+
+Each simulated client keeps one HTTP/1.1 keep-alive connection and sends
+its next request as soon as the previous response arrives.
+"""
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+from . import percentile
+
+
+class LoadStats:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = 0
+        self.connections = 0
+
+
+def booking_payloads():
+    """Endless booking payloads, each for its own (date, minute) slot"""
+    first_day = date.today() + timedelta(days=3650)
+    for n in itertools.count():
+        day, minute = divmod(n, 24 * 60)
+        yield {
+            'name': f'Load Client {n}',
+            'email': f'load{n}@example.com',
+            'phone': f'+9197{n:08d}',
+            'date': (first_day + timedelta(days=day)).isoformat(),
+            'time': f'{minute // 60}:{minute % 60:02d}',
+        }
+
+
+def _request(method, url, body=b''):
+    head = (
+        f'{method} {url.path or "/"}{"?" + url.query if url.query else ""} HTTP/1.1\r\n'
+        f'Host: {url.netloc}\r\n'
+        'Connection: keep-alive\r\n'
+        'Content-Type: application/json\r\n'
+        f'Content-Length: {len(body)}\r\n\r\n'
+    )
+    return head.encode() + body
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('connection') != 'close'
+
+
+async def _client(url, method, payloads, deadline, stats):
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        if writer is None:
+            reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+            stats.connections += 1
+        body = json.dumps(next(payloads)).encode() if method == 'POST' else b''
+        started = time.perf_counter()
+        try:
+            writer.write(_request(method, url, body))
+            await writer.drain()
+            status, keep_alive = await _read_response(reader)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            stats.errors += 1
+            writer.close()
+            writer = None
+            continue
+        stats.latencies.append(time.perf_counter() - started)
+        stats.statuses[status] += 1
+        if not keep_alive:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(url, method='POST', concurrency=500, duration=30):
+    """Drive ``url`` with ``concurrency`` clients for ``duration`` seconds"""
+    url = urlsplit(url)
+    stats = LoadStats()
+    payloads = booking_payloads()
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(
+        _client(url, method, payloads, deadline, stats) for _ in range(concurrency)
+    ))
+    return stats
+
+
+def summarize(stats, duration):
+    """Throughput and latency summary of a finished run"""
+    done = len(stats.latencies)
+    summary = {
+        'requests': done,
+        'throughput': done / duration,
+        'statuses': dict(stats.statuses),
+        'errors': stats.errors,
+        'client_connections': stats.connections,
+    }
+    if done:
+        summary['p50_ms'] = percentile(stats.latencies, 50) * 1000
+        summary['p99_ms'] = percentile(stats.latencies, 99) * 1000
+    return summary
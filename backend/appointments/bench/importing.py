@@ -0,0 +1,50 @@
+"""Throughput of the bulk import path against one POST per appointment"""
+import json
+import time
+from datetime import date, timedelta
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+from . import TIMES
+
+
+def _rows(count, offset):
+    """Appointment payloads that each take a distinct slot"""
+    first_day = date(2000, 1, 1)
+    for i in range(offset, offset + count):
+        yield {
+            'name': f'Patient {i}',
+            'email': f'patient{i}@example.com',
+            'phone': f'+9198{i:08d}',
+            'date': (first_day + timedelta(days=i // len(TIMES))).isoformat(),
+            'time': TIMES[i % len(TIMES)],
+            'message': '',
+        }
+
+
+def run(command, options):
+    client = Client()
+    staff = get_user_model().objects.create_user('bench', password='bench', is_staff=True)
+    client.force_login(staff)
+
+    single = options['requests']
+    url = reverse('appointments:appointment-create')
+    started = time.perf_counter()
+    for row in _rows(single, 0):
+        client.post(url, json.dumps(row), content_type='application/json')
+    per_request = single / (time.perf_counter() - started)
+    command.stdout.write(f'per-request POST  rows={single:>10,}  {per_request:>10,.0f} rows/s')
+
+    offset = single
+    import_url = reverse('appointments:appointment-import')
+    for rows in options['rows']:
+        body = '\n'.join(json.dumps(row) for row in _rows(rows, offset))
+        offset += rows
+        started = time.perf_counter()
+        response = client.post(import_url, body, content_type='application/x-ndjson')
+        rate = rows / (time.perf_counter() - started)
+        result = response.json()
+        command.stdout.write(
+            f'bulk import       rows={rows:>10,}  {rate:>10,.0f} rows/s  '
+            f'{rate / per_request:6.1f}x  (created={result["created"]}, failed={result["failed"]})'
+        )
@@ -0,0 +1,42 @@
+"""Sustained booking intake: direct inserts against the queued write-behind mode"""
+import json
+import time
+from django.test import Client, override_settings
+from django.urls import reverse
+from ..intake import flush_queue
+from .http_load import booking_payloads
+
+
+def _post_rate(client, url, payloads, count):
+    started = time.perf_counter()
+    for _ in range(count):
+        client.post(url, json.dumps(next(payloads)), content_type='application/json')
+    return count / (time.perf_counter() - started)
+
+
+def run(command, options):
+    client = Client()
+    url = reverse('appointments:appointment-create')
+    payloads = booking_payloads()
+    count = options['requests']
+
+    direct = _post_rate(client, url, payloads, count)
+    command.stdout.write(f'direct intake   {direct:>10,.0f} req/s')
+
+    with override_settings(APPOINTMENTS_INTAKE_MODE='queued', APPOINTMENTS_INTAKE_MAX_QUEUE=10 ** 9):
+        queued = _post_rate(client, url, payloads, count)
+    command.stdout.write(f'queued intake   {queued:>10,.0f} req/s  {queued / direct:6.1f}x')
+
+    started = time.perf_counter()
+    flushed = 0
+    while True:
+        claimed = flush_queue()
+        if not claimed:
+            break
+        flushed += claimed
+    flush_rate = flushed / (time.perf_counter() - started)
+    command.stdout.write(f'flusher         {flush_rate:>10,.0f} rows/s')
+    command.stdout.write(
+        f'sustained       {min(queued, flush_rate):>10,.0f} req/s  '
+        f'(intake while the flusher keeps up)'
+    )
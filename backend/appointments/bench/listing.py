@@ -0,0 +1,58 @@
+"""Latency of the keyset-paginated appointment listing as the table grows"""
+import random
+from datetime import date, timedelta
+from django.test import Client
+from django.urls import reverse
+from ..cache import bump_version
+from ..models import Appointment
+from ..pagination import encode_cursor
+from . import format_latency, measure, seed_appointments
+
+
+def _sample_rows(count, rng):
+    """(cursor, email) pairs of random rows, i.e. at random page depths"""
+    last_id = Appointment.objects.order_by('-id').values_list('id', flat=True).first()
+    ids = [rng.randint(1, last_id) for _ in range(count)]
+    rows = Appointment.objects.filter(id__in=ids).values_list('created_at', 'id', 'email')
+    return [(encode_cursor(created_at, pk), email) for created_at, pk, email in rows]
+
+
+def _uncached_get(client, url):
+    """GET ``url`` past the listing cache, as in suite.cold_listing, so every
+    request runs the keyset query rather than timing a cache hit"""
+    def get(params=None):
+        bump_version()
+        return client.get(url, params)
+    return get
+
+
+def run(command, options):
+    client = Client()
+    get = _uncached_get(client, reverse('appointments:appointment-create'))
+    repeat = options['requests']
+    rng = random.Random(0)
+    seeded = 0
+
+    for rows in sorted(options['rows']):
+        command.stdout.write(f'Seeding {rows - seeded:,} appointments...')
+        seed_appointments(rows - seeded, offset=seeded)
+        seeded = rows
+
+        samples = _sample_rows(repeat, rng)
+        cursors = [cursor for cursor, _ in samples]
+        emails = [email for _, email in samples]
+        month = {
+            'date_from': (date.today() - timedelta(days=365)).isoformat(),
+            'date_to': (date.today() - timedelta(days=335)).isoformat(),
+        }
+        cases = [
+            ('first page', lambda i: get()),
+            ('deep page', lambda i: get({'cursor': cursors[i % len(cursors)]})),
+            ('status filter', lambda i: get({'status': 'pending', 'cursor': cursors[i % len(cursors)]})),
+            ('email filter', lambda i: get({'email': emails[i % len(emails)]})),
+            ('date range', lambda i: get(month)),
+        ]
+
+        for name, fn in cases:
+            latencies = measure(fn, repeat)
+            command.stdout.write(f'rows={rows:>10,}  {name:<14} {format_latency(latencies)}')
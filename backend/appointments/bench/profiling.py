@@ -0,0 +1,57 @@
+"""Cost of ProfilingMiddleware when it is idle and when it profiles every request"""
+import statistics
+import tempfile
+from django.conf import settings
+from django.test import Client, override_settings
+from django.urls import reverse
+from . import format_latency, measure, seed_appointments
+
+MIDDLEWARE = 'appointments.profiling.ProfilingMiddleware'
+
+
+# Cases take turns in this many rounds, so drift hits them all alike
+ROUNDS = 10
+
+
+def _client(url, overrides):
+    with override_settings(**overrides):
+        # The client builds its middleware chain on its first request
+        client = Client()
+        client.get(url)
+    return client
+
+
+def _interleaved(url, cases, repeat):
+    samples = {name: [] for name, _ in cases}
+    for _ in range(ROUNDS):
+        for name, overrides in cases:
+            client = _client(url, overrides)
+            with override_settings(**overrides):
+                samples[name].extend(measure(lambda i: client.get(url), repeat // ROUNDS))
+    return samples
+
+
+def run(command, options):
+    # A cached listing is about the cheapest request there is, so any
+    # middleware cost shows up in full
+    url = reverse('appointments:appointment-create')
+    repeat = max(options['requests'], 2000)
+    seed_appointments(1000)
+
+    without = [name for name in settings.MIDDLEWARE if name != MIDDLEWARE]
+    with tempfile.TemporaryDirectory() as directory:
+        cases = [
+            ('not installed', {'MIDDLEWARE': without}),
+            ('idle', {'APPOINTMENTS_PROFILE_RATE': 0.0}),
+            ('1% sampled', {'APPOINTMENTS_PROFILE_RATE': 0.01, 'APPOINTMENTS_PROFILE_DIR': directory}),
+            ('every request', {'APPOINTMENTS_PROFILE_RATE': 1.0, 'APPOINTMENTS_PROFILE_DIR': directory}),
+        ]
+        results = _interleaved(url, cases, repeat)
+
+    baseline = statistics.mean(results['not installed'])
+    for name, samples in results.items():
+        mean = statistics.mean(samples)
+        command.stdout.write(
+            f'{name:<14} {format_latency(samples)}  mean={mean * 1e6:8.1f}us  '
+            f'overhead={(mean - baseline) * 1e6:+8.1f}us ({(mean / baseline - 1) * 100:+5.1f}%)'
+        )
@@ -0,0 +1,61 @@
+"""Reminder throughput with a large backlog of upcoming appointments.
+
+Every seeded pending or confirmed appointment gets a reminder; about 10%
+of them are due. The scenario times the worker's sleep lookup
+(``next_due``) and drains the due reminders in batches through a sender
+that only counts them.
+"""
+import time
+from django.db import connection
+from django.db.models import F, Min
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from ..models import Appointment
+from ..reminders import ReminderSender, next_due, send_due
+from . import format_latency, measure, seed_appointments
+
+BATCH_SIZE = 200
+
+
+class CountingSender(ReminderSender):
+    def __init__(self):
+        self.sent = 0
+
+    def send(self, appointments):
+        self.sent += len(appointments)
+        return []
+
+
+def run(command, options):
+    seeded = 0
+    for rows in sorted(options['rows']):
+        seed_appointments(rows - seeded, offset=seeded)
+        seeded = rows
+        # Due at 90% of the way from each row's created_at to now, which
+        # makes the oldest 10% due
+        oldest = Appointment.objects.aggregate(oldest=Min('created_at'))['oldest']
+        Appointment.objects.filter(status__in=Appointment.REMINDED_STATUSES).update(
+            remind_at=F('created_at') + (timezone.now() - oldest) * 0.9
+        )
+        due = Appointment.objects.filter(remind_at__lte=timezone.now()).count()
+
+        samples = measure(lambda i: next_due(), options['requests'])
+        command.stdout.write(f'rows={rows:>10,}  next_due     {format_latency(samples)}')
+
+        sender = CountingSender()
+        batches = []
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as captured:
+            while True:
+                batch_started = time.perf_counter()
+                sent, _ = send_due(sender, BATCH_SIZE)
+                if not sent:
+                    break
+                batches.append(time.perf_counter() - batch_started)
+        elapsed = time.perf_counter() - started
+        queries = len(captured.captured_queries) / max(len(batches), 1)
+        command.stdout.write(
+            f'rows={rows:>10,}  send_due     {format_latency(batches)}  '
+            f'{sender.sent:,}/{due:,} due sent  {sender.sent / elapsed:>10,.0f} reminders/s  '
+            f'queries/batch={queries:4.1f}'
+        )
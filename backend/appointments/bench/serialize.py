@@ -0,0 +1,72 @@
+"""CPU time to fetch and encode one listing of many rows.
+
+Compares the old path (model instances, a dict built field by field,
+JsonResponse) with values_list rows encoded by ``serializers.dumps``, with
+and without orjson.
+"""
+import time
+from unittest import mock
+from django.http import JsonResponse
+from ..models import Appointment
+from .. import serializers
+from ..serializers import appointment_rows, appointment_values, dumps
+from . import seed_appointments
+
+REPEAT = 10
+
+
+def _model_listing(queryset):
+    return JsonResponse({
+        'success': True,
+        'appointments': [{
+            'id': appointment.id,
+            'name': appointment.name,
+            'email': appointment.email,
+            'phone': appointment.phone,
+            'date': appointment.date.strftime('%Y-%m-%d'),
+            'time': appointment.time,
+            'message': appointment.message,
+            'status': appointment.status,
+            'created_at': appointment.created_at.isoformat(),
+            'updated_at': appointment.updated_at.isoformat(),
+        } for appointment in queryset],
+    }).content
+
+
+def _values_listing(queryset):
+    return dumps({
+        'success': True,
+        'appointments': appointment_rows(appointment_values(queryset)),
+    })
+
+
+def _cpu_per_listing(fn, queryset):
+    # A fresh clone per call: iterating one queryset twice would reuse its
+    # result cache and leave the fetch out of the measurement
+    fn(queryset.all())
+    started = time.process_time()
+    for _ in range(REPEAT):
+        fn(queryset.all())
+    return (time.process_time() - started) / REPEAT
+
+
+def run(command, options):
+    seeded = 0
+    for rows in sorted(options['rows']):
+        seed_appointments(rows - seeded, offset=seeded)
+        seeded = rows
+        queryset = Appointment.objects.order_by('-created_at', '-id')[:rows]
+
+        baseline = _cpu_per_listing(_model_listing, queryset)
+        cases = [('model instances', baseline)]
+        if serializers.orjson is not None:
+            cases.append(('values + orjson', _cpu_per_listing(_values_listing, queryset)))
+        with mock.patch.object(serializers, 'orjson', None):
+            cases.append(('values + json', _cpu_per_listing(_values_listing, queryset)))
+        # Lower bound: the query and the driver's row fetch alone
+        cases.append(('fetch only', _cpu_per_listing(lambda qs: list(appointment_values(qs)), queryset)))
+
+        for name, seconds in cases:
+            command.stdout.write(
+                f'rows={rows:>8,}  {name:<16} {seconds * 1000:8.1f}ms CPU  {baseline / seconds:5.1f}x'
+            )
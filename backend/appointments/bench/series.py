@@ -0,0 +1,77 @@
+"""Expansion of recurring series over a read window.
+
+``--rows`` counts series here. Each is weekly (a few daily) for up to a
+year around today, and about 1% of the occurrences in the window are
+stored as exceptions. The scenario times a 3-month expansion into slots,
+from the cached rules (availability) and from the table, into listing
+rows, and a 62-day availability response.
+"""
+import random
+from datetime import date, timedelta
+from ..availability import free_slots
+from ..cache import get_cache
+from ..models import Appointment, AppointmentSeries
+from ..series import LISTING_WINDOW_DAYS, RULES_KEY, occurrence_counts, occurrence_rows, series_slots
+from . import TIMES, format_latency, measure
+
+BATCH_SIZE = 5000
+
+
+def seed_series(count, offset=0, seed=0):
+    rng = random.Random(seed + offset)
+    today = date.today()
+    batch = []
+    for i in range(offset, offset + count):
+        starts_on = today - timedelta(days=rng.randrange(180))
+        batch.append(AppointmentSeries(
+            name=f'Patient {i}', email=f'patient{i}@example.com', phone=f'+9198{i:08d}',
+            time=rng.choice(TIMES), start_minute=0,
+            frequency='daily' if rng.random() < 0.05 else 'weekly', interval=rng.choice([1, 1, 2]),
+            starts_on=starts_on, ends_on=starts_on + timedelta(days=rng.randrange(30, 366)),
+        ))
+        if len(batch) == BATCH_SIZE:
+            AppointmentSeries.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        AppointmentSeries.objects.bulk_create(batch)
+
+
+def seed_exceptions(start, end, share=0.01, seed=0):
+    """Store ``share`` of the occurrences in the window as cancelled rows"""
+    rng = random.Random(seed)
+    names = dict(AppointmentSeries.objects.values_list('id', 'name'))
+    exceptions = [
+        Appointment(
+            name=names[row['series_id']], email='x@example.com', phone='1', date=row['date'],
+            time=row['time'], status='cancelled', series_id=row['series_id'], occurrence_date=row['date'],
+        )
+        for row in occurrence_rows(start, end) if rng.random() < share
+    ]
+    Appointment.objects.bulk_create(exceptions, batch_size=BATCH_SIZE)
+    return len(exceptions)
+
+
+def run(command, options):
+    start = date.today()
+    end = start + timedelta(days=LISTING_WINDOW_DAYS - 1)
+    seeded = 0
+    for rows in sorted(options['rows']):
+        seed_series(rows - seeded, offset=seeded)
+        seeded = rows
+        Appointment.objects.filter(series__isnull=False).delete()
+        stored = seed_exceptions(start, end)
+        # bulk_create sends no signals to clear the cached rules
+        get_cache().delete(RULES_KEY)
+        occurrences = sum(occurrence_counts(start, end).values())
+
+        samples = measure(lambda i: series_slots(start, end, cached=True), options['requests'])
+        command.stdout.write(
+            f'series={rows:>9,}  slots 92d    {format_latency(samples)}  '
+            f'{occurrences:,} occurrences, {stored:,} stored'
+        )
+        samples = measure(lambda i: series_slots(start, end), options['requests'])
+        command.stdout.write(f'series={rows:>9,}  uncached     {format_latency(samples)}')
+        samples = measure(lambda i: occurrence_rows(start, end), options['requests'])
+        command.stdout.write(f'series={rows:>9,}  rows 92d     {format_latency(samples)}')
+        samples = measure(lambda i: free_slots(start, start + timedelta(days=61)), options['requests'])
+        command.stdout.write(f'series={rows:>9,}  availability {format_latency(samples)}')
@@ -0,0 +1,117 @@
+"""Regression suite over the main API paths, with JSON output.
+
+For each table size it drives the booking views, the listing (cold and
+cached) and the admin changelist through the test client, and records
+throughput, p50/p95/p99 latency, queries per request and failed requests.
+``--json`` writes the report so runs can be diffed across commits.
+"""
+import json
+import platform
+import subprocess
+import time
+import django
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from ..cache import bump_version
+from . import format_latency, latency_summary, peak_rss_mb, seed_appointments
+from .http_load import booking_payloads
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure_case(fn, repeat):
+    """Run ``fn`` ``repeat`` times; latency, throughput and queries per call"""
+    samples, queries, failed = [], [], 0
+    started = time.perf_counter()
+    for i in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            call_started = time.perf_counter()
+            response = fn(i)
+            samples.append(time.perf_counter() - call_started)
+        queries.append(len(captured.captured_queries))
+        if response.status_code >= 400:
+            failed += 1
+    elapsed = time.perf_counter() - started
+    return samples, {
+        'requests': repeat,
+        'failed': failed,
+        'throughput_rps': round(repeat / elapsed, 1),
+        **latency_summary(samples),
+        'queries_avg': round(sum(queries) / repeat, 2),
+        'queries_max': max(queries),
+    }
+
+
+def _cases(client, admin_client, payloads):
+    create_url = reverse('appointments:appointment-create')
+    alt_url = reverse('appointments:appointment-create-alt')
+    changelist_url = reverse('admin:appointments_appointment_changelist')
+
+    def post(url):
+        return lambda i: client.post(url, json.dumps(next(payloads)), content_type='application/json')
+
+    def cold_listing(params=None):
+        def get(i):
+            bump_version()
+            return client.get(create_url, params)
+        return get
+
+    return [
+        ('create POST', post(create_url)),
+        ('create_appointment', post(alt_url)),
+        ('listing GET cold', cold_listing()),
+        ('listing GET cached', lambda i: client.get(create_url)),
+        ('listing status cold', cold_listing({'status': 'pending'})),
+        ('admin changelist', lambda i: admin_client.get(changelist_url)),
+    ]
+
+
+def run(command, options):
+    client = Client()
+    admin_client = Client()
+    admin = get_user_model().objects.create_superuser('bench', 'bench@example.com', 'bench')
+    admin_client.force_login(admin)
+    repeat = options['requests']
+    payloads = booking_payloads()
+
+    report = {
+        'commit': _commit(),
+        'database': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'requests_per_case': repeat,
+        'results': [],
+    }
+    seeded = 0
+    for rows in sorted(options['rows']):
+        command.stdout.write(f'Seeding {rows - seeded:,} appointments...')
+        started = time.perf_counter()
+        seed_appointments(rows - seeded, offset=seeded)
+        command.stdout.write(f'  {(rows - seeded) / (time.perf_counter() - started):,.0f} rows/s')
+        seeded = rows
+
+        for name, fn in _cases(client, admin_client, payloads):
+            samples, result = measure_case(fn, repeat)
+            report['results'].append({'rows': rows, 'case': name, **result})
+            command.stdout.write(
+                f'rows={rows:>10,}  {name:<20} {result["throughput_rps"]:>8,.0f} req/s  '
+                f'{format_latency(samples)}  queries={result["queries_avg"]:5.1f}'
+                + (f'  failed={result["failed"]}' if result['failed'] else '')
+            )
+
+    report['peak_rss_mb'] = round(peak_rss_mb(), 1)
+    command.stdout.write(f'peak RSS {report["peak_rss_mb"]:.1f} MiB')
+    if options.get('json'):
+        with open(options['json'], 'w') as out:
+            json.dump(report, out, indent=2)
+        command.stdout.write(f'Wrote {options["json"]}')
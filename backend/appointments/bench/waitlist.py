@@ -0,0 +1,74 @@
+"""Offering freed slots to the waitlist.
+
+``--rows`` counts waitlist entries here. Each waits for 1 to 14 days
+within the next two months, for a morning, afternoon or daytime window.
+The scenario times ``offer_slot`` for a freed slot that someone's window
+fits (the usual case: hold, claim, outbox message) and for a late evening
+slot nobody waits for, which reads the whole queue of its day.
+"""
+import random
+from datetime import date, timedelta
+from ..holds import get_hold_cache
+from ..models import WaitlistDay, WaitlistEntry
+from ..slots import parse_time_of_day
+from ..waitlist import entry_days, offer_slot
+from . import TIMES, format_latency, measure
+
+BATCH_SIZE = 5000
+HORIZON_DAYS = 60
+# (earliest, latest) start minutes
+WINDOWS = [(9 * 60, 12 * 60), (13 * 60, 17 * 60), (9 * 60, 17 * 60)]
+# Start minute no entry's window reaches
+UNWANTED_MINUTE = 23 * 60
+
+
+def seed_waitlist(count, offset=0, seed=0):
+    rng = random.Random(seed + offset)
+    today = date.today()
+    batch = []
+
+    def flush():
+        WaitlistEntry.objects.bulk_create(batch)
+        days = [day for entry in batch for day in entry_days(entry)]
+        WaitlistDay.objects.bulk_create(days, batch_size=BATCH_SIZE)
+        batch.clear()
+
+    for i in range(offset, offset + count):
+        date_from = today + timedelta(days=1 + rng.randrange(HORIZON_DAYS))
+        earliest, latest = rng.choice(WINDOWS)
+        batch.append(WaitlistEntry(
+            name=f'Patient {i}', email=f'patient{i}@example.com', phone=f'+9198{i:08d}',
+            date_from=date_from, date_to=date_from + timedelta(days=rng.randrange(14)),
+            earliest_minute=earliest, latest_minute=latest,
+        ))
+        if len(batch) == BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+
+
+def run(command, options):
+    today = date.today()
+    slots = [
+        (today + timedelta(days=day), parse_time_of_day(time))
+        for day in range(1, HORIZON_DAYS + 1) for time in TIMES
+    ]
+    random.Random(0).shuffle(slots)
+    seeded = 0
+    for rows in sorted(options['rows']):
+        seed_waitlist(rows - seeded, offset=seeded)
+        seeded = rows
+        requests = min(options['requests'], len(slots))
+        # Drop the holds the previous step placed
+        get_hold_cache().clear()
+
+        samples = measure(lambda i: offer_slot(*slots[i]), requests)
+        offered = WaitlistEntry.objects.filter(status='offered').count()
+        command.stdout.write(
+            f'waitlist={rows:>9,}  offer        {format_latency(samples)}  '
+            f'{offered:,} offered, {WaitlistDay.objects.count():,} day rows'
+        )
+        samples = measure(
+            lambda i: offer_slot(today + timedelta(days=1 + i % HORIZON_DAYS), UNWANTED_MINUTE), requests,
+        )
+        command.stdout.write(f'waitlist={rows:>9,}  no match     {format_latency(samples)}')
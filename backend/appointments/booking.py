@@ -0,0 +1,307 @@
+from datetime import date, datetime, timedelta
+from django.db import IntegrityError, transaction
+from .availability import clinic_schedule, is_bookable, lock_days, slot_taken
+from .holds import held_by_other, parse_token, place_hold, release_hold
+from .models import Appointment, AppointmentSeries
+from .outbox import enqueue_confirmations
+from .patients import link_patients, normalize_phone
+from .series import MAX_SERIES_DAYS, series_conflict, series_slots
+from .signals import publish_freed_slots
+from .slots import parse_time_of_day
+from .waitlist import MAX_WAITLIST_DAYS
+
+REQUIRED_FIELDS = ['name', 'email', 'phone', 'date', 'time']
+INVALID_TIME = 'Invalid time format. Use HH:MM or H:MM AM/PM'
+SLOT_TAKEN = 'This time slot is already booked'
+SLOT_HELD = 'This time slot is being held by another patient, please try again in a few minutes'
+# Clashing dates named in the error when a new series does not fit
+MAX_REPORTED_DATES = 5
+
+
+class BookingError(Exception):
+    """A booking request that cannot be accepted, with its HTTP status"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def parse_booking(data):
+    """Validate a booking payload and return the Appointment field values"""
+    # Validate required fields (removed 'reason' from required fields)
+    for field in REQUIRED_FIELDS:
+        if not data.get(field):
+            raise BookingError(f'{field} is required')
+    # JSON numbers or lists would reach string parsing below
+    for field in REQUIRED_FIELDS + ['message']:
+        if data.get(field) is not None and not isinstance(data[field], str):
+            raise BookingError(f'{field} must be a string')
+
+    # Validate date format
+    try:
+        appointment_date = datetime.strptime(data['date'], '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise BookingError('Invalid date format. Use YYYY-MM-DD')
+
+    if parse_time_of_day(data['time']) is None:
+        raise BookingError(INVALID_TIME)
+
+    if normalize_phone(data['phone']) is None:
+        raise BookingError('Invalid phone number')
+
+    return {
+        'name': data['name'],
+        'email': data['email'],
+        'phone': data['phone'],
+        'date': appointment_date,
+        'time': data['time'],
+        'message': data.get('message', ''),
+    }
+
+
+def check_clinic_hours(schedule, fields):
+    """Reject a clock time that does not start a slot on that day"""
+    start_minute = parse_time_of_day(fields['time'])
+    if start_minute is not None and not is_bookable(schedule, fields['date'], start_minute):
+        raise BookingError('Selected time is outside clinic hours')
+
+
+def book_appointment(fields, confirm=True):
+    """Upsert the patient, insert the appointment and queue its confirmation
+    (unless ``confirm`` is false); the unique slot constraint rejects a
+    concurrent second booking of the same slot"""
+    try:
+        with transaction.atomic():
+            appointment = Appointment(**fields)
+            link_patients([appointment])
+            appointment.save(force_insert=True)
+            # Checked after the insert: the post_save occupancy refresh holds
+            # the day's lock by now, which create_series takes as well, so a
+            # series created concurrently is either visible here or sees
+            # this booking
+            if appointment.start_minute is not None and appointment.status != 'cancelled':
+                day = Appointment._meta.get_field('date').to_python(appointment.date)
+                if series_conflict(day, appointment.start_minute):
+                    raise BookingError(SLOT_TAKEN, status=409)
+            if confirm:
+                enqueue_confirmations([appointment])
+            return appointment
+    except IntegrityError:
+        raise BookingError(SLOT_TAKEN, status=409)
+
+
+def check_hold(fields, token=None):
+    """Reject a slot someone holds, unless ``token`` is that hold"""
+    if token is not None:
+        try:
+            parse_token(token)
+        except ValueError as e:
+            raise BookingError(str(e))
+    start_minute = parse_time_of_day(fields['time'])
+    if start_minute is not None and held_by_other(fields['date'], start_minute, token):
+        raise BookingError(SLOT_HELD, status=409)
+
+
+def validate_booking(data):
+    """Parse ``data`` and check it against clinic hours and slot holds"""
+    fields = parse_booking(data)
+    check_clinic_hours(clinic_schedule(), fields)
+    check_hold(fields, data.get('hold'))
+    return fields
+
+
+def create_booking(data):
+    """Validate ``data`` and book it, releasing the hold it was made under"""
+    appointment = book_appointment(validate_booking(data))
+    if data.get('hold'):
+        release_hold(data['hold'])
+    return appointment
+
+
+def hold_slot(data):
+    """Hold the free slot at ``data``'s date and time; returns (token, expires_at)"""
+    for field in ('date', 'time'):
+        if not data.get(field):
+            raise BookingError(f'{field} is required')
+    try:
+        day = datetime.strptime(data['date'], '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise BookingError('Invalid date format. Use YYYY-MM-DD')
+    start_minute = parse_time_of_day(data['time'])
+    if start_minute is None:
+        raise BookingError(INVALID_TIME)
+    if not is_bookable(clinic_schedule(), day, start_minute):
+        raise BookingError('Selected time is outside clinic hours')
+    if slot_taken(day, start_minute):
+        raise BookingError(SLOT_TAKEN, status=409)
+    hold = place_hold(day, start_minute)
+    if hold is None:
+        raise BookingError(SLOT_HELD, status=409)
+    return hold
+
+
+def _positive_int(data, name, default=None):
+    value = data.get(name, default)
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise BookingError(f'{name} must be a positive whole number')
+    return value
+
+
+def parse_series(data):
+    """Validate a series payload (a booking plus ``frequency``, ``interval``
+    and ``count`` or ``until``) and return the AppointmentSeries field values"""
+    fields = parse_booking(data)
+    frequency = data.get('frequency', 'weekly')
+    if frequency not in AppointmentSeries.FREQUENCY_DAYS:
+        raise BookingError(f'frequency must be one of: {", ".join(AppointmentSeries.FREQUENCY_DAYS)}')
+    interval = _positive_int(data, 'interval', 1)
+    starts_on = fields.pop('date')
+
+    if data.get('count') is not None:
+        step = AppointmentSeries.FREQUENCY_DAYS[frequency] * interval
+        ends_on = starts_on + timedelta(days=step * (_positive_int(data, 'count') - 1))
+    elif data.get('until'):
+        try:
+            ends_on = datetime.strptime(data['until'], '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            raise BookingError('Invalid until. Use YYYY-MM-DD')
+        if ends_on < starts_on:
+            raise BookingError('until must not be before date')
+    else:
+        raise BookingError('count or until is required')
+    if (ends_on - starts_on).days >= MAX_SERIES_DAYS:
+        raise BookingError(f'A series can span at most {MAX_SERIES_DAYS} days')
+
+    return {
+        **fields, 'frequency': frequency, 'interval': interval,
+        'starts_on': starts_on, 'ends_on': ends_on,
+    }
+
+
+def create_series(data):
+    """Validate ``data`` and store the series, if every occurrence is a free
+    slot within clinic hours. Writes one row however many occurrences."""
+    series = AppointmentSeries(**parse_series(data))
+    minute = parse_time_of_day(series.time)
+    dates = series.dates()
+    schedule = clinic_schedule()
+    closed = next((day for day in dates if not is_bookable(schedule, day, minute)), None)
+    if closed is not None:
+        raise BookingError(f'Selected time is outside clinic hours on {closed.isoformat()}')
+
+    with transaction.atomic():
+        # The locks bookings of these days hold while checking for series
+        lock_days(dates)
+        taken = set(
+            Appointment.objects
+            .filter(date__in=dates, start_minute=minute)
+            .exclude(status='cancelled')
+            .values_list('date', flat=True)
+        )
+        taken.update(
+            day for day in series_slots(series.starts_on, series.ends_on, minute)
+            if series.occurs_on(day)
+        )
+        if taken:
+            taken = sorted(taken)
+            listed = ', '.join(day.isoformat() for day in taken[:MAX_REPORTED_DATES])
+            more = len(taken) - MAX_REPORTED_DATES
+            if more > 0:
+                listed += f' and {more} more dates'
+            raise BookingError(f'{SLOT_TAKEN} on {listed}', status=409)
+        link_patients([series])
+        series.save()
+    return series
+
+
+def _parse_day(data, name):
+    try:
+        return datetime.strptime(data[name], '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise BookingError(f'Invalid {name}. Use YYYY-MM-DD')
+
+
+def parse_waitlist(data):
+    """Validate a waitlist payload (contact details, ``date_from``,
+    ``date_to`` and optional ``earliest_time``/``latest_time``) and return
+    the WaitlistEntry field values"""
+    for field in ('name', 'email', 'phone', 'date_from', 'date_to'):
+        if not data.get(field):
+            raise BookingError(f'{field} is required')
+    if normalize_phone(data['phone']) is None:
+        raise BookingError('Invalid phone number')
+
+    date_from = _parse_day(data, 'date_from')
+    date_to = _parse_day(data, 'date_to')
+    if date_to < date_from:
+        raise BookingError('date_to must not be before date_from')
+    if date_to < date.today():
+        raise BookingError('date_to is in the past')
+    if (date_to - date_from).days >= MAX_WAITLIST_DAYS:
+        raise BookingError(f'The waitlist covers at most {MAX_WAITLIST_DAYS} days')
+
+    window = {}
+    for name, field, default in (
+        ('earliest_time', 'earliest_minute', 0), ('latest_time', 'latest_minute', 24 * 60 - 1),
+    ):
+        window[field] = parse_time_of_day(data[name]) if data.get(name) else default
+        if window[field] is None:
+            raise BookingError(INVALID_TIME)
+    if window['earliest_minute'] > window['latest_minute']:
+        raise BookingError('earliest_time must not be after latest_time')
+
+    return {
+        'name': data['name'], 'email': data['email'], 'phone': data['phone'],
+        'date_from': date_from, 'date_to': date_to, **window,
+    }
+
+
+def materialize_occurrence(series_id, occurrence_date, data):
+    """Store one occurrence of a series as an appointment with the ``date``,
+    ``time`` and/or ``status`` change in ``data``; expansion skips it from
+    then on"""
+    changes = {name: data[name] for name in ('date', 'time', 'status') if data.get(name)}
+    if not changes:
+        raise BookingError('date, time or status is required')
+
+    with transaction.atomic():
+        # The series row lock keeps two requests from storing one occurrence twice
+        series = AppointmentSeries.objects.select_for_update().filter(id=series_id).first()
+        if series is None or not series.occurs_on(occurrence_date):
+            raise BookingError('Occurrence not found', status=404)
+        stored = (
+            Appointment.objects.filter(series_id=series_id, occurrence_date=occurrence_date)
+            .values_list('id', flat=True).first()
+        )
+        if stored is not None:
+            raise BookingError(
+                f'This occurrence is already appointment {stored}; change that instead', status=409,
+            )
+
+        fields = {
+            'name': series.name, 'email': series.email, 'phone': series.phone,
+            'date': occurrence_date, 'time': series.time, 'message': series.message,
+            'status': series.status, 'series_id': series.id, 'occurrence_date': occurrence_date,
+        }
+        if 'date' in changes:
+            try:
+                fields['date'] = datetime.strptime(changes['date'], '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                raise BookingError('Invalid date format. Use YYYY-MM-DD')
+        if 'time' in changes:
+            if parse_time_of_day(changes['time']) is None:
+                raise BookingError(INVALID_TIME)
+            fields['time'] = changes['time']
+        if 'status' in changes:
+            if changes['status'] not in dict(Appointment.STATUS_CHOICES):
+                raise BookingError(f'Invalid status: {changes["status"]}')
+            fields['status'] = changes['status']
+        if 'date' in changes or 'time' in changes:
+            check_clinic_hours(clinic_schedule(), fields)
+        appointment = book_appointment(fields, confirm=False)
+        if appointment.status == 'cancelled' or (fields['date'], appointment.start_minute) != (
+            occurrence_date, series.start_minute,
+        ):
+            publish_freed_slots([(occurrence_date, series.start_minute)])
+        return appointment
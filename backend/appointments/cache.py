@@ -0,0 +1,105 @@
+"""Versioned cache for appointment listing responses.
+
+Entries are keyed by the request's query parameters plus a global
+appointments version. Any write bumps the version, which orphans every
+cached listing at once; orphans simply expire. The version lives in the
+same cache and may be evicted with the listings, so a missing version
+restarts from the clock in nanoseconds rather than from 1: it always
+exceeds every version handed out before, and an old listing is never
+served again. The backend is the ``APPOINTMENTS_CACHE`` alias in
+``CACHES``: local memory by default, or Redis so that all worker
+processes share the version and the counters.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import caches
+
+VERSION_KEY = 'appointments:version'
+HITS_KEY = 'appointments:listing:hits'
+MISSES_KEY = 'appointments:listing:misses'
+
+
+def get_cache():
+    return caches[settings.APPOINTMENTS_CACHE]
+
+
+def _listing_key(params, version):
+    query = urlencode(sorted((key, value) for key in params for value in params.getlist(key)))
+    digest = hashlib.sha1(query.encode()).hexdigest()
+    return f'appointments:listing:{version}:{digest}'
+
+
+def _count(cache, key):
+    # add() is a no-op if the counter exists, so incr() never misses it
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def bump_version():
+    """Invalidate every cached listing"""
+    cache = get_cache()
+    cache.add(VERSION_KEY, time.time_ns(), None)
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        pass
+
+
+def listing_key(params):
+    cache = get_cache()
+    return _listing_key(params, cache.get_or_set(VERSION_KEY, time.time_ns, None))
+
+
+def get_listing(key):
+    """Cached response body for ``key``, counting the hit or miss"""
+    cache = get_cache()
+    content = cache.get(key)
+    _count(cache, MISSES_KEY if content is None else HITS_KEY)
+    return content
+
+
+def set_listing(key, content):
+    get_cache().set(key, content, settings.APPOINTMENTS_CACHE_TIMEOUT)
+
+
+async def alisting_key(params):
+    cache = get_cache()
+    return _listing_key(params, await cache.aget_or_set(VERSION_KEY, time.time_ns, None))
+
+
+async def aget_listing(key):
+    cache = get_cache()
+    content = await cache.aget(key)
+    counter = MISSES_KEY if content is None else HITS_KEY
+    await cache.aadd(counter, 0, None)
+    try:
+        await cache.aincr(counter)
+    except ValueError:
+        pass
+    return content
+
+
+async def aset_listing(key, content):
+    await get_cache().aset(key, content, settings.APPOINTMENTS_CACHE_TIMEOUT)
+
+
+def stats():
+    """Hit/miss counters of the listing cache since they were last reset"""
+    cache = get_cache()
+    values = cache.get_many([VERSION_KEY, HITS_KEY, MISSES_KEY])
+    hits, misses = values.get(HITS_KEY, 0), values.get(MISSES_KEY, 0)
+    return {
+        'version': values.get(VERSION_KEY, 1),
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / (hits + misses) if hits + misses else None,
+    }
+
+
+def reset_stats():
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,98 @@
+"""Streaming CSV/NDJSON export of appointments.
+
+Rows are read as plain tuples through ``QuerySet.iterator()``, which uses a
+server-side cursor on PostgreSQL, and rendered into output chunks of about
+``BUFFER_BYTES``. Nothing holds more than one fetch of rows at a time, so
+memory stays flat however many rows are exported, and the first bytes go
+out as soon as the first fetch returns. Series occurrences of a bounded
+date window follow the stored rows.
+"""
+import csv
+import json
+import zlib
+from itertools import chain
+from .models import Appointment
+from .serializers import ROW_FIELDS as FIELDS, appointment_values
+
+FORMATS = ('csv', 'ndjson')
+# Rows fetched per round trip from the server-side cursor
+DEFAULT_CHUNK_SIZE = 2000
+# Rendered output is handed on in pieces of about this size
+BUFFER_BYTES = 64 * 1024
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class _Line:
+    """File-like target that hands csv.writer's output straight back"""
+
+    def write(self, value):
+        return value
+
+
+def _plain(row):
+    return tuple(value.isoformat() if hasattr(value, 'isoformat') else value for value in row)
+
+
+def export_rows(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield each appointment as a tuple of JSON-friendly values, in id order"""
+    rows = appointment_values(queryset.order_by('id')).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield _plain(row)
+
+
+def render_csv(rows):
+    writer = csv.writer(_Line())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def render_ndjson(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(FIELDS, row))) + '\n'
+
+
+def _buffered(lines):
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= BUFFER_BYTES:
+            yield ''.join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_appointments(queryset=None, fmt='csv', compress=False, chunk_size=DEFAULT_CHUNK_SIZE,
+                        occurrences=None):
+    """Yield the export of ``queryset`` (default: every appointment) as bytes,
+    followed by ``occurrences`` (series occurrence rows, see series.py)"""
+    if fmt not in FORMATS:
+        raise ValueError(f'Unsupported format: {fmt}')
+    if queryset is None:
+        queryset = Appointment.objects.all()
+
+    rows = export_rows(queryset, chunk_size)
+    if occurrences:
+        rows = chain(rows, (_plain(row[field] for field in FIELDS) for row in occurrences))
+    render = render_csv if fmt == 'csv' else render_ndjson
+    chunks = _buffered(render(rows))
+    return _gzipped(chunks) if compress else chunks
+
+
+def export_filename(fmt, compress=False):
+    return f'appointments.{fmt}' + ('.gz' if compress else '')
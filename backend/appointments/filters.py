@@ -0,0 +1,58 @@
+from datetime import date, datetime, timedelta
+from django.conf import settings
+from .models import Appointment
+
+
+def parse_date(value, param):
+    """Parse a YYYY-MM-DD query parameter"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'Invalid {param}. Use YYYY-MM-DD')
+
+
+def filter_appointments(queryset, params):
+    """Apply the server-side listing filters from the query string.
+
+    Supported parameters: ``date_from``/``date_to`` (inclusive appointment
+    date range), ``status`` (comma separated), ``email`` and ``phone``
+    (exact match). Raises ``ValueError`` with a client-facing message when a
+    parameter is malformed.
+    """
+    if params.get('date_from'):
+        queryset = queryset.filter(date__gte=parse_date(params['date_from'], 'date_from'))
+    if params.get('date_to'):
+        queryset = queryset.filter(date__lte=parse_date(params['date_to'], 'date_to'))
+
+    if params.get('status'):
+        statuses = [s for s in params['status'].split(',') if s]
+        valid = {choice for choice, _ in Appointment.STATUS_CHOICES}
+        unknown = [s for s in statuses if s not in valid]
+        if unknown:
+            raise ValueError(f'Invalid status: {", ".join(unknown)}')
+        if len(statuses) == 1:
+            queryset = queryset.filter(status=statuses[0])
+        else:
+            queryset = queryset.filter(status__in=statuses)
+
+    if params.get('email'):
+        queryset = queryset.filter(email=params['email'].strip())
+    if params.get('phone'):
+        queryset = queryset.filter(phone=params['phone'].strip())
+
+    return queryset
+
+
+def listing_appointments(params):
+    """Appointments for the listing endpoints, filtered by ``params``.
+
+    Without ``date_from`` or ``date_to`` the listing starts
+    APPOINTMENTS_LISTING_DAYS ago: sorted by ``created_at``, it would
+    otherwise read every monthly partition of the table on PostgreSQL.
+    """
+    queryset = filter_appointments(Appointment.objects.all(), params)
+    if not params.get('date_from') and not params.get('date_to'):
+        queryset = queryset.filter(
+            date__gte=date.today() - timedelta(days=settings.APPOINTMENTS_LISTING_DAYS)
+        )
+    return queryset
@@ -0,0 +1,77 @@
+"""Short-lived slot holds while a patient fills in the booking form.
+
+A hold is one key per slot in the ``APPOINTMENTS_HOLD_CACHE`` store,
+written with ``cache.add()`` and a timeout of APPOINTMENTS_HOLD_MINUTES.
+``add`` only writes a missing key (``SET NX PX`` on Redis), so of several
+patients asking for one slot exactly one gets it. An expired hold
+disappears with its key, and nothing has to sweep it up. The store is not
+the listing cache: a hold must never be evicted to make room. The default
+is local memory without a size limit, which each worker process has to
+itself; run several processes against a Redis that does not evict
+(APPOINTMENTS_HOLD_CACHE_URL, ``maxmemory-policy noeviction``) so they all
+see the same holds.
+
+The hold token names its slot, so it can be handed back on its own to
+book or release the slot.
+"""
+import secrets
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+HOLD_PREFIX = 'appointments:hold'
+
+
+def get_hold_cache():
+    return caches[settings.APPOINTMENTS_HOLD_CACHE]
+
+
+def hold_key(day, minute):
+    return f'{HOLD_PREFIX}:{day.isoformat()}:{minute}'
+
+
+def parse_token(token):
+    """(date, minute) a hold token is for; raises ValueError for anything else"""
+    try:
+        day, minute, _ = token.split('.', 2)
+        return date.fromisoformat(day), int(minute)
+    except (AttributeError, ValueError):
+        raise ValueError('Invalid hold')
+
+
+def place_hold(day, minute, minutes=None):
+    """Hold the slot for ``minutes`` (APPOINTMENTS_HOLD_MINUTES); returns
+    (token, expires_at), or None if someone else holds it"""
+    token = f'{day.isoformat()}.{minute}.{secrets.token_urlsafe(16)}'
+    seconds = (settings.APPOINTMENTS_HOLD_MINUTES if minutes is None else minutes) * 60
+    if not get_hold_cache().add(hold_key(day, minute), token, seconds):
+        return None
+    return token, timezone.now() + timedelta(seconds=seconds)
+
+
+def holder(day, minute):
+    """Token of the current hold on the slot, or None"""
+    return get_hold_cache().get(hold_key(day, minute))
+
+
+def held_by_other(day, minute, token=None):
+    """Whether a hold other than ``token`` is on the slot"""
+    current = holder(day, minute)
+    return current is not None and current != token
+
+
+def release_hold(token):
+    """Drop the hold ``token``, if it is still the slot's hold; returns whether it was"""
+    day, minute = parse_token(token)
+    # Not atomic, but the key only changes hands once this hold has expired
+    if holder(day, minute) != token:
+        return False
+    get_hold_cache().delete(hold_key(day, minute))
+    return True
+
+
+def held_slots(slots):
+    """The (date, minute) pairs of ``slots`` someone holds, in one cache read"""
+    keys = {hold_key(day, minute): (day, minute) for day, minute in slots}
+    return {keys[key] for key in get_hold_cache().get_many(list(keys))}
@@ -0,0 +1,317 @@
+"""Idempotency-Key support for the appointment create endpoints.
+
+The first request with a given key runs the view and stores its response;
+repeats within the TTL replay that response without running the view
+again. A duplicate that arrives while the first is still running waits
+for it, so concurrent retries insert one appointment between them. Async
+views wait on the event loop (``abegin``), never on the one thread that
+``sync_to_async`` shares with the request they are waiting for.
+"""
+import asyncio
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+from datetime import timedelta
+from functools import lru_cache, wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# How long a duplicate waits for the first request before giving up with 409
+WAIT_SECONDS = 10
+# How often a waiting duplicate checks the key again
+POLL_SECONDS = 0.05
+
+
+class KeyInProgress(Exception):
+    """The first request with this key has not finished yet"""
+
+
+class KeyReused(Exception):
+    """The key was already used for a different request body"""
+
+
+class StoredResponse:
+    def __init__(self, status_code, content_type, content):
+        self.status_code = status_code
+        self.content_type = content_type
+        self.content = content
+
+
+class _Entry:
+    def __init__(self, fingerprint, expires_at):
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.response = None
+        self.done = threading.Event()
+
+
+class _Store:
+    """Waiting for a key on top of the stores' non-blocking ``attempt``.
+
+    ``attempt(key, fingerprint)`` claims the key and returns (True, None),
+    or returns (False, stored response or None while the first request is
+    still running), or raises KeyReused.
+    """
+
+    def begin(self, key, fingerprint):
+        """Claim ``key``; returns None to the claimant, else the stored response"""
+        deadline = time.monotonic() + WAIT_SECONDS
+        while True:
+            claimed, stored = self.attempt(key, fingerprint)
+            if claimed:
+                return None
+            if stored is not None:
+                return stored
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise KeyInProgress
+            self.wait(key, remaining)
+
+    async def abegin(self, key, fingerprint):
+        """``begin`` for async views: waits on the event loop, not in a thread"""
+        deadline = time.monotonic() + WAIT_SECONDS
+        while True:
+            claimed, stored = await sync_to_async(self.attempt)(key, fingerprint)
+            if claimed:
+                return None
+            if stored is not None:
+                return stored
+            if time.monotonic() >= deadline:
+                raise KeyInProgress
+            await asyncio.sleep(POLL_SECONDS)
+
+    def wait(self, key, timeout):
+        time.sleep(min(timeout, POLL_SECONDS))
+
+
+class MemoryIdempotencyStore(_Store):
+    """Per-process store bounded to ``max_keys``, evicting least recently used.
+
+    Only correct for a single worker process; use the database store when
+    several processes serve the create endpoints. Keys still in progress are
+    never evicted, so the store may briefly exceed ``max_keys`` by the
+    number of requests running at once.
+    """
+
+    def __init__(self, ttl, max_keys):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def attempt(self, key, fingerprint):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._entries[key] = _Entry(fingerprint, now + self.ttl)
+                self._evict()
+                return True, None
+            self._entries.move_to_end(key)
+
+        if entry.fingerprint != fingerprint:
+            raise KeyReused
+        # None while running; a released entry is gone, so the next attempt claims it
+        return False, entry.response
+
+    def _evict(self):
+        excess = len(self._entries) - self.max_keys
+        if excess > 0:
+            finished = (key for key, entry in self._entries.items() if entry.done.is_set())
+            for key in list(islice(finished, excess)):
+                del self._entries[key]
+
+    def wait(self, key, timeout):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            entry.done.wait(timeout)
+
+    def complete(self, key, response):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            entry.response = response
+            entry.done.set()
+
+    def release(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry.done.set()
+
+
+class DatabaseIdempotencyStore(_Store):
+    """Store backed by the idempotency_keys table, shared by all processes.
+
+    The primary key insert is the claim, so two processes racing on one key
+    cannot both run the view. Expired rows are purged now and then on write.
+    """
+
+    purge_probability = 0.01
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+
+    def attempt(self, key, fingerprint):
+        while True:
+            now = timezone.now()
+            try:
+                with transaction.atomic():
+                    IdempotencyKey.objects.create(
+                        key=key, fingerprint=fingerprint,
+                        expires_at=now + timedelta(seconds=self.ttl),
+                    )
+                return True, None
+            except IntegrityError:
+                pass
+
+            record = IdempotencyKey.objects.filter(key=key).first()
+            if record is None:
+                continue
+            if record.expires_at <= now:
+                IdempotencyKey.objects.filter(key=key, expires_at__lte=now).delete()
+                continue
+            if record.fingerprint != fingerprint:
+                raise KeyReused
+            if record.status_code is not None:
+                return False, StoredResponse(record.status_code, record.content_type, bytes(record.content))
+            return False, None
+
+    def complete(self, key, response):
+        IdempotencyKey.objects.filter(key=key).update(
+            status_code=response.status_code,
+            content_type=response.content_type,
+            content=response.content,
+        )
+        if random.random() < self.purge_probability:
+            IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+
+    def release(self, key):
+        IdempotencyKey.objects.filter(key=key, status_code__isnull=True).delete()
+
+
+@lru_cache(maxsize=None)
+def get_store():
+    """The store selected by APPOINTMENTS_IDEMPOTENCY_STORE"""
+    ttl = settings.APPOINTMENTS_IDEMPOTENCY_TTL
+    if settings.APPOINTMENTS_IDEMPOTENCY_STORE == 'database':
+        return DatabaseIdempotencyStore(ttl)
+    return MemoryIdempotencyStore(ttl, settings.APPOINTMENTS_IDEMPOTENCY_MAX_KEYS)
+
+
+def _scope(request):
+    """Returns (scoped key, body fingerprint, early response); the key is None
+    if the view should not run idempotently"""
+    key = request.headers.get(HEADER)
+    if not key:
+        return None, None, None
+    if len(key) > MAX_KEY_LENGTH:
+        return None, None, JsonResponse({
+            'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'
+        }, status=400)
+
+    # Keys are scoped per endpoint so the two create URLs never collide
+    return f'{request.path}:{key}', hashlib.sha256(request.body).hexdigest(), None
+
+
+def _refusal(exc):
+    if isinstance(exc, KeyReused):
+        return JsonResponse({
+            'error': f'{HEADER} was already used with a different request'
+        }, status=422)
+    return JsonResponse({
+        'error': f'A request with this {HEADER} is still in progress'
+    }, status=409)
+
+
+def _replay(scoped, stored):
+    """Returns (scoped key, None) to the claimant, else (None, the stored response)"""
+    if stored is None:
+        return scoped, None
+    response = HttpResponse(stored.content, status=stored.status_code, content_type=stored.content_type)
+    response['Idempotent-Replayed'] = 'true'
+    return None, response
+
+
+def _claim(request):
+    """Returns (scoped key, early response); the key is None if the view should not run idempotently"""
+    scoped, fingerprint, early = _scope(request)
+    if scoped is None:
+        return None, early
+    try:
+        stored = get_store().begin(scoped, fingerprint)
+    except (KeyReused, KeyInProgress) as exc:
+        return None, _refusal(exc)
+    return _replay(scoped, stored)
+
+
+async def _aclaim(request):
+    """``_claim`` for async views"""
+    scoped, fingerprint, early = _scope(request)
+    if scoped is None:
+        return None, early
+    try:
+        stored = await get_store().abegin(scoped, fingerprint)
+    except (KeyReused, KeyInProgress) as exc:
+        return None, _refusal(exc)
+    return _replay(scoped, stored)
+
+
+def _finish(key, response):
+    # Server errors are not replayed, so a retry gets a fresh attempt
+    if response.status_code >= 500 or response.streaming:
+        get_store().release(key)
+    else:
+        get_store().complete(key, StoredResponse(
+            response.status_code, response['Content-Type'], response.content
+        ))
+
+
+def idempotent(view):
+    """Make a create view honour the Idempotency-Key request header"""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            key, early = await _aclaim(request)
+            if early is not None:
+                return early
+            if key is None:
+                return await view(request, *args, **kwargs)
+            try:
+                response = await view(request, *args, **kwargs)
+            except BaseException:
+                await sync_to_async(get_store().release)(key)
+                raise
+            await sync_to_async(_finish)(key, response)
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key, early = _claim(request)
+        if early is not None:
+            return early
+        if key is None:
+            return view(request, *args, **kwargs)
+        try:
+            response = view(request, *args, **kwargs)
+        except BaseException:
+            get_store().release(key)
+            raise
+        _finish(key, response)
+        return response
+    return wrapper
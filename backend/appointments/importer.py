@@ -0,0 +1,287 @@
+"""Bulk ingest of historical appointments from NDJSON or CSV.
+
+Rows are validated in Python, checked for slot clashes one batch at a time
+and written with a single ``bulk_create`` (or a Postgres ``COPY``) per
+batch. A bad row is reported with its line number and skipped; it never
+aborts the rest of its batch.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from .models import Appointment
+from .patients import link_patients
+from .series import series_slots
+from .signals import appointments_bulk_changed
+from .slots import parse_time_of_day
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+FORMATS = ('ndjson', 'csv')
+SLOT_TAKEN = 'This time slot is already booked'
+REQUIRED_FIELDS = ['name', 'email', 'phone', 'date', 'time']
+# NDJSON values may be any JSON type; these must be strings when given
+TEXT_FIELDS = REQUIRED_FIELDS + ['message', 'status', 'created_at']
+STATUSES = {choice for choice, _ in Appointment.STATUS_CHOICES}
+COPY_COLUMNS = [
+    'name', 'email', 'phone', 'date', 'time', 'start_minute', 'message',
+    'status', 'created_at', 'updated_at', 'remind_at', 'version', 'patient_id',
+]
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def read_rows(lines, fmt):
+    """Yield ``(line_number, row)`` pairs; ``row`` is None if it cannot be decoded"""
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def build_appointment(row):
+    """Validate one decoded row and return an unsaved Appointment.
+
+    Raises ``ValueError`` with a message for the error report.
+    """
+    for field in REQUIRED_FIELDS:
+        if not row.get(field):
+            raise ValueError(f'{field} is required')
+    for field in TEXT_FIELDS:
+        if row.get(field) is not None and not isinstance(row[field], str):
+            raise ValueError(f'{field} must be a string')
+
+    try:
+        appointment_date = date.fromisoformat(row['date'])
+    except (TypeError, ValueError):
+        raise ValueError('Invalid date format. Use YYYY-MM-DD')
+
+    status = row.get('status') or 'pending'
+    if status not in STATUSES:
+        raise ValueError(f'Invalid status: {status}')
+
+    created_at = timezone.now()
+    if row.get('created_at'):
+        try:
+            created_at = datetime.fromisoformat(row['created_at'])
+        except (TypeError, ValueError):
+            raise ValueError('Invalid created_at. Use ISO 8601')
+        if timezone.is_naive(created_at):
+            created_at = timezone.make_aware(created_at)
+
+    appointment = Appointment(
+        name=row['name'],
+        email=row['email'],
+        phone=row['phone'],
+        date=appointment_date,
+        time=row['time'],
+        start_minute=parse_time_of_day(row['time']),
+        message=row.get('message') or '',
+        status=status,
+        created_at=created_at,
+        updated_at=created_at,
+    )
+    appointment.schedule_reminder()
+    return appointment
+
+
+def _taken_slots(appointments):
+    """Live (date, start_minute) pairs already booked, or held by a series
+    occurrence, for this batch's days"""
+    slotted = [a for a in appointments if a.start_minute is not None]
+    if not slotted:
+        return set()
+    dates = {a.date for a in slotted}
+    taken = set(
+        Appointment.objects
+        .filter(
+            date__in=dates,
+            start_minute__in={a.start_minute for a in slotted},
+            start_minute__isnull=False,
+        )
+        .exclude(status='cancelled')
+        .values_list('date', 'start_minute')
+    )
+    held = series_slots(min(dates), max(dates))
+    taken.update((day, minute) for day in dates for minute in held.get(day, ()))
+    return taken
+
+
+def _copy(appointments):
+    """Write a batch through Postgres COPY (psycopg2 or psycopg 3)"""
+    buffer = io.StringIO()
+    # Quoted empty strings stay strings; unquoted empty fields load as NULL
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    for a in appointments:
+        writer.writerow([
+            a.name, a.email, a.phone, a.date.isoformat(), a.time, a.start_minute,
+            a.message, a.status, a.created_at.isoformat(), a.updated_at.isoformat(),
+            a.remind_at.isoformat() if a.remind_at else None, a.version, a.patient_id,
+        ])
+    sql = (
+        f'COPY {Appointment._meta.db_table} ({", ".join(COPY_COLUMNS)}) '
+        'FROM STDIN WITH (FORMAT csv)'
+    )
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):
+            buffer.seek(0)
+            raw.copy_expert(sql, buffer)
+        else:
+            with raw.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+
+def _execute_many(appointments):
+    """Write a batch with one prepared INSERT run by ``executemany``.
+
+    Skips the SQL ``bulk_create`` compiles for every value of every row,
+    which is most of an import's time, at the cost of not setting pks.
+    """
+    ops = connection.ops
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        ops.quote_name(Appointment._meta.db_table),
+        ', '.join(ops.quote_name(column) for column in COPY_COLUMNS),
+        ', '.join(['%s'] * len(COPY_COLUMNS)),
+    )
+    rows = []
+    for a in appointments:
+        created_at = ops.adapt_datetimefield_value(a.created_at)
+        rows.append((
+            a.name, a.email, a.phone, ops.adapt_datefield_value(a.date), a.time, a.start_minute,
+            a.message, a.status, created_at,
+            # build_appointment sets both to the same time
+            created_at if a.updated_at == a.created_at else ops.adapt_datetimefield_value(a.updated_at),
+            ops.adapt_datetimefield_value(a.remind_at), a.version, a.patient_id,
+        ))
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def _write(batch, use_copy, returning):
+    """Insert a checked batch, falling back to row by row on a late clash"""
+    appointments = [appointment for _, appointment in batch]
+    try:
+        with transaction.atomic():
+            if use_copy:
+                _copy(appointments)
+            elif returning:
+                Appointment.objects.bulk_create(appointments)
+            else:
+                _execute_many(appointments)
+        return []
+    except IntegrityError:
+        pass
+
+    # A concurrent booking took one of the slots after the clash check;
+    # isolate it with a savepoint per row instead of failing the batch.
+    failed = []
+    for tag, appointment in batch:
+        appointment.pk = None
+        try:
+            with transaction.atomic():
+                Appointment.objects.bulk_create([appointment])
+        except IntegrityError:
+            failed.append((tag, SLOT_TAKEN))
+    return failed
+
+
+def insert_appointments(batch, use_copy=False, returning=True):
+    """Insert validated ``(tag, appointment)`` pairs in one statement.
+
+    Rows whose slot is already taken, in the database or earlier in the
+    batch, are skipped. Each appointment is linked to its patient first
+    (one upsert for the batch). Returns the ``(tag, error)`` pairs that were
+    not inserted; every other appointment is saved, with its pk set unless
+    written by COPY or, when ``returning`` is false, by ``executemany``.
+    """
+    taken = _taken_slots([appointment for _, appointment in batch])
+    failed = []
+    checked = []
+    for tag, appointment in batch:
+        if appointment.start_minute is not None and appointment.status != 'cancelled':
+            slot = (appointment.date, appointment.start_minute)
+            if slot in taken:
+                failed.append((tag, SLOT_TAKEN))
+                continue
+            taken.add(slot)
+        checked.append((tag, appointment))
+    if checked:
+        link_patients([appointment for _, appointment in checked])
+        failed.extend(_write(checked, use_copy, returning))
+    return failed
+
+
+def _flush(pending, result, use_copy, dates):
+    # Imports never read the new pks back
+    failed = insert_appointments(pending, use_copy=use_copy, returning=False)
+    for line, error in failed:
+        result.add_error(line, error)
+    result.created += len(pending) - len(failed)
+    dates.update(appointment.date for _, appointment in pending)
+
+
+def import_appointments(lines, fmt='ndjson', batch_size=DEFAULT_BATCH_SIZE, use_copy=False):
+    """Import appointments from an iterable of text lines.
+
+    ``use_copy`` switches batch writes to ``COPY`` on PostgreSQL and is
+    ignored on other databases. Returns an ``ImportResult``.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Unsupported format: {fmt}')
+    use_copy = use_copy and connection.vendor == 'postgresql'
+
+    result = ImportResult()
+    dates = set()
+    pending = []
+    try:
+        for line, row in read_rows(lines, fmt):
+            if row is None:
+                result.add_error(line, 'Invalid JSON data')
+                continue
+            try:
+                pending.append((line, build_appointment(row)))
+            except ValueError as e:
+                result.add_error(line, str(e))
+                continue
+            if len(pending) >= batch_size:
+                _flush(pending, result, use_copy, dates)
+                pending = []
+        if pending:
+            _flush(pending, result, use_copy, dates)
+    finally:
+        # Batches commit as they go; reconcile the ones that did even if
+        # a later batch or the input stream failed
+        if dates:
+            appointments_bulk_changed.send(sender=Appointment, dates=dates)
+    return result
@@ -0,0 +1,105 @@
+"""Write-behind intake for booking bursts.
+
+In queued mode (``APPOINTMENTS_INTAKE_MODE = 'queued'``) the create views
+validate the request, append it to the queued_bookings staging table and
+answer 202 with a tracking id. ``manage.py flush_booking_queue`` then
+inserts queued rows into appointments in batches.
+"""
+from datetime import date
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .cache import get_cache
+from .importer import insert_appointments
+from .models import Appointment, QueuedBooking
+from .outbox import enqueue_confirmations
+from .signals import appointments_bulk_changed
+from .slots import parse_time_of_day
+
+DEPTH_KEY = 'appointments:intake:depth'
+# Requests share one queue depth reading for this long
+DEPTH_CACHE_SECONDS = 1
+
+
+class QueueFull(Exception):
+    """The staging queue is at APPOINTMENTS_INTAKE_MAX_QUEUE"""
+
+
+def queued_mode():
+    return settings.APPOINTMENTS_INTAKE_MODE == 'queued'
+
+
+def queue_depth():
+    """Queued rows not flushed yet, re-counted at most once a second"""
+    cache = get_cache()
+    depth = cache.get(DEPTH_KEY)
+    if depth is None:
+        depth = QueuedBooking.objects.filter(status='queued').count()
+        cache.set(DEPTH_KEY, depth, DEPTH_CACHE_SECONDS)
+    return depth
+
+
+def enqueue_booking(fields):
+    """Stage validated booking ``fields``; raises QueueFull for backpressure"""
+    if queue_depth() >= settings.APPOINTMENTS_INTAKE_MAX_QUEUE:
+        raise QueueFull
+    return QueuedBooking.objects.create(payload={
+        **fields,
+        'date': fields['date'].isoformat(),
+    })
+
+
+def _appointment(payload, received_at):
+    appointment = Appointment(
+        name=payload['name'],
+        email=payload['email'],
+        phone=payload['phone'],
+        date=date.fromisoformat(payload['date']),
+        time=payload['time'],
+        start_minute=parse_time_of_day(payload['time']),
+        message=payload.get('message', ''),
+        created_at=received_at,
+        updated_at=received_at,
+    )
+    appointment.schedule_reminder()
+    return appointment
+
+
+def flush_queue(batch_size=500):
+    """Insert up to ``batch_size`` queued bookings; returns how many were claimed.
+
+    Rows are claimed with SKIP LOCKED, so several flushers can run at once
+    without taking the same booking twice.
+    """
+    with transaction.atomic():
+        queued = list(
+            QueuedBooking.objects.select_for_update(skip_locked=True)
+            .filter(status='queued').order_by('id')[:batch_size]
+        )
+        if not queued:
+            return 0
+
+        batch = [(row, _appointment(row.payload, row.created_at)) for row in queued]
+        failed = dict(insert_appointments(batch))
+
+        now = timezone.now()
+        for row, appointment in batch:
+            row.processed_at = now
+            if row in failed:
+                row.status = 'rejected'
+                row.error = failed[row]
+            else:
+                row.status = 'booked'
+                row.appointment = appointment
+        # An upsert on the primary key writes the whole batch in one cheap
+        # statement, where bulk_update would build a CASE per row and field
+        QueuedBooking.objects.bulk_create(
+            queued, update_conflicts=True, unique_fields=['id'],
+            update_fields=['status', 'error', 'appointment', 'processed_at'],
+        )
+        enqueue_confirmations([appointment for row, appointment in batch if row not in failed])
+
+        appointments_bulk_changed.send(
+            sender=Appointment, dates={appointment.date for _, appointment in batch}
+        )
+    return len(queued)
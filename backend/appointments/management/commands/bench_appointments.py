@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from appointments.bench import (
+    admin_search,
+    bench_database,
+    export,
+    importing,
+    intake,
+    listing,
+    profiling,
+    reminders,
+    serialize,
+    series,
+    suite,
+    waitlist,
+)
+
+SCENARIOS = {
+    'admin-search': admin_search.run,
+    'export': export.run,
+    'import': importing.run,
+    'intake': intake.run,
+    'listing': listing.run,
+    'profiling': profiling.run,
+    'reminders': reminders.run,
+    'serialize': serialize.run,
+    'series': series.run,
+    'suite': suite.run,
+    'waitlist': waitlist.run,
+}
+
+
+class Command(BaseCommand):
+    help = 'Run an appointments benchmark scenario against a throwaway test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(SCENARIOS))
+        parser.add_argument(
+            '--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+            help='Table sizes to measure at (the table is grown between steps)',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Requests per measured case',
+        )
+        parser.add_argument(
+            '--json', metavar='PATH',
+            help='Write the suite report as JSON, to compare runs across commits',
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Keep the test database between runs',
+        )
+
+    def handle(self, *args, **options):
+        with bench_database(keepdb=options['keepdb']):
+            SCENARIOS[options['scenario']](self, options)
@@ -0,0 +1,51 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from appointments.models import OutboxMessage
+from appointments.outbox import DEFAULT_BATCH_SIZE, deliver_pending
+
+# How often sent messages past --keep-days are deleted
+PURGE_INTERVAL_SECONDS = 60
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued confirmation emails and texts; run as many workers as needed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Messages claimed and delivered per transaction',
+        )
+        parser.add_argument(
+            '--interval-ms', type=int, default=500,
+            help='Wait this long when nothing is due',
+        )
+        parser.add_argument(
+            '--keep-days', type=int, default=30,
+            help='Keep sent messages this long',
+        )
+        parser.add_argument('--once', action='store_true', help='Deliver what is due now and exit')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        interval = options['interval_ms'] / 1000
+        next_purge = 0
+
+        while True:
+            close_old_connections()
+            sent, failed = deliver_pending(batch_size)
+            if sent or failed:
+                self.stdout.write(f'Delivered {sent} messages' + (f', {failed} failed' if failed else ''))
+
+            if time.monotonic() >= next_purge:
+                cutoff = timezone.now() - timedelta(days=options['keep_days'])
+                OutboxMessage.objects.filter(status='sent', sent_at__lt=cutoff).delete()
+                next_purge = time.monotonic() + PURGE_INTERVAL_SECONDS
+
+            if sent + failed == batch_size:
+                continue
+            if options['once']:
+                break
+            time.sleep(interval)
@@ -0,0 +1,56 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from appointments.export import DEFAULT_CHUNK_SIZE, FORMATS, export_appointments
+from appointments.filters import filter_appointments
+from appointments.models import Appointment
+
+
+class Command(BaseCommand):
+    help = 'Stream appointments to a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Output file, or '-' for stdout")
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Output format (default: guessed from the file extension, else csv)',
+        )
+        parser.add_argument('--date-from', help='First appointment date, YYYY-MM-DD')
+        parser.add_argument('--date-to', help='Last appointment date, YYYY-MM-DD')
+        parser.add_argument('--status', help='Comma separated statuses')
+        parser.add_argument(
+            '--gzip', action='store_true',
+            help='Gzip the output (implied by a .gz path)',
+        )
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        compress = options['gzip'] or path.endswith('.gz')
+        name = path[:-3] if path.endswith('.gz') else path
+        fmt = options['format'] or ('ndjson' if name.endswith(('.ndjson', '.jsonl')) else 'csv')
+
+        params = {key: options[key] for key in ('date_from', 'date_to', 'status') if options[key]}
+        try:
+            appointments = filter_appointments(Appointment.objects.all(), params)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        chunks = export_appointments(
+            appointments, fmt=fmt, compress=compress, chunk_size=options['chunk_size']
+        )
+        if path == '-':
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+
+        try:
+            stream = open(path, 'wb')
+        except OSError as e:
+            raise CommandError(f'Cannot open {path}: {e}')
+        written = 0
+        with stream:
+            for chunk in chunks:
+                stream.write(chunk)
+                written += len(chunk)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} bytes to {path}'))
@@ -0,0 +1,51 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from appointments.intake import flush_queue
+from appointments.models import QueuedBooking
+
+# How often processed staging rows past --keep-days are deleted
+PURGE_INTERVAL_SECONDS = 60
+
+
+class Command(BaseCommand):
+    help = 'Insert bookings staged by the queued intake mode, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Flush as soon as this many bookings are queued',
+        )
+        parser.add_argument(
+            '--interval-ms', type=int, default=200,
+            help='Otherwise flush whatever is queued this often',
+        )
+        parser.add_argument(
+            '--keep-days', type=int, default=7,
+            help='Keep processed rows this long so tracking ids still resolve',
+        )
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        interval = options['interval_ms'] / 1000
+        next_purge = 0
+
+        while True:
+            close_old_connections()
+            flushed = flush_queue(batch_size)
+            if flushed:
+                self.stdout.write(f'Flushed {flushed} bookings')
+
+            if time.monotonic() >= next_purge:
+                cutoff = timezone.now() - timedelta(days=options['keep_days'])
+                QueuedBooking.objects.exclude(status='queued').filter(processed_at__lt=cutoff).delete()
+                next_purge = time.monotonic() + PURGE_INTERVAL_SECONDS
+
+            if flushed == batch_size:
+                continue
+            if options['once']:
+                break
+            time.sleep(interval)
@@ -0,0 +1,41 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from appointments.importer import DEFAULT_BATCH_SIZE, FORMATS, import_appointments
+
+
+class Command(BaseCommand):
+    help = 'Bulk import appointments from an NDJSON or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for stdin")
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Input format (default: guessed from the file extension, else ndjson)',
+        )
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            '--copy', action='store_true',
+            help='Write batches with COPY when running on PostgreSQL',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+
+        try:
+            stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        except OSError as e:
+            raise CommandError(f'Cannot open {path}: {e}')
+
+        with stream:
+            result = import_appointments(
+                stream, fmt=fmt, batch_size=options['batch_size'], use_copy=options['copy']
+            )
+
+        for error in result.errors:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        if result.failed > len(result.errors):
+            self.stderr.write(f'... {result.failed - len(result.errors)} more errors not shown')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.created} appointments, {result.failed} rows failed'
+        ))
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from appointments.bench.http_load import run_load, summarize
+
+
+def _session_count():
+    """Sessions ever opened to this database (PostgreSQL 14+), else None"""
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT sessions FROM pg_stat_database WHERE datname = current_database()'
+        )
+        return cursor.fetchone()[0]
+
+
+def _backend_count():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()'
+        )
+        return cursor.fetchone()[0]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test a running appointments server (WSGI or ASGI) and report '
+        'throughput, latency and PostgreSQL connection churn'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='e.g. http://127.0.0.1:8000/api/async/appointments/')
+        parser.add_argument('--method', choices=['GET', 'POST'], default='POST')
+        parser.add_argument('--concurrency', type=int, default=500)
+        parser.add_argument('--duration', type=float, default=30)
+        parser.add_argument('--label', default='', help='Name for this run in the output')
+
+    def handle(self, *args, **options):
+        sessions_before = _session_count()
+        peak_backends = []
+        stop = threading.Event()
+
+        def sample_backends():
+            while not stop.wait(0.5):
+                peak_backends.append(_backend_count())
+            connection.close()
+
+        sampler = None
+        if sessions_before is not None:
+            sampler = threading.Thread(target=sample_backends, daemon=True)
+            sampler.start()
+
+        started = time.perf_counter()
+        stats = asyncio.run(run_load(
+            options['url'], method=options['method'],
+            concurrency=options['concurrency'], duration=options['duration'],
+        ))
+        summary = summarize(stats, time.perf_counter() - started)
+
+        if sampler is not None:
+            stop.set()
+            sampler.join()
+            # Exclude the sampler thread's own session
+            summary['db_sessions_opened'] = _session_count() - sessions_before - 1
+            summary['db_peak_backends'] = max(peak_backends, default=0)
+
+        label = options['label'] or options['url']
+        self.stdout.write(f'{label}: ' + '  '.join(
+            f'{key}={value:.1f}' if isinstance(value, float) else f'{key}={value}'
+            for key, value in summary.items()
+        ))
@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from appointments.models import Appointment
+from appointments.partitions import (
+    ARCHIVE_SCHEMA,
+    MONTHS_AHEAD,
+    add_months,
+    attached_months,
+    detach_partition,
+    ensure_partitions,
+    is_partitioned,
+    missing_months,
+    month_start,
+    partition_counts,
+    partition_name,
+)
+from appointments.signals import appointments_bulk_changed
+
+
+class Command(BaseCommand):
+    help = 'Create future monthly appointment partitions and archive old ones (PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead', type=int, default=MONTHS_AHEAD,
+            help='Months after the current one that must have a partition',
+        )
+        parser.add_argument(
+            '--archive-older-than', type=int, metavar='MONTHS',
+            help='Detach partitions of months that ended more than MONTHS months ago',
+        )
+        parser.add_argument(
+            '--anonymize', action='store_true',
+            help='Replace patient details in archived partitions',
+        )
+        parser.add_argument(
+            '--drop', action='store_true',
+            help=f'Drop detached partitions instead of moving them to the {ARCHIVE_SCHEMA} schema',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would change')
+
+    def handle(self, *args, **options):
+        if not is_partitioned(connection):
+            raise CommandError('The appointments table is not partitioned (PostgreSQL only, migration 0008)')
+        if options['archive_older_than'] is not None and options['archive_older_than'] < 1:
+            raise CommandError('--archive-older-than must be at least 1; the current month is never archived')
+
+        this_month = month_start(date.today())
+        last = add_months(this_month, options['ahead'])
+        with connection.cursor() as cursor:
+            if options['dry_run']:
+                for month in missing_months(cursor, this_month, last):
+                    self.stdout.write(f'would create {partition_name(month)}')
+            else:
+                with transaction.atomic():
+                    for month in ensure_partitions(cursor, this_month, last):
+                        self.stdout.write(f'created {partition_name(month)}')
+
+            if options['archive_older_than'] is None:
+                return
+            cutoff = add_months(this_month, -options['archive_older_than'])
+            for month in [m for m in attached_months(cursor) if m < cutoff]:
+                self._archive(cursor, month, options)
+
+    def _archive(self, cursor, month, options):
+        name = partition_name(month)
+        counts = partition_counts(cursor, month)
+        summary = ', '.join(f'{status}={count}' for status, count in sorted(counts.items())) or 'empty'
+        action = 'drop' if options['drop'] else f'archive to {ARCHIVE_SCHEMA}'
+        if options['dry_run']:
+            self.stdout.write(f'would {action} {name} ({summary})')
+            return
+
+        with transaction.atomic():
+            detach_partition(cursor, month, anonymize=options['anonymize'], drop=options['drop'])
+            # Rebuilds the month's occupancy and invalidates cached listings
+            end = add_months(month, 1)
+            days = [month + timedelta(days=i) for i in range((end - month).days)]
+            appointments_bulk_changed.send(sender=Appointment, dates=days)
+        self.stdout.write(self.style.SUCCESS(f'{action}: {name} ({summary})'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from appointments.profiling import TOKEN_MAX_AGE, make_token
+
+
+class Command(BaseCommand):
+    help = 'Print a signed X-Profile-Token header value that makes requests get profiled'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age', type=int, default=TOKEN_MAX_AGE,
+            help='Seconds the token stays valid',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(make_token(options['max_age']))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from appointments.filters import parse_date
+from appointments.rollups import compare_counts, rebuild_counts
+
+# Mismatches listed individually
+MAX_REPORTED = 50
+
+
+class Command(BaseCommand):
+    help = 'Check the daily status counts against appointments, or rebuild them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='First appointment date (YYYY-MM-DD)')
+        parser.add_argument('--date-to', help='Last appointment date (YYYY-MM-DD)')
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Recount the range from appointments instead of only checking it',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            date_from = parse_date(options['date_from'], 'date-from') if options['date_from'] else None
+            date_to = parse_date(options['date_to'], 'date-to') if options['date_to'] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['rebuild']:
+            days = rebuild_counts(date_from, date_to)
+            self.stdout.write(f'Recounted {days} days')
+            return
+
+        mismatches = compare_counts(date_from, date_to)
+        if not mismatches:
+            self.stdout.write('Daily status counts match appointments')
+            return
+        for day, status, stored, actual in mismatches[:MAX_REPORTED]:
+            self.stdout.write(f'{day} {status}: stored {stored}, actual {actual}')
+        if len(mismatches) > MAX_REPORTED:
+            self.stdout.write(f'... {len(mismatches) - MAX_REPORTED} more')
+        raise CommandError(f'{len(mismatches)} daily status counts are wrong; run with --rebuild')
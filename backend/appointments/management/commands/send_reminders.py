@@ -0,0 +1,48 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from appointments.reminders import DEFAULT_BATCH_SIZE, SENDERS, ConsoleSender, next_due, send_due
+
+
+class Command(BaseCommand):
+    help = 'Send due appointment reminders; run as many workers as needed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Reminders claimed and sent per transaction',
+        )
+        parser.add_argument(
+            '--max-sleep', type=float, default=30,
+            help='Longest wait, in seconds, before looking for new earlier reminders',
+        )
+        parser.add_argument(
+            '--sender', choices=sorted(SENDERS),
+            help='Override APPOINTMENTS_REMINDER_SENDER',
+        )
+        parser.add_argument('--once', action='store_true', help='Send what is due now and exit')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        name = options['sender'] or settings.APPOINTMENTS_REMINDER_SENDER
+        sender = ConsoleSender(self.stdout) if name == 'console' else SENDERS[name]()
+
+        while True:
+            close_old_connections()
+            sent, failed = send_due(sender, batch_size)
+            if sent or failed:
+                self.stdout.write(f'Sent {sent} reminders' + (f', {failed} failed' if failed else ''))
+            if sent + failed == batch_size:
+                continue
+            if options['once']:
+                break
+
+            # Sleep until the head of the due-time index, but wake up in time
+            # to see reminders booked meanwhile for sooner
+            due = next_due()
+            wait = options['max_sleep']
+            if due is not None:
+                wait = min(wait, max((due - timezone.now()).total_seconds(), 0))
+            time.sleep(wait)
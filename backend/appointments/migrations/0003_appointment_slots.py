@@ -0,0 +1,53 @@
+# Generated by Django 5.2.3 on 2026-10-17 21:01
+
+import appointments.slots
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0002_appointment_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClinicHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('opens_at', models.TimeField()),
+                ('closes_at', models.TimeField()),
+                ('slot_minutes', models.PositiveSmallIntegerField(default=60)),
+            ],
+            options={
+                'verbose_name_plural': 'clinic hours',
+                'db_table': 'clinic_hours',
+                'ordering': ['weekday', 'opens_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DayOccupancy',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False)),
+                ('booked', models.BinaryField(default=appointments.slots.empty_occupancy)),
+            ],
+            options={
+                'verbose_name_plural': 'day occupancy',
+                'db_table': 'day_occupancy',
+            },
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='start_minute',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('start_minute__isnull', False), models.Q(('status', 'cancelled'), _negated=True)), fields=('date', 'start_minute'), name='unique_active_slot'),
+        ),
+        migrations.AddConstraint(
+            model_name='clinichours',
+            constraint=models.UniqueConstraint(fields=('weekday', 'opens_at'), name='unique_clinic_session'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+SEARCH_COLUMNS = ['name', 'email', 'phone']
+
+
+def index_name(column):
+    return f'appt_{column}_trgm_idx'
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Admin search runs icontains, which PostgreSQL compiles to
+    # UPPER(col::text) LIKE UPPER('%term%'); index that exact expression.
+    # Other databases (SQLite in tests) keep plain scans.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index_name(column)} ON appointments '
+            f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index_name(column)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0003_appointment_slots'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
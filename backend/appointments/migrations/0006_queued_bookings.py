@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-17 21:12
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0005_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tracking_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('booked', 'Booked'), ('rejected', 'Rejected')], default='queued', max_length=20)),
+                ('error', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('appointment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='appointments.appointment')),
+            ],
+            options={
+                'db_table': 'queued_bookings',
+                'indexes': [models.Index(fields=['status', 'id'], name='queued_status_id_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,138 @@
+import re
+from collections import defaultdict
+from django.db import migrations, models, transaction
+
+# Rows parsed and written per transaction
+CHUNK = 2000
+# Unparseable or clashing rows listed individually in the report
+MAX_REPORTED = 50
+
+# The parser and bitmap layout as of this migration, copied from
+# appointments/slots.py so later changes there cannot change what it does
+SLOT_GRANULARITY = 5
+OCCUPANCY_BYTES = (24 * 60 // SLOT_GRANULARITY + 7) // 8
+_TIME_RE = re.compile(r'^\s*(\d{1,2})(?:[:.](\d{2}))?\s*([ap])?\.?\s*(?:m\.?)?\s*$', re.IGNORECASE)
+
+
+def parse_time_of_day(value):
+    match = _TIME_RE.match(value or '')
+    if not match:
+        return None
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem.lower() == 'p' else 0)
+    elif match.group(2) is None:
+        return None
+    if hour > 23 or minute > 59:
+        return None
+    return hour * 60 + minute
+
+
+def occupancy_bitmap(start_minutes):
+    bitmap = bytearray(OCCUPANCY_BYTES)
+    for minute in start_minutes:
+        index = minute // SLOT_GRANULARITY
+        bitmap[index >> 3] |= 1 << (index & 7)
+    return bytes(bitmap)
+
+
+def backfill_start_minute(apps, schema_editor):
+    """Parse ``time`` into ``start_minute`` for rows saved before 0003.
+
+    Works through the table in id order, one transaction per chunk, so a
+    large table is never locked as a whole. Values that are not clock
+    times ('morning') stay NULL, and so does a later live booking of a slot
+    an earlier one already holds; both are printed for manual clean-up.
+    """
+    Appointment = apps.get_model('appointments', 'Appointment')
+    DayOccupancy = apps.get_model('appointments', 'DayOccupancy')
+
+    parsed = 0
+    unparseable = []
+    clashes = []
+    dates = set()
+    last_id = 0
+    while True:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            rows = list(
+                Appointment.objects
+                .filter(id__gt=last_id, start_minute__isnull=True)
+                .order_by('id')
+                .values_list('id', 'date', 'time', 'status')[:CHUNK]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            taken = set(
+                Appointment.objects
+                .filter(date__in={row[1] for row in rows}, start_minute__isnull=False)
+                .exclude(status='cancelled')
+                .values_list('date', 'start_minute')
+            )
+            # One UPDATE per distinct minute instead of one per row
+            ids_by_minute = defaultdict(list)
+            for pk, day, time, status in rows:
+                minute = parse_time_of_day(time)
+                if minute is None:
+                    unparseable.append((pk, time))
+                    continue
+                if status != 'cancelled':
+                    if (day, minute) in taken:
+                        clashes.append((pk, day, time))
+                        continue
+                    taken.add((day, minute))
+                    dates.add(day)
+                ids_by_minute[minute].append(pk)
+            for minute, ids in ids_by_minute.items():
+                Appointment.objects.filter(id__in=ids).update(start_minute=minute)
+                parsed += len(ids)
+
+    # Occupancy bitmaps of the touched days now include the legacy bookings
+    dates = sorted(dates)
+    for i in range(0, len(dates), 500):
+        chunk = dates[i:i + 500]
+        booked = defaultdict(list)
+        slots = (
+            Appointment.objects
+            .filter(date__in=chunk, start_minute__isnull=False)
+            .exclude(status='cancelled')
+            .values_list('date', 'start_minute')
+        )
+        for day, minute in slots:
+            booked[day].append(minute)
+        DayOccupancy.objects.bulk_create(
+            [DayOccupancy(date=day, booked=occupancy_bitmap(booked[day])) for day in chunk],
+            update_conflicts=True, unique_fields=['date'], update_fields=['booked'],
+        )
+
+    if not (parsed or unparseable or clashes):
+        return
+    print(f'\n  start_minute backfill: {parsed} parsed, '
+          f'{len(unparseable)} unparseable, {len(clashes)} slot clashes')
+    for pk, time in unparseable[:MAX_REPORTED]:
+        print(f'    appointment {pk}: cannot parse time {time!r}')
+    for pk, day, time in clashes[:MAX_REPORTED]:
+        print(f'    appointment {pk}: {day} {time} is already booked by an earlier row')
+    if len(unparseable) + len(clashes) > 2 * MAX_REPORTED:
+        print('    ... more rows omitted; find them with start_minute IS NULL')
+
+
+class Migration(migrations.Migration):
+
+    # Each backfill chunk commits on its own
+    atomic = False
+
+    dependencies = [
+        ('appointments', '0006_queued_bookings'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_start_minute, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['date', 'start_minute'], name='appt_date_start_idx'),
+        ),
+    ]
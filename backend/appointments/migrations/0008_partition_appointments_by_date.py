@@ -0,0 +1,174 @@
+from datetime import date
+import django.db.models.deletion
+from django.db import migrations, models, transaction
+
+# Trigram indexes of 0004, rebuilt on the new table
+SEARCH_COLUMNS = ['name', 'email', 'phone']
+# Rows copied between the old and new table per transaction
+COPY_CHUNK = 50_000
+
+# Partition helpers as of this migration, copied from appointments/partitions.py
+# so later changes there cannot change what it does
+MONTHS_AHEAD = 3
+DEFAULT_PARTITION = 'appointments_default'
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(month, months):
+    year, index = divmod(month.month - 1 + months, 12)
+    return date(month.year + year, index + 1, 1)
+
+
+def ensure_partitions(cursor, first, last):
+    """Attach an empty partition for every month from ``first`` to ``last``"""
+    month = month_start(first)
+    while month <= last:
+        # Bounds are dates built here, never user input
+        cursor.execute(
+            f'CREATE TABLE appointments_p{month:%Y%m} PARTITION OF appointments '
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        )
+        month = add_months(month, 1)
+
+
+def create_indexes(schema_editor, model):
+    for index in model._meta.indexes:
+        schema_editor.add_index(model, index)
+    for constraint in model._meta.constraints:
+        schema_editor.add_constraint(model, constraint)
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS appt_{column}_trgm_idx ON appointments '
+            f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def copy_rows(connection, source, target, max_id):
+    """Copy ``source`` into ``target`` in id ranges, one transaction each.
+
+    No transaction holds the whole table, and an interrupted copy resumes
+    after the last committed range: the highest id up to ``max_id`` already
+    in ``target`` (rows booked meanwhile get ids above ``max_id``).
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT coalesce(max(id), 0) FROM {target} WHERE id <= %s', [max_id])
+        last_id = cursor.fetchone()[0]
+    while last_id < max_id:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {target} SELECT * FROM {source} WHERE id > %s AND id <= %s',
+                [last_id, last_id + COPY_CHUNK],
+            )
+        last_id += COPY_CHUNK
+
+
+def _exists(cursor, table):
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [table])
+    return cursor.fetchone()[0]
+
+
+def partition_by_date(apps, schema_editor):
+    # PostgreSQL only; other databases keep the plain table
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    Appointment = apps.get_model('appointments', 'Appointment')
+    with connection.cursor() as cursor:
+        resuming = _exists(cursor, 'appointments_unpartitioned')
+    if not resuming:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute('SELECT min(date) FROM appointments')
+            first_day = cursor.fetchone()[0]
+            cursor.execute('ALTER TABLE appointments RENAME TO appointments_unpartitioned')
+            cursor.execute('ALTER TABLE appointments_unpartitioned ALTER COLUMN id DROP IDENTITY IF EXISTS')
+            cursor.execute('ALTER TABLE appointments_unpartitioned ALTER COLUMN id DROP DEFAULT')
+            cursor.execute('DROP SEQUENCE IF EXISTS appointments_id_seq')
+            cursor.execute(
+                'CREATE TABLE appointments (LIKE appointments_unpartitioned '
+                'INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE (date)'
+            )
+            # Identity columns on partitioned tables need PostgreSQL 17; a
+            # sequence default works on every supported version
+            cursor.execute('CREATE SEQUENCE appointments_id_seq AS bigint OWNED BY appointments.id')
+            cursor.execute(
+                "SELECT setval('appointments_id_seq', coalesce(max(id), 0) + 1, false) "
+                'FROM appointments_unpartitioned'
+            )
+            cursor.execute("ALTER TABLE appointments ALTER COLUMN id SET DEFAULT nextval('appointments_id_seq')")
+            cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF appointments DEFAULT')
+            this_month = month_start(date.today())
+            ensure_partitions(cursor, first_day or this_month, add_months(this_month, MONTHS_AHEAD))
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT coalesce(max(id), 0) FROM appointments_unpartitioned')
+        max_id = cursor.fetchone()[0]
+    copy_rows(connection, 'appointments_unpartitioned', 'appointments', max_id)
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute('DROP TABLE appointments_unpartitioned')
+        # Unique keys of a partitioned table must include the partition key
+        cursor.execute('ALTER TABLE appointments ADD CONSTRAINT appointments_pkey PRIMARY KEY (id, date)')
+        create_indexes(schema_editor, Appointment)
+
+
+def unpartition(apps, schema_editor):
+    # Folds the attached partitions back into one table; partitions already
+    # moved to the archive schema stay there
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    Appointment = apps.get_model('appointments', 'Appointment')
+    with connection.cursor() as cursor:
+        resuming = _exists(cursor, 'appointments_partitioned')
+    if not resuming:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute('ALTER TABLE appointments RENAME TO appointments_partitioned')
+            cursor.execute(
+                'CREATE TABLE appointments (LIKE appointments_partitioned '
+                'INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+            )
+            # The sequence moves to the new table, so ids keep counting up
+            cursor.execute('ALTER SEQUENCE appointments_id_seq OWNED BY appointments.id')
+            cursor.execute('ALTER TABLE appointments_partitioned ALTER COLUMN id DROP DEFAULT')
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT coalesce(max(id), 0) FROM appointments_partitioned')
+        max_id = cursor.fetchone()[0]
+    copy_rows(connection, 'appointments_partitioned', 'appointments', max_id)
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute('DROP TABLE appointments_partitioned')
+        cursor.execute('SELECT coalesce(max(id), 0) + 1 FROM appointments')
+        start = cursor.fetchone()[0]
+        cursor.execute('ALTER TABLE appointments ALTER COLUMN id DROP DEFAULT')
+        cursor.execute('DROP SEQUENCE appointments_id_seq')
+        cursor.execute(
+            'ALTER TABLE appointments ALTER COLUMN id '
+            f'ADD GENERATED BY DEFAULT AS IDENTITY (START WITH {start})'
+        )
+        cursor.execute('ALTER TABLE appointments ADD CONSTRAINT appointments_pkey PRIMARY KEY (id)')
+        create_indexes(schema_editor, Appointment)
+
+
+class Migration(migrations.Migration):
+
+    # The row copy commits in chunks of COPY_CHUNK rows; run it in a quiet
+    # period, as reads see the new table fill up. Rerun after an interruption
+    # to resume the copy.
+    atomic = False
+
+    dependencies = [
+        ('appointments', '0007_backfill_start_minute'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='queuedbooking',
+            name='appointment',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='appointments.appointment'),
+        ),
+        migrations.RunPython(partition_by_date, unpartition),
+    ]
@@ -0,0 +1,66 @@
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import migrations, models, transaction
+from django.utils import timezone
+
+# Rows scheduled and written per transaction
+CHUNK = 2000
+
+
+def next_reminder_at(day, minute, hours, after):
+    """appointments.slots.next_reminder_at as of this migration"""
+    start = timezone.make_aware(datetime.combine(day, time(*divmod(minute, 60))))
+    due = (start - timedelta(hours=h) for h in hours)
+    return min((when for when in due if when > after), default=None)
+
+
+def schedule_upcoming(apps, schema_editor):
+    """Set ``remind_at`` on pending and confirmed bookings that are still ahead"""
+    Appointment = apps.get_model('appointments', 'Appointment')
+    now = timezone.now()
+    hours = settings.APPOINTMENTS_REMINDER_HOURS
+    last_id = 0
+    while True:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            batch = list(
+                Appointment.objects
+                .filter(
+                    id__gt=last_id, date__gte=now.date() - timedelta(days=1),
+                    status__in=['pending', 'confirmed'], start_minute__isnull=False,
+                )
+                .order_by('id')
+                .only('id', 'date', 'start_minute')[:CHUNK]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+            for appointment in batch:
+                appointment.remind_at = next_reminder_at(
+                    appointment.date, appointment.start_minute, hours, now
+                )
+            Appointment.objects.bulk_update(
+                [a for a in batch if a.remind_at is not None], ['remind_at']
+            )
+
+
+class Migration(migrations.Migration):
+
+    # Each backfill chunk commits on its own
+    atomic = False
+
+    dependencies = [
+        ('appointments', '0008_partition_appointments_by_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='remind_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(schedule_upcoming, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('remind_at__isnull', False)), fields=['remind_at'], name='appt_remind_due_idx'),
+        ),
+    ]
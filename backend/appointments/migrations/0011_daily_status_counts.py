@@ -0,0 +1,45 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+# Count rows inserted per statement
+CHUNK = 2000
+
+
+def fill_counts(apps, schema_editor):
+    """Count the existing appointments per (date, status) in one GROUP BY"""
+    Appointment = apps.get_model('appointments', 'Appointment')
+    DailyStatusCount = apps.get_model('appointments', 'DailyStatusCount')
+    counts = (
+        Appointment.objects.order_by().values_list('date', 'status').annotate(n=Count('id'))
+    )
+    batch = []
+    for day, status, n in counts.iterator():
+        batch.append(DailyStatusCount(date=day, status=status, count=n))
+        if len(batch) == CHUNK:
+            DailyStatusCount.objects.bulk_create(batch)
+            batch = []
+    DailyStatusCount.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0010_outbox_messages'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('completed', 'Completed')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'daily_status_counts',
+                'constraints': [models.UniqueConstraint(fields=('date', 'status'), name='unique_daily_status')],
+            },
+        ),
+        migrations.RunPython(fill_counts, migrations.RunPython.noop),
+    ]
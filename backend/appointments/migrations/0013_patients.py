@@ -0,0 +1,116 @@
+# Generated by Django 5.2.3 on 2026-10-17 21:59
+
+import re
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models, transaction
+
+# Appointments linked per transaction
+CHUNK = 2000
+
+# Normalization as of this migration, copied from appointments/patients.py
+# so later changes there cannot change what it does
+_SEPARATORS_RE = re.compile(r'[\s().\-/]')
+NATIONAL_DIGITS = 10
+
+
+def normalize_phone(value):
+    number = _SEPARATORS_RE.sub('', value or '')
+    if number.startswith('+'):
+        digits = number[1:]
+    elif number.startswith('00'):
+        digits = number[2:]
+    elif number.startswith('0') and len(number) == NATIONAL_DIGITS + 1:
+        digits = settings.APPOINTMENTS_DEFAULT_COUNTRY_CODE + number[1:]
+    elif len(number) == NATIONAL_DIGITS:
+        digits = settings.APPOINTMENTS_DEFAULT_COUNTRY_CODE + number
+    else:
+        digits = number
+    if not digits.isdigit() or digits.startswith('0') or not 8 <= len(digits) <= 15:
+        return None
+    return '+' + digits
+
+
+def normalize_email(value):
+    return (value or '').strip().lower()
+
+
+def link_existing(apps, schema_editor):
+    """Create one patient per normalized (phone, email) and link existing appointments.
+
+    Variants of the same contact collapse onto one patient through the
+    unique constraint; the latest booking's name wins. Appointments whose
+    phone cannot be normalized stay unlinked and are counted.
+    """
+    Appointment = apps.get_model('appointments', 'Appointment')
+    Patient = apps.get_model('appointments', 'Patient')
+    last_id = 0
+    unlinked = 0
+    while True:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            batch = list(
+                Appointment.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'name', 'email', 'phone')[:CHUNK]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+            keys = {a.id: (normalize_phone(a.phone), normalize_email(a.email)) for a in batch}
+            names = {keys[a.id]: a.name for a in batch if keys[a.id][0] is not None}
+            patients = [Patient(phone=phone, email=email, name=name) for (phone, email), name in names.items()]
+            Patient.objects.bulk_create(
+                patients, update_conflicts=True, unique_fields=['phone', 'email'],
+                update_fields=['name'],
+            )
+            ids = {(p.phone, p.email): p.pk for p in patients}
+            linked = []
+            for appointment in batch:
+                appointment.patient_id = ids.get(keys[appointment.id])
+                if appointment.patient_id is None:
+                    unlinked += 1
+                else:
+                    linked.append(appointment)
+            Appointment.objects.bulk_update(linked, ['patient'])
+    if unlinked:
+        print(f'\n  patient backfill: {unlinked} appointments have a phone number '
+              'that cannot be normalized and were left without a patient')
+
+
+class Migration(migrations.Migration):
+
+    # Each backfill chunk commits on its own
+    atomic = False
+
+    dependencies = [
+        ('appointments', '0012_appointment_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Patient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('phone', models.CharField(max_length=16)),
+                ('email', models.EmailField(max_length=254)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'patients',
+                'indexes': [models.Index(fields=['email'], name='patient_email_idx')],
+                'constraints': [models.UniqueConstraint(fields=('phone', 'email'), name='unique_patient_contact')],
+            },
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='patient',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='appointments', to='appointments.patient'),
+        ),
+        migrations.RunPython(link_existing, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', '-date', '-id'], name='appt_patient_date_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.3 on 2026-10-17 22:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0014_appointment_series'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254)),
+                ('phone', models.CharField(max_length=20)),
+                ('date_from', models.DateField()),
+                ('date_to', models.DateField()),
+                ('earliest_minute', models.PositiveSmallIntegerField(default=0)),
+                ('latest_minute', models.PositiveSmallIntegerField(default=1439)),
+                ('status', models.CharField(choices=[('waiting', 'Waiting'), ('offered', 'Offered'), ('withdrawn', 'Withdrawn')], default='waiting', max_length=20)),
+                ('offered_date', models.DateField(blank=True, editable=False, null=True)),
+                ('offered_minute', models.PositiveSmallIntegerField(blank=True, editable=False, null=True)),
+                ('hold', models.CharField(blank=True, editable=False, max_length=100)),
+                ('offered_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('patient', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_entries', to='appointments.patient')),
+            ],
+            options={
+                'verbose_name_plural': 'waitlist entries',
+                'db_table': 'waitlist',
+            },
+        ),
+        migrations.CreateModel(
+            name='WaitlistDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('earliest_minute', models.PositiveSmallIntegerField()),
+                ('latest_minute', models.PositiveSmallIntegerField()),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='days', to='appointments.waitlistentry')),
+            ],
+            options={
+                'db_table': 'waitlist_days',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='waitlistentry',
+            index=models.Index(fields=['status', 'id'], name='waitlist_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='waitlistday',
+            index=models.Index(fields=['date', 'entry', 'earliest_minute', 'latest_minute'], name='waitlist_day_idx'),
+        ),
+    ]
@@ -1,5 +1,11 @@
+import uuid
+from datetime import date
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import F, Q
 from django.utils import timezone
+from .slots import SLOT_GRANULARITY, empty_occupancy, next_reminder_at, parse_time_of_day
 
 class Appointment(models.Model):
     
@@ -9,25 +15,459 @@ class Appointment(models.Model):
         ('cancelled', 'Cancelled'),
         ('completed', 'Completed'),
     ]
+    # Statuses that still get reminders
+    REMINDED_STATUSES = ['pending', 'confirmed']
     
     # Personal Information
     name = models.CharField(max_length=100)
     email = models.EmailField()
     phone = models.CharField(max_length=20)
+    # Set from phone and email when booked (patients.link_patients); the
+    # (patient, date) index below serves history lookups
+    patient = models.ForeignKey(
+        'Patient', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='appointments', db_index=False,
+    )
     
     # Appointment Details
     date = models.DateField()
     time = models.CharField(max_length=20)
+    # Minute of day parsed from ``time``; NULL when ``time`` is not a clock time
+    start_minute = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
     message = models.TextField(blank=True, null=True)
     
     # Status and Timestamps
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
+    # When the next reminder is due (APPOINTMENTS_REMINDER_HOURS before the
+    # slot); NULL once every reminder is sent or the status leaves
+    # REMINDED_STATUSES
+    remind_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Bumped by every write; status PATCHes only apply to the version they read
+    version = models.PositiveIntegerField(default=1, editable=False)
+    # Set on series exceptions: the occurrence of ``series`` originally on
+    # ``occurrence_date``, stored as a row because it was moved, cancelled
+    # or otherwise changed. Other occurrences are never stored (series.py).
+    series = models.ForeignKey(
+        'AppointmentSeries', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='exceptions', db_index=False, editable=False,
+    )
+    occurrence_date = models.DateField(null=True, blank=True, editable=False)
     
     class Meta:
+        # Range partitioned by month of ``date`` on PostgreSQL (migration 0008)
         db_table = 'appointments'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination on (created_at, id), alone and behind each
+            # equality filter of the listing endpoint
+            models.Index(fields=['-created_at', '-id'], name='appt_created_id_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='appt_status_created_idx'),
+            models.Index(fields=['email', '-created_at', '-id'], name='appt_email_created_idx'),
+            models.Index(fields=['phone', '-created_at', '-id'], name='appt_phone_created_idx'),
+            models.Index(fields=['date', '-created_at'], name='appt_date_created_idx'),
+            # Day schedules and "next available" scans in clock order
+            models.Index(fields=['date', 'start_minute'], name='appt_date_start_idx'),
+            # Series exceptions within a date window, skipped when expanding
+            models.Index(
+                fields=['occurrence_date', 'series'], name='appt_occurrence_idx',
+                condition=Q(occurrence_date__isnull=False),
+            ),
+            # A patient's appointments, latest first
+            models.Index(fields=['patient', '-date', '-id'], name='appt_patient_date_idx'),
+            # Due reminders, oldest first; holds only rows that still get one
+            models.Index(
+                fields=['remind_at'], name='appt_remind_due_idx', condition=Q(remind_at__isnull=False),
+            ),
+        ]
+        constraints = [
+            # One live booking per slot; cancelled rows free the slot again
+            models.UniqueConstraint(
+                fields=['date', 'start_minute'],
+                condition=Q(start_minute__isnull=False) & ~Q(status='cancelled'),
+                name='unique_active_slot',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.date} at {self.time}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded slot and status so a moved booking frees its
+        # old day, the daily status counts move with it and the waitlist
+        # hears of the slot it gave up
+        instance._loaded_date = instance.__dict__.get('date')
+        instance._loaded_start_minute = instance.__dict__.get('start_minute')
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    def schedule_reminder(self, now=None):
+        """Set ``remind_at`` to the next reminder still ahead of ``now``"""
+        if self.status not in self.REMINDED_STATUSES:
+            self.remind_at = None
+            return
+        # ``date`` may still be the 'YYYY-MM-DD' string a view passed in
+        day = self._meta.get_field('date').to_python(self.date)
+        self.remind_at = next_reminder_at(
+            day, self.start_minute, settings.APPOINTMENTS_REMINDER_HOURS, now or timezone.now()
+        )
+
+    def save(self, *args, **kwargs):
+        self.start_minute = parse_time_of_day(self.time)
+        self.schedule_reminder()
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        # Increment in the database, so a write racing this one still sees
+        # the version change; the new value is loaded again when read
+        self.version = F('version') + 1
+        super().save(*args, **kwargs)
+        del self.version
+
+
+class Patient(models.Model):
+    """A person across bookings, identified by normalized phone and email (patients.py)"""
+
+    name = models.CharField(max_length=100)
+    # E.164, e.g. '+919876543210'
+    phone = models.CharField(max_length=16)
+    # Lowercased
+    email = models.EmailField()
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'patients'
+        indexes = [
+            models.Index(fields=['email'], name='patient_email_idx'),
+        ]
+        constraints = [
+            # Also the index phone lookups use
+            models.UniqueConstraint(fields=['phone', 'email'], name='unique_patient_contact'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.phone})"
+
+
+class AppointmentSeries(models.Model):
+    """A booking repeated every ``interval`` days or weeks from ``starts_on``
+    to ``ends_on``; its occurrences are expanded when read (series.py)"""
+
+    FREQUENCY_CHOICES = [
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+    ]
+    FREQUENCY_DAYS = {'daily': 1, 'weekly': 7}
+    STATUS_CHOICES = [
+        (status, label) for status, label in Appointment.STATUS_CHOICES
+        if status in Appointment.REMINDED_STATUSES
+    ]
+
+    name = models.CharField(max_length=100)
+    email = models.EmailField()
+    phone = models.CharField(max_length=20)
+    patient = models.ForeignKey(
+        Patient, on_delete=models.SET_NULL, null=True, blank=True, related_name='series',
+    )
+    time = models.CharField(max_length=20)
+    start_minute = models.PositiveSmallIntegerField(editable=False)
+    message = models.TextField(blank=True, null=True)
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default='weekly')
+    interval = models.PositiveSmallIntegerField(default=1)
+    # First occurrence, and the last date one can fall on
+    starts_on = models.DateField()
+    ends_on = models.DateField()
+    # Status of every occurrence not stored as an exception
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='confirmed')
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'appointment_series'
+        verbose_name_plural = 'appointment series'
+        indexes = [
+            # Series overlapping a read window
+            models.Index(fields=['ends_on', 'starts_on'], name='series_window_idx'),
+            # Series that may hold one slot, checked by every booking
+            models.Index(fields=['start_minute', 'ends_on'], name='series_slot_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} - {self.rule}"
+
+    @property
+    def step_days(self):
+        return self.FREQUENCY_DAYS[self.frequency] * self.interval
+
+    @property
+    def rule(self):
+        """The recurrence as an iCalendar RRULE"""
+        return f"FREQ={self.frequency.upper()};INTERVAL={self.interval};UNTIL={self.ends_on:%Y%m%d}"
+
+    def clean(self):
+        if parse_time_of_day(self.time) is None:
+            raise ValidationError('Time must be a clock time such as 9:00 AM or 14:30')
+        if self.starts_on and self.ends_on and self.ends_on < self.starts_on:
+            raise ValidationError('The series must end on or after its first occurrence')
+
+    def occurs_on(self, day):
+        return self.starts_on <= day <= self.ends_on and (day - self.starts_on).days % self.step_days == 0
+
+    def dates(self):
+        """Every occurrence date, exceptions included"""
+        return [
+            date.fromordinal(ordinal) for ordinal in
+            range(self.starts_on.toordinal(), self.ends_on.toordinal() + 1, self.step_days)
+        ]
+
+    def save(self, *args, **kwargs):
+        self.start_minute = parse_time_of_day(self.time)
+        super().save(*args, **kwargs)
+
+
+class WaitlistEntry(models.Model):
+    """A patient waiting for any slot from ``date_from`` to ``date_to``
+    starting between ``earliest_minute`` and ``latest_minute``; freed slots
+    are offered to the longest waiting match (waitlist.py)"""
+
+    STATUS_CHOICES = [
+        ('waiting', 'Waiting'),
+        ('offered', 'Offered'),
+        ('withdrawn', 'Withdrawn'),
+    ]
+
+    name = models.CharField(max_length=100)
+    email = models.EmailField()
+    phone = models.CharField(max_length=20)
+    patient = models.ForeignKey(
+        Patient, on_delete=models.SET_NULL, null=True, blank=True, related_name='waitlist_entries',
+    )
+    date_from = models.DateField()
+    date_to = models.DateField()
+    earliest_minute = models.PositiveSmallIntegerField(default=0)
+    latest_minute = models.PositiveSmallIntegerField(default=24 * 60 - 1)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting')
+    # The slot offered, held for the patient under ``hold`` (holds.py)
+    offered_date = models.DateField(null=True, blank=True, editable=False)
+    offered_minute = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    hold = models.CharField(max_length=100, blank=True, editable=False)
+    offered_at = models.DateTimeField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'waitlist'
+        verbose_name_plural = 'waitlist entries'
+        indexes = [
+            models.Index(fields=['status', 'id'], name='waitlist_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} waiting {self.date_from} to {self.date_to}"
+
+    def clean(self):
+        if self.date_from and self.date_to and self.date_to < self.date_from:
+            raise ValidationError('The last date must not be before the first')
+        if self.earliest_minute > self.latest_minute:
+            raise ValidationError('The earliest time must not be after the latest')
+
+
+class WaitlistDay(models.Model):
+    """One day a waiting entry covers, with its time window.
+
+    Kept only while the entry is waiting, so the rows for a date, in entry
+    order, are exactly the queue for a slot freed on it.
+    """
+
+    entry = models.ForeignKey(WaitlistEntry, on_delete=models.CASCADE, related_name='days')
+    date = models.DateField()
+    earliest_minute = models.PositiveSmallIntegerField()
+    latest_minute = models.PositiveSmallIntegerField()
+
+    class Meta:
+        db_table = 'waitlist_days'
+        indexes = [
+            # Walked in entry order for a freed slot's date, windows included
+            # so the walk never reads the table
+            models.Index(
+                fields=['date', 'entry', 'earliest_minute', 'latest_minute'], name='waitlist_day_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.entry_id} on {self.date}"
+
+
+class ClinicHours(models.Model):
+    """A bookable session on one weekday, split into equal slots"""
+
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    ]
+
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    opens_at = models.TimeField()
+    closes_at = models.TimeField()
+    slot_minutes = models.PositiveSmallIntegerField(default=60)
+
+    class Meta:
+        db_table = 'clinic_hours'
+        ordering = ['weekday', 'opens_at']
+        verbose_name_plural = 'clinic hours'
+        constraints = [
+            models.UniqueConstraint(fields=['weekday', 'opens_at'], name='unique_clinic_session'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_weekday_display()} {self.opens_at:%H:%M}-{self.closes_at:%H:%M}"
+
+    def clean(self):
+        if self.opens_at and self.closes_at and self.opens_at >= self.closes_at:
+            raise ValidationError('Closing time must be after opening time')
+        if not self.slot_minutes or self.slot_minutes % SLOT_GRANULARITY:
+            raise ValidationError(f'Slot length must be a multiple of {SLOT_GRANULARITY} minutes')
+
+    def slot_starts(self):
+        """Start minute of every whole slot in this session"""
+        opens = self.opens_at.hour * 60 + self.opens_at.minute
+        closes = self.closes_at.hour * 60 + self.closes_at.minute
+        return range(opens, closes - self.slot_minutes + 1, self.slot_minutes)
+
+
+class DayOccupancy(models.Model):
+    """Booked slots of one day as a bitmap, one bit per SLOT_GRANULARITY minutes.
+
+    Maintained from the appointment signals so availability lookups never
+    have to read the appointments table.
+    """
+
+    date = models.DateField(primary_key=True)
+    booked = models.BinaryField(default=empty_occupancy)
+
+    class Meta:
+        db_table = 'day_occupancy'
+        verbose_name_plural = 'day occupancy'
+
+    def __str__(self):
+        return f"{self.date} occupancy"
+
+
+class DailyStatusCount(models.Model):
+    """Appointments on one day in one status, kept current by signals.py"""
+
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Appointment.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'daily_status_counts'
+        constraints = [
+            # Also the index calendar reads range over
+            models.UniqueConstraint(fields=['date', 'status'], name='unique_daily_status'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.status}: {self.count}"
+
+
+class IdempotencyKey(models.Model):
+    """Stored outcome of a create request, for the database idempotency store"""
+
+    key = models.CharField(max_length=300, primary_key=True)
+    fingerprint = models.CharField(max_length=64)
+    # NULL while the first request with this key is still running
+    status_code = models.PositiveSmallIntegerField(null=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    content = models.BinaryField(null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'idempotency_keys'
+
+    def __str__(self):
+        return self.key
+
+
+class QueuedBooking(models.Model):
+    """A validated booking accepted in queued intake mode, waiting to be flushed"""
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('booked', 'Booked'),
+        ('rejected', 'Rejected'),
+    ]
+
+    tracking_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    # No database constraint: on PostgreSQL appointments is partitioned by
+    # date and its id alone is not a unique key (see partitions.py)
+    appointment = models.ForeignKey(
+        Appointment, null=True, blank=True, on_delete=models.SET_NULL, related_name='+',
+        db_constraint=False,
+    )
+    error = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'queued_bookings'
+        indexes = [
+            # The flusher claims the oldest queued rows
+            models.Index(fields=['status', 'id'], name='queued_status_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tracking_id} ({self.status})"
+
+
+class OutboxMessage(models.Model):
+    """A message to a patient, written in the transaction of the change it reports"""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    CHANNEL_CHOICES = [
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+    ]
+
+    # No database constraint, as for QueuedBooking.appointment
+    appointment = models.ForeignKey(
+        Appointment, null=True, blank=True, on_delete=models.SET_NULL, related_name='+',
+        db_constraint=False,
+    )
+    kind = models.CharField(max_length=30)
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=254)
+    subject = models.CharField(max_length=200, blank=True)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Not delivered before this time; pushed back after each failed attempt
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.CharField(max_length=500, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'outbox_messages'
+        indexes = [
+            # Workers claim pending messages that are due, oldest first
+            models.Index(fields=['status', 'available_at', 'id'], name='outbox_status_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.channel} to {self.recipient} ({self.status})"
@@ -0,0 +1,148 @@
+"""Transactional outbox for booking confirmations.
+
+``enqueue_confirmations`` writes one OutboxMessage per configured channel
+in the same transaction as the appointment insert, so a confirmation
+exists exactly when the booking committed and the request never waits on
+an email or SMS provider. ``manage.py deliver_outbox`` workers claim due
+messages with ``SELECT ... FOR UPDATE SKIP LOCKED`` (so more workers
+deliver more messages) and commit the claim. Outside the transaction they
+hand each channel's share of a batch to its provider in one go, then
+record the outcome: sent, retried later with exponential backoff, or
+failed after APPOINTMENTS_OUTBOX_MAX_ATTEMPTS.
+"""
+import random
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Appointment, OutboxMessage
+from .sms import send_sms
+
+CONFIRMATION = 'confirmation'
+DEFAULT_BATCH_SIZE = 100
+# Longest wait between two attempts at one message
+MAX_BACKOFF_SECONDS = 60 * 60
+# How long a worker has to deliver a claimed batch before it is offered again
+CLAIM_SECONDS = 5 * 60
+
+
+def confirmation_text(appointment):
+    day = Appointment._meta.get_field('date').to_python(appointment.date)
+    return (
+        f'Hello {appointment.name}, your appointment on {day:%A %d %B %Y} at '
+        f'{appointment.time} is booked. Reference: {appointment.id}.'
+    )
+
+
+def confirmation_messages(appointment):
+    """Unsaved outbox messages confirming ``appointment``, one per channel"""
+    text = confirmation_text(appointment)
+    return [
+        OutboxMessage(
+            appointment_id=appointment.id,
+            kind=CONFIRMATION,
+            channel=channel,
+            recipient=appointment.email if channel == 'email' else appointment.phone,
+            subject='Appointment confirmation',
+            body=text,
+        )
+        for channel in settings.APPOINTMENTS_CONFIRMATION_CHANNELS
+    ]
+
+
+def enqueue_confirmations(appointments):
+    """Queue confirmations; call inside the transaction that inserts ``appointments``"""
+    messages = [m for appointment in appointments for m in confirmation_messages(appointment)]
+    if messages:
+        OutboxMessage.objects.bulk_create(messages)
+
+
+def deliver_email(messages):
+    """Send emails over one EMAIL_BACKEND connection; returns {id: error}"""
+    errors = {}
+    with get_connection() as connection:
+        for message in messages:
+            try:
+                EmailMessage(
+                    message.subject, message.body, to=[message.recipient], connection=connection,
+                ).send()
+            except Exception as e:
+                errors[message.id] = str(e) or type(e).__name__
+    return errors
+
+
+def deliver_sms(messages):
+    """Send texts through the APPOINTMENTS_SMS_URL gateway; returns {id: error}"""
+    errors = {}
+    for message in messages:
+        try:
+            send_sms(message.recipient, message.body)
+        except Exception as e:
+            errors[message.id] = str(e) or type(e).__name__
+    return errors
+
+
+PROVIDERS = {
+    'email': deliver_email,
+    'sms': deliver_sms,
+}
+
+
+def backoff(attempts):
+    """Delay before the next attempt after ``attempts`` failures, with jitter"""
+    delay = min(settings.APPOINTMENTS_OUTBOX_RETRY_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+def deliver_pending(batch_size=DEFAULT_BATCH_SIZE, now=None):
+    """Deliver up to ``batch_size`` due messages; returns (sent, failed attempts)"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        if not batch:
+            return 0, 0
+        # The claim: the attempt is counted and the batch is off the queue
+        # until CLAIM_SECONDS from now, when a dead worker's batch comes back
+        claimed_until = now + timedelta(seconds=CLAIM_SECONDS)
+        OutboxMessage.objects.filter(id__in=[m.id for m in batch]).update(
+            attempts=F('attempts') + 1, available_at=claimed_until,
+        )
+
+    # Delivered after the claim commits, so a slow provider holds no row locks
+    by_channel = defaultdict(list)
+    for message in batch:
+        by_channel[message.channel].append(message)
+    errors = {}
+    for channel, messages in by_channel.items():
+        provider = PROVIDERS.get(channel)
+        if provider is None:
+            errors.update({m.id: f'Unknown channel: {channel}' for m in messages})
+        else:
+            errors.update(provider(messages))
+
+    for message in batch:
+        message.attempts += 1
+        if message.id not in errors:
+            message.status = 'sent'
+            message.sent_at = now
+            message.last_error = ''
+            continue
+        message.last_error = errors[message.id][:500]
+        if message.attempts >= settings.APPOINTMENTS_OUTBOX_MAX_ATTEMPTS:
+            message.status = 'failed'
+        else:
+            message.available_at = now + backoff(message.attempts)
+    # An upsert on the primary key writes the whole batch in one
+    # statement, as in intake.flush_queue
+    OutboxMessage.objects.bulk_create(
+        batch, update_conflicts=True, unique_fields=['id'],
+        update_fields=['status', 'attempts', 'available_at', 'last_error', 'sent_at'],
+    )
+    return len(batch) - len(errors), len(errors)
@@ -0,0 +1,144 @@
+"""Monthly range partitions of the appointments table on PostgreSQL.
+
+Migration 0008 turns ``appointments`` into a table partitioned by
+``date``: one ``appointments_pYYYYMM`` partition per month plus
+``appointments_default`` for dates no partition covers yet. The ORM keeps
+using the parent table; PostgreSQL routes rows to their month and prunes
+partitions from any query that filters on ``date``.
+
+``manage.py partition_appointments`` creates months ahead of time and
+detaches old ones, moving them to the ``appointments_archive`` schema or
+dropping them. Other databases keep a plain table and these helpers are
+not used.
+"""
+import re
+from datetime import date
+
+TABLE = 'appointments'
+PARTITION_PREFIX = 'appointments_p'
+DEFAULT_PARTITION = 'appointments_default'
+ARCHIVE_SCHEMA = 'appointments_archive'
+# Future months created by the migration and by default by the command
+MONTHS_AHEAD = 3
+
+_PARTITION_RE = re.compile(rf'^{PARTITION_PREFIX}(\d{{4}})(\d{{2}})$')
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(month, months):
+    year, index = divmod(month.month - 1 + months, 12)
+    return date(month.year + year, index + 1, 1)
+
+
+def partition_name(month):
+    return f'{PARTITION_PREFIX}{month:%Y%m}'
+
+
+def is_partitioned(connection):
+    """Whether the appointments table is partitioned on this connection"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))',
+            [TABLE],
+        )
+        return cursor.fetchone()[0]
+
+
+def attached_months(cursor):
+    """First day of every month that has an attached partition, oldest first"""
+    cursor.execute(
+        'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+        'WHERE i.inhparent = to_regclass(%s)',
+        [TABLE],
+    )
+    months = []
+    for (name,) in cursor.fetchall():
+        match = _PARTITION_RE.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def create_default_partition(cursor):
+    cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT')
+
+
+def create_partition(cursor, month):
+    """Create the partition for ``month``.
+
+    Rows that already landed in the default partition for that month are
+    moved into the new partition before it is attached.
+    """
+    name = partition_name(month)
+    # Bounds are dates built here, never user input
+    bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    cursor.execute(
+        f'SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE date >= %s AND date < %s)',
+        [month, add_months(month, 1)],
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(f'CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES {bounds}')
+        return
+
+    cursor.execute(
+        f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+    )
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE date >= %s AND date < %s RETURNING *) '
+        f'INSERT INTO {name} SELECT * FROM moved',
+        [month, add_months(month, 1)],
+    )
+    cursor.execute(f'ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}')
+
+
+def missing_months(cursor, first, last):
+    """Months from ``first`` to ``last`` that have no partition yet"""
+    existing = set(attached_months(cursor))
+    missing = []
+    month = month_start(first)
+    while month <= last:
+        if month not in existing:
+            missing.append(month)
+        month = add_months(month, 1)
+    return missing
+
+
+def ensure_partitions(cursor, first, last):
+    """Create any missing monthly partition from ``first`` to ``last``; returns the new months"""
+    created = missing_months(cursor, first, last)
+    for month in created:
+        create_partition(cursor, month)
+    return created
+
+
+def partition_counts(cursor, month):
+    """Rows per status in the partition of ``month``"""
+    cursor.execute(f'SELECT status, count(*) FROM {partition_name(month)} GROUP BY status')
+    return dict(cursor.fetchall())
+
+
+def detach_partition(cursor, month, anonymize=False, drop=False):
+    """Take ``month`` out of the appointments table.
+
+    The partition is dropped, or moved to the archive schema; ``anonymize``
+    first replaces names, phone numbers and messages, and swaps each email
+    for a stable hash so archived rows of one patient still group together.
+    """
+    name = partition_name(month)
+    cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+    if drop:
+        cursor.execute(f'DROP TABLE {name}')
+        return
+
+    if anonymize:
+        cursor.execute(
+            f"UPDATE {name} SET name = 'Anonymized', phone = '', message = NULL, "
+            f"email = 'patient-' || left(md5(lower(email)), 16) || '@anonymized.invalid'"
+        )
+    cursor.execute(f'CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}')
+    cursor.execute(f'ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}')
@@ -0,0 +1,94 @@
+"""Patients behind appointments.
+
+A patient is identified by their phone number in E.164 form and their
+lowercased email, so '098765 43210' / 'Asha@Example.com' and
+'+91 98765-43210' / 'asha@example.com' are the same person. Both must
+match: the same phone with another email is another patient, since
+families often share a phone, and the ON CONFLICT upsert can only target
+one unique key. Bookings upsert their patient with one ``INSERT ... ON
+CONFLICT`` statement per batch (``link_patients``), and
+``appointments.patient_id`` is indexed with the date for history lookups.
+"""
+import re
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from .models import Patient
+
+_SEPARATORS_RE = re.compile(r'[\s().\-/]')
+# National numbers without a country code or trunk prefix
+NATIONAL_DIGITS = 10
+# One patient in API responses
+PATIENT_FIELDS = ['id', 'name', 'phone', 'email', 'created_at', 'updated_at']
+UPSERT_COLUMNS = ['name', 'phone', 'email', 'created_at', 'updated_at']
+
+
+def normalize_phone(value):
+    """Phone number in E.164 ('+919876543210'), or None if it cannot be one"""
+    number = _SEPARATORS_RE.sub('', value or '')
+    if number.startswith('+'):
+        digits = number[1:]
+    elif number.startswith('00'):
+        digits = number[2:]
+    elif number.startswith('0') and len(number) == NATIONAL_DIGITS + 1:
+        digits = settings.APPOINTMENTS_DEFAULT_COUNTRY_CODE + number[1:]
+    elif len(number) == NATIONAL_DIGITS:
+        digits = settings.APPOINTMENTS_DEFAULT_COUNTRY_CODE + number
+    else:
+        digits = number
+    if not digits.isdigit() or digits.startswith('0') or not 8 <= len(digits) <= 15:
+        return None
+    return '+' + digits
+
+
+def normalize_email(value):
+    return (value or '').strip().lower()
+
+
+def patient_key(appointment):
+    """(phone, email) identifying the patient of ``appointment``; phone is None if invalid"""
+    return normalize_phone(appointment.phone), normalize_email(appointment.email)
+
+
+def _upsert(names):
+    """Insert the patients of ``names`` ((phone, email) -> name), renaming the
+    ones that exist; returns their ids by (phone, email).
+
+    Written out rather than through ``bulk_create(update_conflicts=True)``,
+    whose per-value SQL compilation was most of the time of a bulk import.
+    """
+    quote = connection.ops.quote_name
+    now = Patient._meta.get_field('updated_at').get_db_prep_value(timezone.now(), connection)
+    rows = [(name, phone, email) for (phone, email), name in names.items()]
+    per_statement = connection.ops.bulk_batch_size(UPSERT_COLUMNS, rows)
+    ids = {}
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), per_statement):
+            chunk = rows[i:i + per_statement]
+            sql = (
+                f'INSERT INTO {quote(Patient._meta.db_table)} ({", ".join(map(quote, UPSERT_COLUMNS))}) '
+                f'VALUES {", ".join(["(%s, %s, %s, %s, %s)"] * len(chunk))} '
+                f'ON CONFLICT ({quote("phone")}, {quote("email")}) DO UPDATE SET '
+                f'{quote("name")} = EXCLUDED.{quote("name")}, {quote("updated_at")} = EXCLUDED.{quote("updated_at")} '
+                f'RETURNING {quote("id")}, {quote("phone")}, {quote("email")}'
+            )
+            cursor.execute(sql, [value for row in chunk for value in (*row, now, now)])
+            ids.update(((phone, email), pk) for pk, phone, email in cursor.fetchall())
+    return ids
+
+
+def link_patients(appointments):
+    """Upsert the patients of unsaved ``appointments`` and set their ``patient_id``.
+
+    One statement for the whole batch; a returning patient's name is
+    updated to the one on their latest booking. Appointments whose phone
+    cannot be normalized keep no patient.
+    """
+    names = {}
+    for appointment in appointments:
+        key = patient_key(appointment)
+        if key[0] is not None:
+            names[key] = appointment.name
+    ids = _upsert(names) if names else {}
+    for appointment in appointments:
+        appointment.patient_id = ids.get(patient_key(appointment))
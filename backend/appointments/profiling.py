@@ -0,0 +1,224 @@
+"""Sampling profiler for individual requests.
+
+``ProfilingMiddleware`` profiles a request when it carries a valid signed
+``X-Profile-Token`` header (see ``make_token``) or is picked by
+``APPOINTMENTS_PROFILE_RATE``. A background thread then samples the
+request thread's stack every ``APPOINTMENTS_PROFILE_INTERVAL_MS``. The
+middleware also times every database query. Profiles are written to
+``APPOINTMENTS_PROFILE_DIR`` as JSON, with the stacks in the collapsed
+format that flamegraph.pl and speedscope read. Only the newest
+``APPOINTMENTS_PROFILE_MAX`` profiles are kept.
+
+Requests that are not profiled only pay for a header lookup and, when a
+rate is set, one random draw.
+"""
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+
+TOKEN_HEADER = 'HTTP_X_PROFILE_TOKEN'
+TOKEN_SALT = 'appointments.profiling'
+# Default lifetime of a token from make_token, in seconds
+TOKEN_MAX_AGE = 60 * 60
+
+_PROFILE_ID_RE = re.compile(r'^\d{20}-[0-9a-f]{8}$')
+
+
+def make_token(max_age=TOKEN_MAX_AGE):
+    """Signed X-Profile-Token value, valid for ``max_age`` seconds"""
+    return signing.dumps({'expires': time.time() + max_age}, salt=TOKEN_SALT)
+
+
+def valid_token(token):
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        return False
+    return data.get('expires', 0) > time.time()
+
+
+class QueryTimer:
+    """Database execute wrapper that counts queries and their total time"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+class StackSampler:
+    """Collect the stacks of one thread from a background thread.
+
+    Frames outside ``root`` (the server and middleware below the profiled
+    call) are cut off, so every stack starts at the view.
+    """
+
+    def __init__(self, thread_id, interval, root):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root = root
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def _collapse(self, frame):
+        names = []
+        while frame is not None and frame.f_code is not self.root:
+            code = frame.f_code
+            names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                stack = self._collapse(frame)
+                if stack:
+                    self.stacks[stack] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+class ProfileStore:
+    """Newest profiles as JSON files in one directory"""
+
+    def __init__(self, directory, max_profiles):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def _path(self, profile_id):
+        return os.path.join(self.directory, f'{profile_id}.json')
+
+    def save(self, profile):
+        os.makedirs(self.directory, exist_ok=True)
+        # Ids sort by creation time, which is what pruning relies on
+        profile_id = f'{time.time_ns():020d}-{uuid.uuid4().hex[:8]}'
+        path = self._path(profile_id)
+        with open(path + '.tmp', 'w') as out:
+            json.dump({'id': profile_id, **profile}, out)
+        os.replace(path + '.tmp', path)
+        for stale in self.ids()[self.max_profiles:]:
+            try:
+                os.remove(self._path(stale))
+            except FileNotFoundError:
+                pass
+        return profile_id
+
+    def ids(self):
+        """Stored profile ids, newest first"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        ids = [name[:-5] for name in names if name.endswith('.json')]
+        return sorted((i for i in ids if _PROFILE_ID_RE.match(i)), reverse=True)
+
+    def get(self, profile_id):
+        """The stored profile, or None for an unknown or malformed id"""
+        if not _PROFILE_ID_RE.match(profile_id):
+            return None
+        try:
+            with open(self._path(profile_id)) as stored:
+                return json.load(stored)
+        except (FileNotFoundError, ValueError):
+            return None
+
+
+def get_store():
+    return ProfileStore(settings.APPOINTMENTS_PROFILE_DIR, settings.APPOINTMENTS_PROFILE_MAX)
+
+
+def collapsed_stacks(profile):
+    """Profile stacks as 'frame;frame;frame count' lines"""
+    return ''.join(f'{stack} {count}\n' for stack, count in profile['stacks'].items())
+
+
+class ProfilingMiddleware:
+    """Profile sampled or explicitly requested requests; see the module docstring"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.rate = settings.APPOINTMENTS_PROFILE_RATE
+        self.interval = settings.APPOINTMENTS_PROFILE_INTERVAL_MS / 1000
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _wanted(self, request):
+        token = request.META.get(TOKEN_HEADER)
+        if token is not None:
+            return valid_token(token)
+        return self.rate > 0 and random.random() < self.rate
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._wanted(request):
+            return self.get_response(request)
+
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            sampler = stack.enter_context(
+                StackSampler(threading.get_ident(), self.interval, self.__call__.__code__)
+            )
+            response = self.get_response(request)
+        self._save(request, response, time.perf_counter() - started, sampler, timer)
+        return response
+
+    async def __acall__(self, request):
+        if not self._wanted(request):
+            return await self.get_response(request)
+
+        # Queries of async views run in worker threads the wrappers cannot
+        # see, so only wall time and the event loop's stacks are recorded
+        started = time.perf_counter()
+        with StackSampler(threading.get_ident(), self.interval, self.__acall__.__code__) as sampler:
+            response = await self.get_response(request)
+        self._save(request, response, time.perf_counter() - started, sampler, None)
+        return response
+
+    def _save(self, request, response, wall, sampler, timer):
+        match = request.resolver_match
+        get_store().save({
+            'created_at': time.time(),
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'wall_ms': round(wall * 1000, 3),
+            'db_ms': round(timer.seconds * 1000, 3) if timer else None,
+            'queries': timer.count if timer else None,
+            'interval_ms': self.interval * 1000,
+            'samples': sum(sampler.stacks.values()),
+            'stacks': dict(sampler.stacks),
+        })
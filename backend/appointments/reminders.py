@@ -0,0 +1,181 @@
+"""Appointment reminders.
+
+Every booking carries ``remind_at``, the time its next reminder is due
+(``APPOINTMENTS_REMINDER_HOURS`` before the slot). The partial index on
+``remind_at`` is the due-time queue: ``send_due`` takes the oldest due
+rows off it in batches with ``SELECT ... FOR UPDATE SKIP LOCKED`` and
+claims them by moving ``remind_at`` to the retry time, then commits. The
+reminders are sent outside the transaction and each row then moves on to
+its next reminder, so several workers never send the same reminder twice.
+``next_due`` reads the head of the index, which is how long a worker may
+sleep. ``remind_at`` is cleared when an appointment is cancelled or
+completed, so the index only holds reminders that are still to be sent.
+
+A worker that dies mid-batch leaves its claimed rows at the retry time,
+and they are sent again then, so delivery is at least once.
+"""
+import json
+import sys
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from .models import Appointment
+from .slots import next_reminder_at, starts_at
+from .sms import send_sms
+
+# Columns a sender may use
+REMINDER_FIELDS = [
+    'id', 'name', 'email', 'phone', 'date', 'time', 'start_minute', 'status', 'remind_at',
+]
+DEFAULT_BATCH_SIZE = 200
+
+
+def reminder_text(appointment):
+    return (
+        f'Hello {appointment.name}, this is a reminder of your appointment '
+        f'on {appointment.date:%A %d %B %Y} at {appointment.time}.'
+    )
+
+
+class ReminderSender:
+    """Delivers reminders. Subclasses implement ``send_one``, or ``send`` to batch."""
+
+    def send_one(self, appointment):
+        raise NotImplementedError
+
+    def send(self, appointments):
+        """Send each reminder; returns the appointments that failed"""
+        failed = []
+        for appointment in appointments:
+            try:
+                self.send_one(appointment)
+            except Exception:
+                failed.append(appointment)
+        return failed
+
+
+class ConsoleSender(ReminderSender):
+    """Print reminders; for development"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send_one(self, appointment):
+        self.stream.write(f'[reminder] appointment {appointment.id} <{appointment.email}> '
+                          f'{reminder_text(appointment)}\n')
+
+
+class FileSender(ReminderSender):
+    """Append reminders to APPOINTMENTS_REMINDER_FILE as NDJSON; for testing"""
+
+    def __init__(self, path=None):
+        self.path = path or settings.APPOINTMENTS_REMINDER_FILE
+
+    def send(self, appointments):
+        with open(self.path, 'a') as out:
+            for appointment in appointments:
+                out.write(json.dumps({
+                    'appointment_id': appointment.id,
+                    'email': appointment.email,
+                    'phone': appointment.phone,
+                    'remind_at': appointment.remind_at.isoformat(),
+                    'text': reminder_text(appointment),
+                }) + '\n')
+        return []
+
+
+class EmailSender(ReminderSender):
+    """Email through Django's EMAIL_BACKEND, one connection per batch"""
+
+    def send(self, appointments):
+        failed = []
+        with get_connection() as connection:
+            for appointment in appointments:
+                message = EmailMessage(
+                    'Appointment reminder', reminder_text(appointment),
+                    to=[appointment.email], connection=connection,
+                )
+                try:
+                    message.send()
+                except Exception:
+                    failed.append(appointment)
+        return failed
+
+
+class SmsSender(ReminderSender):
+    """Text reminders through the APPOINTMENTS_SMS_URL gateway (see sms.py)"""
+
+    def send_one(self, appointment):
+        send_sms(appointment.phone, reminder_text(appointment))
+
+
+SENDERS = {
+    'console': ConsoleSender,
+    'file': FileSender,
+    'email': EmailSender,
+    'sms': SmsSender,
+}
+
+
+def get_sender():
+    """The sender selected by APPOINTMENTS_REMINDER_SENDER"""
+    return SENDERS[settings.APPOINTMENTS_REMINDER_SENDER]()
+
+
+def due_reminders(now):
+    """Appointments with a reminder due at ``now``, oldest first, off the partial index"""
+    return Appointment.objects.filter(remind_at__lte=now).order_by('remind_at')
+
+
+def send_due(sender=None, batch_size=DEFAULT_BATCH_SIZE, now=None):
+    """Send up to ``batch_size`` due reminders; returns (sent, failed).
+
+    Sent rows move on to their next reminder. Failed rows are retried after
+    APPOINTMENTS_REMINDER_RETRY_SECONDS, unless the slot starts first.
+    """
+    sender = sender or get_sender()
+    now = now or timezone.now()
+    retry_at = now + timedelta(seconds=settings.APPOINTMENTS_REMINDER_RETRY_SECONDS)
+    with transaction.atomic():
+        batch = list(
+            due_reminders(now).select_for_update(skip_locked=True)
+            .only(*REMINDER_FIELDS)[:batch_size]
+        )
+        if not batch:
+            return 0, 0
+
+        # Rows changed to a final status by a path that left remind_at set
+        # are dropped from the queue without a reminder
+        due = [a for a in batch if a.status in Appointment.REMINDED_STATUSES]
+        dropped = [a.id for a in batch if a.status not in Appointment.REMINDED_STATUSES]
+        if dropped:
+            Appointment.objects.filter(id__in=dropped).update(remind_at=None)
+        # The claim: pushing remind_at to the retry time takes the rows off
+        # the queue once this commits, and puts them back if the worker dies
+        Appointment.objects.filter(id__in=[a.id for a in due]).update(remind_at=retry_at)
+    if not due:
+        return 0, 0
+
+    # Sent after the claim commits, so a slow sender holds no row locks
+    failed = {appointment.id for appointment in sender.send(due)}
+    hours = settings.APPOINTMENTS_REMINDER_HOURS
+    for appointment in due:
+        if (appointment.id in failed
+                and retry_at < starts_at(appointment.date, appointment.start_minute)):
+            appointment.remind_at = retry_at
+        else:
+            appointment.remind_at = next_reminder_at(
+                appointment.date, appointment.start_minute, hours, now
+            )
+    # Rows rescheduled or cancelled while sending no longer hold the claim
+    # and keep what was written since
+    Appointment.objects.filter(remind_at=retry_at).bulk_update(due, ['remind_at'])
+    return len(due) - len(failed), len(failed)
+
+
+def next_due():
+    """When the earliest pending reminder is due, or None"""
+    return Appointment.objects.filter(remind_at__isnull=False).aggregate(due=Min('remind_at'))['due']
@@ -0,0 +1,130 @@
+"""Per-day appointment counts by status.
+
+``daily_status_counts`` holds one row per (date, status), so a calendar of
+any length reads one row per day and status instead of grouping the
+appointments table. The signals in signals.py keep it current: a save or
+delete adds its +1/-1 changes in one upsert, and bulk writes recount the
+days they touched. ``manage.py rollup_status_counts`` checks the table
+against appointments and rebuilds it.
+"""
+from collections import Counter
+from datetime import timedelta
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min
+from .models import Appointment, DailyStatusCount
+from .series import occurrence_counts
+
+STATUSES = [status for status, _ in Appointment.STATUS_CHOICES]
+# Days recounted per transaction
+RECOUNT_CHUNK = 500
+# Longest range the calendar endpoint serves
+MAX_CALENDAR_DAYS = 366
+
+
+def _upsert_counts(rows, on_conflict):
+    """Insert (date, status, count) ``rows``; an existing row's count is
+    added to ('add'), replaced ('set') or kept ('keep')"""
+    quote = connection.ops.quote_name
+    table = quote(DailyStatusCount._meta.db_table)
+    count = quote('count')
+    action = {
+        'add': f'DO UPDATE SET {count} = {table}.{count} + EXCLUDED.{count}',
+        'set': f'DO UPDATE SET {count} = EXCLUDED.{count}',
+        'keep': 'DO NOTHING',
+    }[on_conflict]
+    per_statement = connection.ops.bulk_batch_size(['date', 'status', 'count'], rows)
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), per_statement):
+            chunk = rows[i:i + per_statement]
+            values = ', '.join(['(%s, %s, %s)'] * len(chunk))
+            sql = (
+                f'INSERT INTO {table} ({quote("date")}, {quote("status")}, {count}) VALUES {values} '
+                f'ON CONFLICT ({quote("date")}, {quote("status")}) {action}'
+            )
+            params = []
+            for day, status, n in chunk:
+                params += [connection.ops.adapt_datefield_value(day), status, n]
+            cursor.execute(sql, params)
+
+
+def adjust_counts(deltas):
+    """Add ``deltas`` ({(date, status): change}) to the stored counts"""
+    deltas = [(day, status, change) for (day, status), change in deltas.items() if change]
+    if deltas:
+        _upsert_counts(deltas, 'add')
+
+
+def appointment_counts(queryset):
+    """{(date, status): count} of ``queryset``, grouped in the database"""
+    rows = queryset.order_by().values_list('date', 'status').annotate(n=Count('id'))
+    return Counter({(day, status): n for day, status, n in rows})
+
+
+def recount_days(dates):
+    """Recount each date's rows from appointments.
+
+    The day's count rows are locked first, as refresh_occupancy does, so a
+    booking committing meanwhile adds its +1 after the recount, not into it.
+    """
+    dates = sorted(set(dates), key=str)
+    for i in range(0, len(dates), RECOUNT_CHUNK):
+        chunk = dates[i:i + RECOUNT_CHUNK]
+        with transaction.atomic():
+            _upsert_counts([(day, status, 0) for day in chunk for status in STATUSES], 'keep')
+            list(DailyStatusCount.objects.select_for_update().filter(date__in=chunk).values_list('id'))
+            counts = appointment_counts(Appointment.objects.filter(date__in=chunk))
+            _upsert_counts([(day, status, counts[day, status]) for day in chunk for status in STATUSES], 'set')
+
+
+def _in_range(queryset, date_from, date_to):
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    return queryset
+
+
+def compare_counts(date_from=None, date_to=None):
+    """(date, status, stored, actual) of every stored count that is wrong"""
+    actual = appointment_counts(_in_range(Appointment.objects.all(), date_from, date_to))
+    stored = Counter({
+        (day, status): count for day, status, count in
+        _in_range(DailyStatusCount.objects.all(), date_from, date_to)
+        .values_list('date', 'status', 'count')
+    })
+    return sorted(
+        (day, status, stored[day, status], actual[day, status])
+        for day, status in set(actual) | set(stored)
+        if stored[day, status] != actual[day, status]
+    )
+
+
+def rebuild_counts(date_from=None, date_to=None):
+    """Recount every day in the range that has appointments or counts; returns the days"""
+    bounds = [
+        _in_range(model.objects.all(), date_from, date_to).aggregate(first=Min('date'), last=Max('date'))
+        for model in (Appointment, DailyStatusCount)
+    ]
+    firsts = [b['first'] for b in bounds if b['first']]
+    if not firsts:
+        return 0
+    first, last = min(firsts), max(b['last'] for b in bounds if b['last'])
+    days = [first + timedelta(days=n) for n in range((last - first).days + 1)]
+    recount_days(days)
+    return len(days)
+
+
+def calendar(start, end):
+    """Counts by status for each day from ``start`` to ``end``, read from the
+    rollup, plus the series occurrences expanded for the range"""
+    counts = Counter({
+        (day, status): count for day, status, count in
+        DailyStatusCount.objects.filter(date__range=(start, end)).values_list('date', 'status', 'count')
+    })
+    counts.update(occurrence_counts(start, end))
+    days = []
+    for n in range((end - start).days + 1):
+        day = start + timedelta(days=n)
+        by_status = {status: counts[day, status] for status in STATUSES}
+        days.append({'date': day.isoformat(), 'counts': by_status, 'total': sum(by_status.values())})
+    return days
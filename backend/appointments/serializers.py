@@ -0,0 +1,64 @@
+"""JSON serialization of appointments for API responses.
+
+Listings read only the response columns with ``values_list``, never model
+instances, and encode the whole body in one pass. With ``orjson`` (in
+requirements.txt) that pass runs in C, dates and timestamps included;
+without it the standard library encoder is used. The JSON is the same
+either way: dates as YYYY-MM-DD, timestamps in ISO 8601 with microseconds
+and offset.
+"""
+import json
+from datetime import date
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Body ``data`` of a created appointment
+DATA_FIELDS = [
+    'id', 'name', 'email', 'phone', 'date', 'time', 'message', 'status', 'created_at',
+]
+# One appointment in listings, schedules and exports; series occurrences
+# (series.py) have the same fields, with no id or version
+ROW_FIELDS = [*DATA_FIELDS, 'updated_at', 'version', 'series_id', 'occurrence_date']
+_ID = ROW_FIELDS.index('id')
+_CREATED_AT = ROW_FIELDS.index('created_at')
+
+
+def _default(value):
+    if isinstance(value, date):  # datetimes included
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def dumps(data):
+    """Encode ``data`` as JSON bytes; dates and datetimes become ISO 8601"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, default=_default).encode()
+
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), content_type='application/json', status=status)
+
+
+def appointment_values(queryset):
+    """The ROW_FIELDS columns of ``queryset`` as plain tuples"""
+    return queryset.values_list(*ROW_FIELDS)
+
+
+def row_position(row):
+    """(created_at, id) of a tuple from ``appointment_values``, for cursors"""
+    return row[_CREATED_AT], row[_ID]
+
+
+def appointment_rows(rows):
+    """Tuples from ``appointment_values`` as response dicts"""
+    return [dict(zip(ROW_FIELDS, row)) for row in rows]
+
+
+def appointment_data(appointment):
+    """Response body ``data`` for a newly created appointment"""
+    return {field: getattr(appointment, field) for field in DATA_FIELDS}
@@ -0,0 +1,189 @@
+"""Recurring appointment series, expanded when read.
+
+An ``AppointmentSeries`` row stores the rule only (first date, last date,
+every ``interval`` days or weeks), so a series costs one row however long
+it runs. Reads of a date window expand the series that overlap it into
+occurrences with date arithmetic. Exceptions are the only occurrences
+stored: an occurrence that is moved, cancelled or otherwise changed
+becomes an ``Appointment`` row with ``series`` and ``occurrence_date`` set
+(booking.materialize_occurrence), and expansion skips it from then on,
+since the row shows up by itself.
+
+Availability, next-available, day schedules, the calendar, and listings
+and exports with a bounded date window all merge the expanded occurrences
+with the stored appointments.
+"""
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from .cache import get_cache
+from .filters import filter_appointments, parse_date
+from .models import Appointment, AppointmentSeries
+from .serializers import ROW_FIELDS
+from .slots import parse_time_of_day
+
+# Longest series, from first to last occurrence, and longest export window
+MAX_SERIES_DAYS = 366
+# Longest listing date window that includes occurrences
+LISTING_WINDOW_DAYS = 92
+# One series in API responses, with its ``rule``
+SERIES_FIELDS = [
+    'id', 'name', 'email', 'phone', 'time', 'message', 'frequency', 'interval',
+    'starts_on', 'ends_on', 'status', 'created_at',
+]
+# Series fields copied onto each occurrence row
+OCCURRENCE_FIELDS = ['name', 'email', 'phone', 'time', 'message', 'status', 'created_at', 'updated_at']
+
+RULES_KEY = 'appointments:series-rules'
+# Bounds how long other processes read old rules after a series changes;
+# bookings and new series always check the database
+RULES_CACHE_SECONDS = 60
+
+
+def _rules(series, fields):
+    """``(id, first ordinal, last ordinal, step, (fields))`` of ``series``"""
+    return [
+        (series_id, starts_on.toordinal(), ends_on.toordinal(),
+         AppointmentSeries.FREQUENCY_DAYS[frequency] * interval, tuple(values))
+        for series_id, starts_on, ends_on, frequency, interval, *values in
+        series.order_by('id').values_list('id', 'starts_on', 'ends_on', 'frequency', 'interval', *fields)
+    ]
+
+
+def _overlapping(series, start, end):
+    return series.filter(starts_on__lte=end, ends_on__gte=start)
+
+
+def _current_rules(start, end):
+    """Slot and status rules of the series overlapping the window.
+
+    The rules of series still running are cached, as availability reads
+    them on every request; signals clear the entry when a series changes.
+    Windows reaching into the past read the table.
+    """
+    today = date.today()
+    if start < today:
+        return _rules(_overlapping(AppointmentSeries.objects.all(), start, end), ['start_minute', 'status'])
+    cache = get_cache()
+    rules = cache.get(RULES_KEY)
+    if rules is None:
+        rules = _rules(AppointmentSeries.objects.filter(ends_on__gte=today), ['start_minute', 'status'])
+        cache.set(RULES_KEY, rules, RULES_CACHE_SECONDS)
+    first, last = start.toordinal(), end.toordinal()
+    return [rule for rule in rules if rule[1] <= last and rule[2] >= first]
+
+
+def _expand(start, end, rules):
+    """``(series id, day offsets, field values)`` for each of ``rules`` with
+    occurrences from ``start`` to ``end``, offsets counting days from
+    ``start``. Usually a ``range``, so nothing is allocated per occurrence.
+    Stored occurrences are left out, since their appointment rows show up
+    by themselves."""
+    if not rules:
+        return []
+    first, last = start.toordinal(), end.toordinal()
+    stored = defaultdict(set)
+    for series_id, day in (
+        Appointment.objects
+        .filter(occurrence_date__range=(start, end), series__isnull=False)
+        .values_list('series_id', 'occurrence_date')
+    ):
+        stored[series_id].add(day.toordinal() - first)
+    expanded = []
+    for series_id, origin, final, step, values in rules:
+        # First occurrence on or after the window start
+        low = first if first > origin else origin
+        low += -(low - origin) % step
+        offsets = range(low - first, (last if last < final else final) - first + 1, step)
+        if series_id in stored:
+            offsets = [offset for offset in offsets if offset not in stored[series_id]]
+        if offsets:
+            expanded.append((series_id, offsets, values))
+    return expanded
+
+
+def _window(start, end):
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+def series_slots(start, end, start_minute=None, cached=False):
+    """{date: start minutes} held by series occurrences from ``start`` to
+    ``end``. ``cached`` reads the cached rules of running series, for read
+    paths that may lag a new series by RULES_CACHE_SECONDS."""
+    if cached and start_minute is None:
+        rules = _current_rules(start, end)
+    else:
+        series = _overlapping(AppointmentSeries.objects.all(), start, end)
+        if start_minute is not None:
+            series = series.filter(start_minute=start_minute)
+        rules = _rules(series, ['start_minute'])
+    held = [set() for _ in range((end - start).days + 1)]
+    for _, offsets, (minute, *_) in _expand(start, end, rules):
+        for offset in offsets:
+            held[offset].add(minute)
+    return {day: minutes for day, minutes in zip(_window(start, end), held) if minutes}
+
+
+def series_conflict(day, start_minute):
+    """Whether an unstored series occurrence holds the slot"""
+    return bool(series_slots(day, day, start_minute))
+
+
+def occurrence_counts(start, end):
+    """{(date, status): count} of the occurrences from ``start`` to ``end``"""
+    days = (end - start).days + 1
+    by_status = defaultdict(lambda: [0] * days)
+    for _, offsets, (_, status) in _expand(start, end, _current_rules(start, end)):
+        counts = by_status[status]
+        for offset in offsets:
+            counts[offset] += 1
+    return Counter({
+        (day, status): count
+        for status, counts in by_status.items()
+        for day, count in zip(_window(start, end), counts) if count
+    })
+
+
+def clock_order(row):
+    """Sort key of a ROW_FIELDS dict within a day: clock time, free text last"""
+    minute = parse_time_of_day(row['time'])
+    return minute is None, minute or 0, row['id'] or 0
+
+
+def occurrence_rows(start, end, params=None):
+    """Occurrences from ``start`` to ``end`` as ROW_FIELDS dicts, in date and
+    clock order. ``params`` may hold the listing's ``status``, ``email``
+    and ``phone`` filters."""
+    series = _overlapping(AppointmentSeries.objects.all(), start, end)
+    if params:
+        # The listing filters other than the date window apply to series too
+        series = filter_appointments(series, {name: params.get(name) for name in ('status', 'email', 'phone')})
+    window = _window(start, end)
+    occurrences = []
+    for series_id, offsets, (start_minute, *values) in _expand(
+        start, end, _rules(series, ['start_minute', *OCCURRENCE_FIELDS])
+    ):
+        template = dict.fromkeys(ROW_FIELDS)
+        template.update(zip(OCCURRENCE_FIELDS, values), series_id=series_id)
+        occurrences.extend((offset, start_minute, series_id, template) for offset in offsets)
+    occurrences.sort(key=lambda occurrence: occurrence[:3])
+    return [
+        {**template, 'date': window[offset], 'occurrence_date': window[offset]}
+        for offset, _, _, template in occurrences
+    ]
+
+
+def series_data(series):
+    return {**{field: getattr(series, field) for field in SERIES_FIELDS}, 'rule': series.rule}
+
+
+def window_occurrences(params, max_days):
+    """Occurrence rows for the ``date_from``/``date_to`` window of a listing
+    or export query, or None when the window is open or longer than
+    ``max_days``"""
+    if not params.get('date_from') or not params.get('date_to'):
+        return None
+    start = parse_date(params['date_from'], 'date_from')
+    end = parse_date(params['date_to'], 'date_to')
+    if end < start or (end - start).days >= max_days:
+        return None
+    return occurrence_rows(start, end, params)
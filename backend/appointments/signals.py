@@ -0,0 +1,117 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from .availability import SCHEDULE_KEY, refresh_occupancy
+from .cache import bump_version, get_cache
+from .models import Appointment, AppointmentSeries, ClinicHours, WaitlistEntry
+from .rollups import adjust_counts, recount_days
+from .series import RULES_KEY
+from .waitlist import index_entries, offer_slots
+
+# Sent by paths that write appointments without model signals (bulk_create,
+# COPY, queryset updates) with the set of affected ``dates``
+appointments_bulk_changed = Signal()
+
+# Sent once committed with the (date, start minute) ``slots`` that
+# cancellations, moves and deletes gave up
+slots_freed = Signal()
+
+
+def publish_freed_slots(slots):
+    """Send ``slots_freed`` for ``slots`` (None entries are skipped) when the
+    current transaction commits"""
+    slots = set(slots) - {None}
+    if slots:
+        # robust: a failing receiver must not turn a committed change into an error
+        transaction.on_commit(lambda: slots_freed.send(sender=Appointment, slots=slots), robust=True)
+
+
+def freed_slot(instance):
+    """The slot a saved appointment held when it was loaded and no longer holds, or None"""
+    loaded_date = getattr(instance, '_loaded_date', None)
+    loaded_minute = getattr(instance, '_loaded_start_minute', None)
+    if loaded_date is None or loaded_minute is None or instance._loaded_status == 'cancelled':
+        return None
+    day = instance._meta.get_field('date').to_python(instance.date)
+    if instance.status == 'cancelled' or (day, instance.start_minute) != (loaded_date, loaded_minute):
+        return loaded_date, loaded_minute
+    return None
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved(sender, instance, created, **kwargs):
+    """Keep day occupancy and status counts in step with created, edited
+    and moved bookings"""
+    loaded_date = getattr(instance, '_loaded_date', None)
+    refresh_occupancy({instance.date, loaded_date} - {None})
+
+    day = instance._meta.get_field('date').to_python(instance.date)
+    if created:
+        adjust_counts({(day, instance.status): 1})
+    elif loaded_date is None:
+        # Saved over an existing row without loading it first
+        recount_days([day])
+    else:
+        deltas = Counter({(day, instance.status): 1})
+        deltas[loaded_date, instance._loaded_status] -= 1
+        adjust_counts(deltas)
+        publish_freed_slots([freed_slot(instance)])
+    instance._loaded_date = day
+    instance._loaded_start_minute = instance.start_minute
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Appointment)
+def appointment_deleted(sender, instance, **kwargs):
+    refresh_occupancy([instance.date])
+    adjust_counts({(
+        getattr(instance, '_loaded_date', None) or instance.date,
+        getattr(instance, '_loaded_status', None) or instance.status,
+    ): -1})
+    if instance.start_minute is not None and instance.status != 'cancelled':
+        publish_freed_slots([(
+            instance._meta.get_field('date').to_python(instance.date), instance.start_minute,
+        )])
+
+
+@receiver(appointments_bulk_changed)
+def appointments_bulk_changed_days(sender, dates, **kwargs):
+    refresh_occupancy(dates)
+    recount_days(dates)
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+@receiver(post_save, sender=AppointmentSeries)
+@receiver(post_delete, sender=AppointmentSeries)
+@receiver(appointments_bulk_changed)
+def invalidate_listing_cache(sender, **kwargs):
+    """Bump the listing cache version once the write is visible to readers.
+
+    Admin list_editable status changes save each row, so they land here too.
+    """
+    transaction.on_commit(bump_version)
+
+
+@receiver(post_save, sender=ClinicHours)
+@receiver(post_delete, sender=ClinicHours)
+def clinic_hours_changed(sender, **kwargs):
+    transaction.on_commit(lambda: get_cache().delete(SCHEDULE_KEY))
+
+
+@receiver(post_save, sender=AppointmentSeries)
+@receiver(post_delete, sender=AppointmentSeries)
+def series_changed(sender, **kwargs):
+    transaction.on_commit(lambda: get_cache().delete(RULES_KEY))
+
+
+@receiver(slots_freed)
+def offer_to_waitlist(sender, slots, **kwargs):
+    offer_slots(slots)
+
+
+@receiver(post_save, sender=WaitlistEntry)
+def waitlist_entry_saved(sender, instance, **kwargs):
+    """Entries edited or withdrawn in the admin join or leave the day index"""
+    index_entries([instance])
@@ -0,0 +1,73 @@
+import re
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+
+# Occupancy bitmaps track one bit per SLOT_GRANULARITY minutes of the day
+SLOT_GRANULARITY = 5
+OCCUPANCY_BYTES = (24 * 60 // SLOT_GRANULARITY + 7) // 8
+
+_TIME_RE = re.compile(r'^\s*(\d{1,2})(?:[:.](\d{2}))?\s*([ap])?\.?\s*(?:m\.?)?\s*$', re.IGNORECASE)
+
+
+def parse_time_of_day(value):
+    """Parse '9:00 AM', '9 am', '14:30' or '14.30' into a minute of day.
+
+    Returns None for anything that is not a clock time (e.g. 'morning').
+    """
+    match = _TIME_RE.match(value or '')
+    if not match:
+        return None
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem.lower() == 'p' else 0)
+    elif match.group(2) is None:
+        # A bare number is too ambiguous to be a slot
+        return None
+    if hour > 23 or minute > 59:
+        return None
+    return hour * 60 + minute
+
+
+def format_minute(minute):
+    """Render a minute of day the way the booking form labels slots ('1:00 PM')"""
+    hour, minute = divmod(minute, 60)
+    return f"{hour % 12 or 12}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
+
+
+def starts_at(day, minute):
+    """Aware datetime of ``minute`` on ``day`` in the clinic's TIME_ZONE"""
+    return timezone.make_aware(datetime.combine(day, time(*divmod(minute, 60))))
+
+
+def next_reminder_at(day, minute, hours, after):
+    """Earliest reminder later than ``after``, one ``hours`` before the slot.
+
+    None when every reminder time has passed or the booking has no clock time.
+    """
+    # Slots two days back are past in any time zone: historical imports
+    # skip the time zone lookup
+    if minute is None or day < after.date() - timedelta(days=1):
+        return None
+    start = starts_at(day, minute)
+    due = (start - timedelta(hours=h) for h in hours)
+    return min((when for when in due if when > after), default=None)
+
+
+def empty_occupancy():
+    return bytes(OCCUPANCY_BYTES)
+
+
+def occupancy_bitmap(start_minutes):
+    """Build an occupancy bitmap from booked slot start minutes"""
+    bitmap = bytearray(OCCUPANCY_BYTES)
+    for minute in start_minutes:
+        index = minute // SLOT_GRANULARITY
+        bitmap[index >> 3] |= 1 << (index & 7)
+    return bytes(bitmap)
+
+
+def is_booked(bitmap, minute):
+    index = minute // SLOT_GRANULARITY
+    return bool(bitmap[index >> 3] & (1 << (index & 7)))
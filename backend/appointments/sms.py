@@ -0,0 +1,20 @@
+"""SMS through an HTTP gateway: ``{"to": phone, "text": ...}`` is POSTed as
+JSON to APPOINTMENTS_SMS_URL. Any non-2xx answer raises."""
+import json
+import urllib.request
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+TIMEOUT = 10
+
+
+def send_sms(phone, text, url=None):
+    url = url or settings.APPOINTMENTS_SMS_URL
+    if not url:
+        raise ImproperlyConfigured('APPOINTMENTS_SMS_URL is not set')
+    request = urllib.request.Request(
+        url, data=json.dumps({'to': phone, 'text': text}).encode(),
+        headers={'Content-Type': 'application/json'},
+    )
+    with urllib.request.urlopen(request, timeout=TIMEOUT):
+        pass
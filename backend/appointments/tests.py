@@ -1,3 +1,1342 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time as clock
+from contextlib import redirect_stdout
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from importlib import import_module
+from itertools import count
+from unittest import mock
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+from . import serializers
+from .cache import VERSION_KEY, get_cache, set_listing
+from .holds import get_hold_cache, holder, place_hold
+from .idempotency import KeyReused, MemoryIdempotencyStore, StoredResponse, get_store
+from .importer import import_appointments
+from .intake import flush_queue
+from .models import (
+    Appointment, AppointmentSeries, ClinicHours, DailyStatusCount, DayOccupancy, IdempotencyKey,
+    OutboxMessage, Patient, WaitlistDay, WaitlistEntry,
+)
+from .pagination import EstimatedCountPaginator
+from .outbox import deliver_pending
+from .profiling import StackSampler, get_store as get_profile_store, make_token
+from .patients import normalize_phone
+from .partitions import add_months, is_partitioned, month_start, partition_name
+from .reminders import FileSender, ReminderSender, next_due, send_due
+from .rollups import compare_counts
+from .slots import is_booked, parse_time_of_day
+from .transitions import transition
 
-# Create your tests here.
+
+_slots = count()
+
+
+def make_appointment(**kwargs):
+    # Each call takes its own slot so helpers never trip the slot constraint
+    hour, minute = divmod(next(_slots) % (24 * 12) * 5, 60)
+    values = {
+        'name': 'Test Patient',
+        'email': 'patient@example.com',
+        'phone': '9876543210',
+        'date': date.today() + timedelta(days=1),
+        'time': f'{hour}:{minute:02d}',
+    }
+    values.update(kwargs)
+    return Appointment.objects.create(**values)
+
+
+def clear_caches():
+    """Drop cached listings and slot holds left by earlier tests"""
+    get_cache().clear()
+    get_hold_cache().clear()
+
+
+def staff_csrf_client(user):
+    """A client logged in as ``user`` that enforces CSRF like a browser
+    session would; returns it with the token to send in X-CSRFToken"""
+    client = Client(enforce_csrf_checks=True)
+    client.force_login(user)
+    token = get_random_string(32)
+    client.cookies['csrftoken'] = token
+    return client, token
+
+
+class AppointmentListingTests(TestCase):
+    url = reverse('appointments:appointment-create')
+
+    def setUp(self):
+        clear_caches()
+
+    def test_cursor_walks_every_row_once(self):
+        # Shared timestamps force the id tie-breaker to do its job
+        created_at = timezone.now()
+        ids = {make_appointment(created_at=created_at - timedelta(minutes=i // 3)).id for i in range(12)}
+
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 5}
+            if cursor:
+                params['cursor'] = cursor
+            body = self.client.get(self.url, params).json()
+            seen.extend(row['id'] for row in body['appointments'])
+            cursor = body['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(len(seen), len(ids))
+        self.assertEqual(set(seen), ids)
+
+    def test_filters(self):
+        make_appointment(email='a@example.com', status='confirmed')
+        make_appointment(email='b@example.com', date=date(2025, 1, 15))
+        match = make_appointment(email='b@example.com', date=date(2025, 2, 1))
+
+        body = self.client.get(self.url, {
+            'email': 'b@example.com', 'date_from': '2025-01-20', 'status': 'pending,confirmed',
+        }).json()
+
+        self.assertEqual([row['id'] for row in body['appointments']], [match.id])
+        self.assertFalse(body['has_more'])
+
+    @override_settings(APPOINTMENTS_LISTING_DAYS=30)
+    def test_default_listing_is_bounded_by_date(self):
+        recent = make_appointment(date=date.today() - timedelta(days=30))
+        old = make_appointment(date=date.today() - timedelta(days=31))
+
+        with CaptureQueriesContext(connection) as captured:
+            body = self.client.get(self.url).json()
+        self.assertEqual([row['id'] for row in body['appointments']], [recent.id])
+        # The partition key bound lets PostgreSQL skip older months
+        listing = [q['sql'] for q in captured.captured_queries if q['sql'].startswith('SELECT')][-1]
+        self.assertIn('"date" >=', listing)
+
+        body = self.client.get(self.url, {'date_to': date.today().isoformat()}).json()
+        self.assertEqual([row['id'] for row in body['appointments']], [old.id, recent.id])
+
+    def test_wire_format(self):
+        created_at = timezone.now().replace(microsecond=0)
+        appointments = [
+            make_appointment(created_at=created_at, message=None),
+            make_appointment(created_at=created_at.replace(microsecond=120), message='Ünïcode'),
+        ]
+        expected = [{
+            'id': a.id, 'name': a.name, 'email': a.email, 'phone': a.phone,
+            'date': a.date.strftime('%Y-%m-%d'), 'time': a.time, 'message': a.message,
+            'status': a.status, 'created_at': a.created_at.isoformat(),
+            'updated_at': Appointment.objects.get(pk=a.pk).updated_at.isoformat(), 'version': 1,
+            'series_id': None, 'occurrence_date': None,
+        } for a in reversed(appointments)]
+
+        for encoder in (serializers.orjson, None):
+            clear_caches()
+            with mock.patch.object(serializers, 'orjson', encoder):
+                body = self.client.get(self.url).json()
+            self.assertEqual(body['appointments'], expected)
+
+    def test_invalid_parameters(self):
+        for params in ({'cursor': 'garbage'}, {'status': 'lost'}, {'date_to': '01/02/2025'}, {'limit': '0'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class SlotBookingTests(TestCase):
+    url = reverse('appointments:appointment-create')
+    availability_url = reverse('appointments:appointment-availability')
+
+    def setUp(self):
+        clear_caches()
+        self.day = date(2030, 1, 7)  # a Monday
+        ClinicHours.objects.create(weekday=0, opens_at=time(9), closes_at=time(12), slot_minutes=60)
+
+    def book(self, slot_time):
+        return self.client.post(self.url, {
+            'name': 'Test Patient', 'email': 'patient@example.com', 'phone': '9876543210',
+            'date': self.day.isoformat(), 'time': slot_time,
+        }, content_type='application/json')
+
+    def free(self):
+        body = self.client.get(self.availability_url, {'start': self.day.isoformat()}).json()
+        return body['days'][0]['free_slots']
+
+    def test_parse_time_of_day(self):
+        self.assertEqual(parse_time_of_day('9:00 AM'), 540)
+        self.assertEqual(parse_time_of_day('12:30 pm'), 750)
+        self.assertEqual(parse_time_of_day('14:15'), 855)
+        self.assertIsNone(parse_time_of_day('morning'))
+        self.assertIsNone(parse_time_of_day('13:00 PM'))
+
+    def test_second_booking_of_a_slot_is_rejected(self):
+        self.assertEqual(self.book('10:00 AM').status_code, 201)
+        self.assertEqual(self.book('10:00').status_code, 409)
+        self.assertEqual(self.free(), ['9:00 AM', '11:00 AM'])
+
+    def test_cancelling_frees_the_slot(self):
+        self.book('9:00 AM')
+        appointment = Appointment.objects.get()
+        appointment.status = 'cancelled'
+        appointment.save()
+
+        self.assertEqual(self.free(), ['9:00 AM', '10:00 AM', '11:00 AM'])
+        self.assertEqual(self.book('9:00 AM').status_code, 201)
+
+    def test_moving_a_booking_updates_both_days(self):
+        self.book('9:00 AM')
+        appointment = Appointment.objects.get()
+        appointment.date = self.day + timedelta(days=7)
+        appointment.save()
+
+        self.assertEqual(self.free(), ['9:00 AM', '10:00 AM', '11:00 AM'])
+        self.assertFalse(is_booked(bytes(DayOccupancy.objects.get(date=self.day).booked), 540))
+        self.assertTrue(is_booked(bytes(DayOccupancy.objects.get(date=appointment.date).booked), 540))
+
+    def test_time_outside_clinic_hours(self):
+        self.assertEqual(self.book('3:00 PM').status_code, 400)
+        response = self.client.post(reverse('appointments:appointment-create-alt'), {
+            'name': 'Test Patient', 'email': 'patient@example.com', 'phone': '9876543210',
+            'date': self.day.isoformat(), 'time': '3:00 AM',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Appointment.objects.exists())
+
+    def test_free_text_time_is_rejected_by_both_create_views(self):
+        self.assertEqual(self.book('morning').status_code, 400)
+        response = self.client.post(reverse('appointments:appointment-create-alt'), {
+            'name': 'Test Patient', 'email': 'patient@example.com', 'phone': '9876543210',
+            'date': self.day.isoformat(), 'time': 'morning',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Appointment.objects.exists())
+
+    def test_day_schedule_and_next_available(self):
+        self.book('11:00 AM')
+        self.book('9:00 AM')
+        Appointment.objects.bulk_create([Appointment(
+            name='Legacy', email='legacy@example.com', phone='1', date=self.day, time='evening',
+        )])
+
+        schedule_url = reverse('appointments:appointment-schedule')
+        # Names and contact details are for staff only
+        self.assertEqual(self.client.get(schedule_url, {'date': self.day.isoformat()}).status_code, 403)
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        body = self.client.get(schedule_url, {'date': self.day.isoformat()}).json()
+        self.assertEqual([row['time'] for row in body['appointments']], ['9:00 AM', '11:00 AM', 'evening'])
+
+        next_url = reverse('appointments:appointment-next-available')
+        body = self.client.get(next_url, {'date': self.day.isoformat()}).json()
+        self.assertEqual(body['slot'], {'date': '2030-01-07', 'time': '10:00 AM'})
+        body = self.client.get(next_url, {'date': self.day.isoformat(), 'time': '10:30'}).json()
+        self.assertEqual(body['slot'], {'date': '2030-01-14', 'time': '9:00 AM'})
+        self.assertEqual(self.client.get(next_url, {'time': 'noon-ish'}).status_code, 400)
+
+    def test_backfill_migration(self):
+        backfill = import_module('appointments.migrations.0007_backfill_start_minute').backfill_start_minute
+        # bulk_create skips save(), like rows written before start_minute existed
+        Appointment.objects.bulk_create([
+            Appointment(name='A', email='a@example.com', phone='1', date=self.day, time='10:00 AM'),
+            Appointment(name='B', email='b@example.com', phone='2', date=self.day, time='10:00'),
+            Appointment(name='C', email='c@example.com', phone='3', date=self.day, time='morning'),
+        ])
+        with redirect_stdout(io.StringIO()) as report:
+            backfill(apps, connection.schema_editor())
+
+        minutes = dict(Appointment.objects.values_list('name', 'start_minute'))
+        self.assertEqual(minutes, {'A': 600, 'B': None, 'C': None})
+        self.assertIn("cannot parse time 'morning'", report.getvalue())
+        self.assertIn('already booked', report.getvalue())
+        self.assertEqual(self.free(), ['9:00 AM', '11:00 AM'])
+
+
+class ImportTests(TestCase):
+    url = reverse('appointments:appointment-import')
+
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', password='x', is_staff=True)
+
+    def test_bad_rows_are_reported_without_aborting_the_batch(self):
+        make_appointment(date=date(2024, 3, 1), time='9:00 AM')
+        lines = [
+            '{"name": "A", "email": "a@example.com", "phone": "1", "date": "2024-03-01", "time": "10:00 AM"}',
+            'not json',
+            '{"name": "B", "email": "b@example.com", "phone": "2", "date": "2024-03-01", "time": "9:00 AM"}',
+            '{"name": "C", "email": "c@example.com", "phone": "3", "date": "01-03-2024", "time": "11:00 AM"}',
+            '{"name": "D", "email": "d@example.com", "phone": "4", "date": "2024-03-01", "time": "10:00"}',
+            '{"name": "E", "email": "e@example.com", "phone": "5", "date": "2024-03-01", "time": "11:00 AM", "status": "completed"}',
+        ]
+
+        result = import_appointments(lines, batch_size=2)
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual([error['line'] for error in result.errors], [2, 3, 4, 5])
+        self.assertEqual(Appointment.objects.get(name='E').status, 'completed')
+        bitmap = bytes(DayOccupancy.objects.get(date=date(2024, 3, 1)).booked)
+        self.assertTrue(all(is_booked(bitmap, minute) for minute in (540, 600, 660)))
+
+    def test_non_string_fields_are_bad_rows(self):
+        lines = [
+            '{"name": "A", "email": "a@example.com", "phone": "1", "date": "2024-03-01", "time": 930}',
+            '{"name": "B", "email": "b@example.com", "phone": "2", "date": "2024-03-01", "time": "9:00 AM", "status": ["confirmed"]}',
+            '{"name": "C", "email": "c@example.com", "phone": "3", "date": "2024-03-01", "time": "10:00 AM"}',
+        ]
+
+        result = import_appointments(lines)
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.errors, [
+            {'line': 1, 'error': 'time must be a string'},
+            {'line': 2, 'error': 'status must be a string'},
+        ])
+
+    def test_committed_batches_are_reconciled_when_the_import_fails(self):
+        def lines():
+            yield '{"name": "A", "email": "a@example.com", "phone": "1", "date": "2024-03-01", "time": "9:00 AM"}'
+            raise OSError('connection reset')
+
+        with self.assertRaises(OSError):
+            import_appointments(lines(), batch_size=1)
+        bitmap = bytes(DayOccupancy.objects.get(date=date(2024, 3, 1)).booked)
+        self.assertTrue(is_booked(bitmap, 540))
+
+    def test_csv_endpoint(self):
+        body = 'name,email,phone,date,time,message\nA,a@example.com,1,2024-03-01,9:00 AM,"multi\nline"\n'
+
+        self.assertEqual(self.client.post(self.url, body, content_type='text/csv').status_code, 403)
+        self.client.force_login(self.staff)
+        result = self.client.post(self.url, body, content_type='text/csv').json()
+
+        self.assertEqual(result['created'], 1)
+        self.assertEqual(Appointment.objects.get().message, 'multi\nline')
+
+    def test_session_requests_need_the_csrf_token(self):
+        client, token = staff_csrf_client(self.staff)
+        body = 'name,email,phone,date,time\nA,a@example.com,1,2024-03-01,9:00 AM\n'
+
+        self.assertEqual(client.post(self.url, body, content_type='text/csv').status_code, 403)
+        response = client.post(self.url, body, content_type='text/csv', headers={'X-CSRFToken': token})
+        self.assertEqual(response.json()['created'], 1)
+
+
+class ExportTests(TestCase):
+    url = reverse('appointments:appointment-export')
+
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', password='x', is_staff=True)
+        self.rows = [
+            make_appointment(name='A', date=date(2024, 3, 1), message='multi\nline'),
+            make_appointment(name='B', date=date(2024, 3, 2), status='confirmed'),
+            make_appointment(name='C', date=date(2024, 4, 1)),
+        ]
+
+    def test_streaming_endpoint(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_login(self.staff)
+
+        response = self.client.get(self.url, {'date_to': '2024-03-31'})
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['name'] for row in rows], ['A', 'B'])
+        self.assertEqual(rows[0]['message'], 'multi\nline')
+
+        response = self.client.get(self.url, {'format': 'ndjson', 'status': 'confirmed', 'gzip': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual([json.loads(line)['name'] for line in lines], ['B'])
+
+        self.assertEqual(self.client.get(self.url, {'format': 'xml'}).status_code, 400)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'april.ndjson.gz')
+            call_command('export_appointments', path, date_from='2024-04-01', stdout=io.StringIO())
+            with gzip.open(path, 'rt') as export:
+                self.assertEqual([json.loads(line)['id'] for line in export], [self.rows[2].id])
+
+
+class BulkStatusTests(TestCase):
+    url = reverse('appointments:appointment-bulk-status')
+
+    def setUp(self):
+        clear_caches()
+        self.staff = User.objects.create_user('staff', password='x', is_staff=True)
+        self.pending = [make_appointment() for _ in range(3)]
+        self.cancelled = make_appointment(status='cancelled')
+
+    def post(self, body):
+        return self.client.post(self.url, body, content_type='application/json')
+
+    def test_one_update_with_transitions_checked_in_sql(self):
+        self.assertEqual(self.post({'ids': [1], 'status': 'completed'}).status_code, 403)
+        self.client.force_login(self.staff)
+        ids = [a.id for a in self.pending] + [self.cancelled.id, 999999]
+
+        with CaptureQueriesContext(connection) as captured:
+            body = self.post({'ids': ids, 'status': 'completed'}).json()
+
+        updates = [q['sql'] for q in captured.captured_queries if q['sql'].startswith('UPDATE "appointments"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual((body['updated'], body['skipped']), (3, 2))
+        self.assertEqual(body['skipped_ids'], [self.cancelled.id, 999999])
+        self.assertEqual(Appointment.objects.filter(status='completed').count(), 3)
+        self.assertEqual(Appointment.objects.get(id=self.cancelled.id).status, 'cancelled')
+        first = Appointment.objects.get(id=self.pending[0].id)
+        self.assertGreater(first.updated_at, self.pending[0].updated_at)
+
+        self.assertEqual(self.post({'ids': ids, 'status': 'pending'}).status_code, 400)
+        self.assertEqual(self.post({'ids': ['1'], 'status': 'cancelled'}).status_code, 400)
+
+    def test_session_requests_need_the_csrf_token(self):
+        client, token = staff_csrf_client(self.staff)
+        body = {'ids': [self.pending[0].id], 'status': 'confirmed'}
+
+        self.assertEqual(client.post(self.url, body, content_type='application/json').status_code, 403)
+        response = client.post(self.url, body, content_type='application/json', headers={'X-CSRFToken': token})
+        self.assertEqual(response.json()['updated'], 1)
+
+    def test_cancelling_frees_slots(self):
+        appointment = self.pending[0]
+        self.assertTrue(is_booked(bytes(DayOccupancy.objects.get(date=appointment.date).booked),
+                                  appointment.start_minute))
+        with self.captureOnCommitCallbacks(execute=True):
+            updated = transition(Appointment.objects.filter(id=appointment.id), 'cancelled')
+        self.assertEqual(updated, [appointment.id])
+        self.assertFalse(is_booked(bytes(DayOccupancy.objects.get(date=appointment.date).booked),
+                                   appointment.start_minute))
+
+    def test_admin_action(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'x'))
+        response = self.client.post(reverse('admin:appointments_appointment_changelist'), {
+            'action': 'mark_confirmed',
+            '_selected_action': [self.pending[0].id, self.cancelled.id],
+        }, follow=True)
+        self.assertContains(response, '1 appointment(s) marked confirmed; 1 skipped')
+        self.assertEqual(Appointment.objects.get(id=self.pending[0].id).status, 'confirmed')
+
+
+@override_settings(APPOINTMENTS_REMINDER_HOURS=[24, 2], APPOINTMENTS_REMINDER_RETRY_SECONDS=300)
+class StatusPatchTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.appointment = make_appointment()
+        self.url = reverse('appointments:appointment-status', args=[self.appointment.id])
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+
+    def patch(self, status, version, url=None):
+        return self.client.patch(url or self.url, {'status': status, 'version': version},
+                                 content_type='application/json')
+
+    def test_conditional_update_without_a_prior_select(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.patch('confirmed', 1)
+        self.assertEqual(response.json(), {
+            'success': True, 'id': self.appointment.id, 'status': 'confirmed', 'version': 2,
+        })
+        touching = [q['sql'] for q in captured.captured_queries if '"appointments"' in q['sql']]
+        self.assertTrue(touching[0].startswith('UPDATE "appointments"'))
+        self.assertIn('AND "version" = 1', touching[0])
+
+        # A client still holding version 1 lost the race
+        response = self.patch('cancelled', 1)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual((response.json()['status'], response.json()['version']), ('confirmed', 2))
+
+        self.assertEqual(self.patch('cancelled', 2).json()['version'], 3)
+        response = self.patch('completed', 3)
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('Cannot change a cancelled appointment', response.json()['error'])
+
+        missing = reverse('appointments:appointment-status', args=[999999])
+        self.assertEqual(self.patch('confirmed', 1, missing).status_code, 404)
+        self.assertEqual(self.patch('pending', 3).status_code, 400)
+
+    def test_every_write_bumps_the_version(self):
+        self.appointment.message = 'Running late'
+        self.appointment.save()
+        self.assertEqual(self.appointment.version, 2)
+        transition(Appointment.objects.all(), 'confirmed')
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.version, 3)
+        self.assertEqual(self.patch('completed', 2).status_code, 409)
+
+    def test_session_requests_need_the_csrf_token(self):
+        client, token = staff_csrf_client(User.objects.get(username='staff'))
+        body = {'status': 'confirmed', 'version': 1}
+
+        self.assertEqual(client.patch(self.url, body, content_type='application/json').status_code, 403)
+        response = client.patch(self.url, body, content_type='application/json', headers={'X-CSRFToken': token})
+        self.assertEqual(response.json()['version'], 2)
+
+
+class ReminderTests(TestCase):
+    def setUp(self):
+        self.booked = make_appointment(date=date(2030, 1, 7), time='9:00 AM')
+        make_appointment(date=date(2030, 1, 7), time='10:00 AM', status='cancelled')
+        make_appointment(date=date(2030, 1, 8), time='9:00 AM', status='confirmed')
+
+    def at(self, day, hour):
+        return datetime(2030, 1, day, hour, tzinfo=dt_timezone.utc)
+
+    def test_due_reminders_are_sent_once_then_rescheduled(self):
+        self.assertEqual(self.booked.remind_at, self.at(6, 9))
+        self.assertEqual(next_due(), self.at(6, 9))
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        sender = FileSender(os.path.join(directory.name, 'reminders.ndjson'))
+
+        self.assertEqual(send_due(sender, now=self.at(6, 10)), (1, 0))
+        self.assertEqual(send_due(sender, now=self.at(6, 10)), (0, 0))
+        self.booked.refresh_from_db()
+        self.assertEqual(self.booked.remind_at, self.at(7, 7))
+
+        # A worker that was down sends the latest reminder only
+        self.assertEqual(send_due(sender, batch_size=1, now=self.at(8, 8)), (1, 0))
+        self.assertEqual(send_due(sender, now=self.at(8, 8)), (1, 0))
+        self.assertIsNone(next_due())
+        with open(sender.path) as sent:
+            self.assertEqual([json.loads(line)['remind_at'] for line in sent], [
+                '2030-01-06T09:00:00+00:00', '2030-01-07T07:00:00+00:00', '2030-01-07T09:00:00+00:00',
+            ])
+
+    def test_cancelled_appointments_leave_the_queue(self):
+        transition(Appointment.objects.filter(id=self.booked.id), 'cancelled')
+        self.assertEqual(next_due(), self.at(7, 9))
+        # A status change that bypassed transition() is dropped at send time
+        Appointment.objects.filter(status='confirmed').update(status='completed')
+        self.assertEqual(send_due(FileSender(os.devnull), now=self.at(8, 8)), (0, 0))
+        self.assertIsNone(next_due())
+
+    def test_failed_reminders_are_retried(self):
+        class Failing(ReminderSender):
+            def send_one(self, appointment):
+                raise OSError('gateway down')
+
+        self.assertEqual(send_due(Failing(), now=self.at(6, 10)), (0, 1))
+        self.booked.refresh_from_db()
+        self.assertEqual(self.booked.remind_at, self.at(6, 10) + timedelta(minutes=5))
+
+    def test_reminders_are_claimed_before_sending(self):
+        booked = self.booked
+
+        class Cancelling(ReminderSender):
+            def send_one(self, appointment):
+                # The claim is written before the send; a cancellation
+                # meanwhile is not undone when the batch is recorded
+                self.claimed = Appointment.objects.get(id=appointment.id).remind_at
+                transition(Appointment.objects.filter(id=booked.id), 'cancelled')
+
+        sender = Cancelling()
+        self.assertEqual(send_due(sender, now=self.at(6, 10)), (1, 0))
+        self.assertEqual(sender.claimed, self.at(6, 10) + timedelta(minutes=5))
+        booked.refresh_from_db()
+        self.assertIsNone(booked.remind_at)
+
+    def test_command(self):
+        Appointment.objects.filter(id=self.booked.id).update(remind_at=timezone.now())
+        out = io.StringIO()
+        call_command('send_reminders', once=True, sender='console', stdout=out)
+        self.assertIn(f'appointment {self.booked.id} <patient@example.com>', out.getvalue())
+
+
+class OutboxTests(TestCase):
+    url = reverse('appointments:appointment-create')
+
+    def setUp(self):
+        clear_caches()
+
+    def book(self, slot_time='9:00 AM'):
+        return self.client.post(self.url, {
+            'name': 'Test Patient', 'email': 'patient@example.com', 'phone': '9876543210',
+            'date': '2030-01-07', 'time': slot_time,
+        }, content_type='application/json')
+
+    def test_confirmations_are_queued_with_the_booking_and_delivered(self):
+        appointment_id = self.book().json()['appointment_id']
+        self.assertEqual(self.book().status_code, 409)
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.appointment_id, message.status), (appointment_id, 'pending'))
+        self.assertEqual(mail.outbox, [])
+
+        self.assertEqual(deliver_pending(), (1, 0))
+        self.assertEqual(deliver_pending(), (0, 0))
+        self.assertEqual(mail.outbox[0].to, ['patient@example.com'])
+        self.assertIn('Monday 07 January 2030 at 9:00 AM', mail.outbox[0].body)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('sent', 1))
+
+    @override_settings(
+        APPOINTMENTS_CONFIRMATION_CHANNELS=['email', 'sms'], APPOINTMENTS_SMS_URL='',
+        APPOINTMENTS_OUTBOX_MAX_ATTEMPTS=2,
+    )
+    def test_failed_deliveries_back_off_then_fail(self):
+        self.book()
+        now = timezone.now()
+        self.assertEqual(deliver_pending(now=now), (1, 1))
+        sms = OutboxMessage.objects.get(channel='sms')
+        self.assertEqual((sms.status, sms.attempts), ('pending', 1))
+        self.assertIn('APPOINTMENTS_SMS_URL', sms.last_error)
+        self.assertGreater(sms.available_at, now)
+        self.assertEqual(deliver_pending(now=now), (0, 0))
+
+        later = now + timedelta(hours=1)
+        self.assertEqual(deliver_pending(now=later), (0, 1))
+        sms.refresh_from_db()
+        self.assertEqual((sms.status, sms.attempts), ('failed', 2))
+        self.assertEqual(deliver_pending(now=later + timedelta(hours=1)), (0, 0))
+
+
+    def test_messages_are_claimed_before_delivery(self):
+        self.book()
+        now = timezone.now()
+        claimed = []
+
+        def deliver(messages):
+            claimed.extend(OutboxMessage.objects.values_list('attempts', 'available_at'))
+            # Another worker finds nothing to take meanwhile
+            claimed.append(OutboxMessage.objects.filter(available_at__lte=now).exists())
+            return {}
+
+        with mock.patch.dict('appointments.outbox.PROVIDERS', email=deliver):
+            self.assertEqual(deliver_pending(now=now), (1, 0))
+        self.assertEqual(claimed, [(1, now + timedelta(minutes=5)), False])
+        self.assertEqual(OutboxMessage.objects.get().status, 'sent')
+
+class DailyStatusCountTests(TestCase):
+    url = reverse('appointments:appointment-calendar')
+
+    def setUp(self):
+        clear_caches()
+        self.day = date(2030, 1, 7)
+
+    def counts(self):
+        return {
+            (row.date, row.status): row.count
+            for row in DailyStatusCount.objects.exclude(count=0)
+        }
+
+    def test_counts_follow_creates_changes_moves_and_deletes(self):
+        first = make_appointment(date=self.day)
+        second = make_appointment(date=self.day)
+        make_appointment(date=self.day, status='confirmed')
+        self.assertEqual(self.counts(), {(self.day, 'pending'): 2, (self.day, 'confirmed'): 1})
+
+        first.status = 'confirmed'
+        first.save()
+        second.date = self.day + timedelta(days=1)
+        second.save()
+        Appointment.objects.get(status='confirmed', id__gt=second.id).delete()
+        self.assertEqual(self.counts(), {
+            (self.day, 'confirmed'): 1, (self.day + timedelta(days=1), 'pending'): 1,
+        })
+
+        # Bulk paths recount the days they touched
+        transition(Appointment.objects.all(), 'cancelled')
+        self.assertEqual(self.counts(), {
+            (self.day, 'cancelled'): 1, (self.day + timedelta(days=1), 'cancelled'): 1,
+        })
+        self.assertEqual(compare_counts(), [])
+
+    def test_check_and_rebuild(self):
+        make_appointment(date=self.day)
+        DailyStatusCount.objects.update(count=5)
+        with self.assertRaises(CommandError):
+            call_command('rollup_status_counts', stdout=io.StringIO())
+        call_command('rollup_status_counts', rebuild=True, stdout=io.StringIO())
+        call_command('rollup_status_counts', stdout=io.StringIO())
+        self.assertEqual(self.counts(), {(self.day, 'pending'): 1})
+
+    def test_calendar_reads_the_rollup(self):
+        make_appointment(date=self.day)
+        make_appointment(date=self.day, status='completed')
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+
+        with self.assertNumQueries(4):  # session, user, rollup, series
+            days = self.client.get(self.url, {'start': '2030-01-06', 'end': '2030-01-08'}).json()['days']
+
+        self.assertEqual([day['total'] for day in days], [0, 2, 0])
+        self.assertEqual(days[1]['counts'], {'pending': 1, 'confirmed': 0, 'cancelled': 0, 'completed': 1})
+        self.assertEqual(len(self.client.get(self.url).json()['days']), 90)
+        self.assertEqual(self.client.get(self.url, {'start': '2030-01-08', 'end': '2030-01-07'}).status_code, 400)
+
+
+class SeriesTests(TestCase):
+    url = reverse('appointments:series-create')
+    listing_url = reverse('appointments:appointment-create')
+
+    def setUp(self):
+        clear_caches()
+        ClinicHours.objects.create(weekday=0, opens_at=time(9), closes_at=time(12), slot_minutes=60)
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+
+    def create(self, **fields):
+        data = {
+            'name': 'Asha', 'email': 'asha@example.com', 'phone': '9876543210',
+            'date': '2030-01-07', 'time': '9:00 AM', 'frequency': 'weekly', 'count': 4, **fields,
+        }
+        return self.client.post(self.url, data, content_type='application/json')
+
+    def free(self, day):
+        url = reverse('appointments:appointment-availability')
+        return self.client.get(url, {'start': day}).json()['days'][0]['free_slots']
+
+    def change(self, series_id, day, **data):
+        url = reverse('appointments:series-occurrence', args=[series_id, day])
+        return self.client.post(url, data, content_type='application/json')
+
+    def test_occurrences_are_expanded_when_read(self):
+        response = self.create()
+        self.assertEqual(response.status_code, 201)
+        series = response.json()['series']
+        self.assertEqual(series['rule'], 'FREQ=WEEKLY;INTERVAL=1;UNTIL=20300128')
+        self.assertEqual(Appointment.objects.count(), 0)
+
+        self.assertEqual(self.free('2030-01-14'), ['10:00 AM', '11:00 AM'])
+        self.assertEqual(self.free('2030-02-04'), ['9:00 AM', '10:00 AM', '11:00 AM'])
+        next_url = reverse('appointments:appointment-next-available')
+        self.assertEqual(self.client.get(next_url, {'date': '2030-01-07'}).json()['slot']['time'], '10:00 AM')
+        booking = {
+            'name': 'B', 'email': 'b@example.com', 'phone': '9123456789', 'date': '2030-01-21', 'time': '9:00 AM',
+        }
+        response = self.client.post(self.listing_url, booking, content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.create(date='2030-01-21', count=1).status_code, 409)
+        self.assertEqual(self.create(time='8:00 AM').status_code, 400)
+        self.assertEqual(self.create(count=None).status_code, 400)
+
+        window = {'date_from': '2030-01-01', 'date_to': '2030-01-31'}
+        occurrences = self.client.get(self.listing_url, window).json()['occurrences']
+        self.assertEqual(
+            [o['date'] for o in occurrences], ['2030-01-07', '2030-01-14', '2030-01-21', '2030-01-28'],
+        )
+        self.assertEqual(occurrences[0]['series_id'], series['id'])
+        self.assertIsNone(occurrences[0]['id'])
+        self.assertIsNone(self.client.get(self.listing_url).json()['occurrences'])
+
+        export = reverse('appointments:appointment-export')
+        lines = b''.join(self.client.get(export, {'format': 'ndjson', **window}).streaming_content).splitlines()
+        self.assertEqual(len(lines), 4)
+        calendar_url = reverse('appointments:appointment-calendar')
+        calendar = self.client.get(calendar_url, {'start': '2030-01-07', 'end': '2030-01-07'})
+        self.assertEqual(calendar.json()['days'][0]['counts']['confirmed'], 1)
+
+    def test_only_changed_occurrences_are_stored(self):
+        series_id = self.create().json()['series']['id']
+        self.assertEqual(self.change(series_id, '2030-01-14', status='cancelled').status_code, 201)
+        self.assertEqual(self.change(series_id, '2030-01-21', time='11:00 AM').status_code, 201)
+        self.assertEqual(self.change(series_id, '2030-01-21', status='cancelled').status_code, 409)
+        self.assertEqual(self.change(series_id, '2030-01-22', status='cancelled').status_code, 404)
+        self.assertEqual(self.change(series_id, '2030-01-28', time='8:00 AM').status_code, 400)
+
+        stored = Appointment.objects.order_by('occurrence_date')
+        self.assertEqual(
+            [(a.occurrence_date, a.status, a.time, a.series_id) for a in stored],
+            [
+                (date(2030, 1, 14), 'cancelled', '9:00 AM', series_id),
+                (date(2030, 1, 21), 'confirmed', '11:00 AM', series_id),
+            ],
+        )
+        self.assertEqual(self.free('2030-01-14'), ['9:00 AM', '10:00 AM', '11:00 AM'])
+        self.assertEqual(self.free('2030-01-21'), ['9:00 AM', '10:00 AM'])
+
+        schedule = self.client.get(reverse('appointments:appointment-schedule'), {'date': '2030-01-21'}).json()
+        self.assertEqual([(a['time'], a['id'] is None) for a in schedule['appointments']], [('11:00 AM', False)])
+        schedule = self.client.get(reverse('appointments:appointment-schedule'), {'date': '2030-01-28'}).json()
+        self.assertEqual([(a['time'], a['id'] is None) for a in schedule['appointments']], [('9:00 AM', True)])
+
+    def test_changed_occurrences_offer_their_slot_to_the_waitlist(self):
+        series_id = self.create().json()['series']['id']
+        waitlist_url = reverse('appointments:waitlist-join')
+        for phone, day in (('9000000001', '2030-01-14'), ('9000000002', '2030-01-21')):
+            entry = {
+                'name': 'Ravi', 'email': f'{phone}@example.com', 'phone': phone, 'date_from': day, 'date_to': day,
+            }
+            self.assertEqual(self.client.post(waitlist_url, entry, content_type='application/json').status_code, 201)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.change(series_id, '2030-01-28', status='completed')
+        self.assertFalse(WaitlistEntry.objects.filter(status='offered').exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.change(series_id, '2030-01-14', status='cancelled')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.change(series_id, '2030-01-21', time='11:00 AM')
+
+        offered = WaitlistEntry.objects.filter(status='offered').order_by('offered_date')
+        self.assertEqual(
+            [(e.phone, e.offered_date, e.offered_minute) for e in offered],
+            [('9000000001', date(2030, 1, 14), 540), ('9000000002', date(2030, 1, 21), 540)],
+        )
+
+    def test_session_requests_need_the_csrf_token(self):
+        client, token = staff_csrf_client(User.objects.get(username='staff'))
+        data = {
+            'name': 'Asha', 'email': 'asha@example.com', 'phone': '9876543210',
+            'date': '2030-01-07', 'time': '9:00 AM', 'frequency': 'weekly', 'count': 2,
+        }
+
+        self.assertEqual(client.post(self.url, data, content_type='application/json').status_code, 403)
+        response = client.post(self.url, data, content_type='application/json', headers={'X-CSRFToken': token})
+        self.assertEqual(response.status_code, 201)
+        url = reverse('appointments:series-occurrence', args=[response.json()['series']['id'], '2030-01-14'])
+        self.assertEqual(client.post(url, {'status': 'cancelled'}, content_type='application/json').status_code, 403)
+        response = client.post(
+            url, {'status': 'cancelled'}, content_type='application/json', headers={'X-CSRFToken': token},
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_series_is_staff_only(self):
+        self.client.logout()
+        self.assertEqual(self.create().status_code, 403)
+        self.assertFalse(AppointmentSeries.objects.exists())
+
+
+class HoldTests(TestCase):
+    url = reverse('appointments:slot-hold')
+    booking_url = reverse('appointments:appointment-create')
+
+    def setUp(self):
+        clear_caches()
+        ClinicHours.objects.create(weekday=0, opens_at=time(9), closes_at=time(12), slot_minutes=60)
+
+    def hold(self, time='9:00 AM'):
+        return self.client.post(self.url, {'date': '2030-01-07', 'time': time}, content_type='application/json')
+
+    def book(self, **fields):
+        data = {
+            'name': 'Asha', 'email': 'asha@example.com', 'phone': '9876543210',
+            'date': '2030-01-07', 'time': '9:00 AM', **fields,
+        }
+        return self.client.post(self.booking_url, data, content_type='application/json')
+
+    def free(self):
+        url = reverse('appointments:appointment-availability')
+        return self.client.get(url, {'start': '2030-01-07'}).json()['days'][0]['free_slots']
+
+    def test_listing_churn_never_evicts_a_hold(self):
+        token, _ = place_hold(date(2030, 1, 7), 540)
+        # More listings than the listing cache keeps (MAX_ENTRIES 300)
+        for i in range(320):
+            set_listing(f'appointments:listing:1:{i}', b'{}')
+        self.assertEqual(holder(date(2030, 1, 7), 540), token)
+
+    def test_hold_keeps_the_slot_for_its_holder(self):
+        response = self.hold()
+        self.assertEqual(response.status_code, 201)
+        token = response.json()['hold']
+        self.assertEqual(self.hold().status_code, 409)
+        self.assertEqual(self.free(), ['10:00 AM', '11:00 AM'])
+        next_url = reverse('appointments:appointment-next-available')
+        self.assertEqual(self.client.get(next_url, {'date': '2030-01-07'}).json()['slot']['time'], '10:00 AM')
+
+        self.assertEqual(self.book().status_code, 409)
+        self.assertEqual(self.book(hold='nonsense').status_code, 400)
+        self.assertEqual(self.book(hold=token).status_code, 201)
+        # Booking released the hold; the slot is now taken by the appointment
+        self.assertIsNone(holder(date(2030, 1, 7), 540))
+        self.assertEqual(self.hold().status_code, 409)
+        self.assertEqual(self.hold('12:00 PM').status_code, 400)
+
+    def test_release(self):
+        token = self.hold().json()['hold']
+        release_url = reverse('appointments:slot-release', args=[token])
+        self.assertEqual(self.client.delete(release_url).json()['released'], True)
+        self.assertEqual(self.client.delete(release_url).json()['released'], False)
+        self.assertEqual(self.client.delete(reverse('appointments:slot-release', args=['x'])).status_code, 400)
+        self.assertEqual(self.book().status_code, 201)
+
+    def test_alternative_create_view_respects_holds(self):
+        alt_url = reverse('appointments:appointment-create-alt')
+        data = {
+            'name': 'Ravi', 'email': 'ravi@example.com', 'phone': '9123456789',
+            'date': '2030-01-07', 'time': '9:00 AM',
+        }
+        token = self.hold().json()['hold']
+
+        self.assertEqual(self.client.post(alt_url, data, content_type='application/json').status_code, 409)
+        self.assertFalse(Appointment.objects.exists())
+        response = self.client.post(alt_url, {**data, 'hold': token}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(holder(date(2030, 1, 7), 540))
+
+    @override_settings(APPOINTMENTS_HOLD_MINUTES=0)
+    def test_expired_hold_frees_the_slot(self):
+        self.assertEqual(self.hold().status_code, 201)
+        self.assertEqual(self.free(), ['9:00 AM', '10:00 AM', '11:00 AM'])
+        self.assertEqual(self.hold().status_code, 201)
+        self.assertEqual(self.book().status_code, 201)
+
+
+class WaitlistTests(TestCase):
+    url = reverse('appointments:waitlist-join')
+    booking_url = reverse('appointments:appointment-create')
+
+    def setUp(self):
+        clear_caches()
+        ClinicHours.objects.create(weekday=0, opens_at=time(9), closes_at=time(12), slot_minutes=60)
+        self.appointment = Appointment.objects.create(
+            name='Asha', email='asha@example.com', phone='9876543210', date=date(2030, 1, 7), time='10:00 AM',
+        )
+
+    def join(self, phone, **fields):
+        data = {
+            'name': f'Patient {phone}', 'email': f'{phone}@example.com', 'phone': phone,
+            'date_from': '2030-01-01', 'date_to': '2030-01-10', **fields,
+        }
+        return self.client.post(self.url, data, content_type='application/json')
+
+    def book(self, **fields):
+        data = {
+            'name': 'Ravi', 'email': 'ravi@example.com', 'phone': '9123456789',
+            'date': '2030-01-07', 'time': '10:00 AM', **fields,
+        }
+        return self.client.post(self.booking_url, data, content_type='application/json')
+
+    def test_cancellation_is_offered_to_the_longest_waiting_match(self):
+        self.assertEqual(self.join('9000000001', date_from='2030-01-08').status_code, 201)
+        self.assertEqual(self.join('9000000002', earliest_time='11:00 AM').status_code, 201)
+        response = self.join('9000000003', earliest_time='9:00 AM', latest_time='10:30 AM')
+        self.assertEqual(response.json()['entry']['latest_time'], '10:30 AM')
+        self.join('9000000004')
+        self.assertEqual(WaitlistDay.objects.filter(date=date(2030, 1, 7)).count(), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            transition(Appointment.objects.filter(id=self.appointment.id), 'cancelled')
+
+        entry = WaitlistEntry.objects.get(status='offered')
+        self.assertEqual(entry.phone, '9000000003')
+        self.assertEqual((entry.offered_date, entry.offered_minute), (date(2030, 1, 7), 600))
+        self.assertFalse(WaitlistDay.objects.filter(entry=entry).exists())
+        offer = OutboxMessage.objects.get(kind='waitlist_offer')
+        self.assertEqual(offer.recipient, '9000000003@example.com')
+        self.assertIn(entry.hold, offer.body)
+
+        self.assertEqual(self.book().status_code, 409)
+        self.assertEqual(self.book(hold=entry.hold).status_code, 201)
+
+    def test_moved_and_deleted_bookings_free_their_slot(self):
+        self.join('9000000001')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.appointment.time = '11:00 AM'
+            self.appointment.save()
+        self.assertEqual(WaitlistEntry.objects.get().offered_minute, 600)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Appointment.objects.get().delete()
+        # Nobody else waits: the hold is let go and the slot is open again
+        self.assertIsNone(holder(date(2030, 1, 7), 660))
+        self.assertEqual(self.book(time='11:00 AM').status_code, 201)
+
+    def test_join_validation(self):
+        self.assertEqual(self.join('9000000001', date_to='2030-03-01').status_code, 400)
+        self.assertEqual(self.join('9000000001', date_to='2029-12-01').status_code, 400)
+        self.assertEqual(self.join('9000000001', earliest_time='5:00 PM', latest_time='9:00 AM').status_code, 400)
+        self.assertEqual(self.join('123').status_code, 400)
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+
+class PatientTests(TestCase):
+    url = reverse('appointments:appointment-create')
+    lookup_url = reverse('appointments:patient-lookup')
+
+    def setUp(self):
+        clear_caches()
+
+    def book(self, slot_time, **fields):
+        data = {
+            'name': 'Asha', 'email': 'asha@example.com', 'phone': '9876543210',
+            'date': '2030-01-07', 'time': slot_time, **fields,
+        }
+        return self.client.post(self.url, data, content_type='application/json')
+
+    def test_normalize_phone(self):
+        variants = ['9876543210', '098765 43210', '+91 98765-43210', '0091 (98765) 43210', '919876543210']
+        for value in variants:
+            self.assertEqual(normalize_phone(value), '+919876543210', value)
+        self.assertEqual(normalize_phone('+44 20 7946 0958'), '+442079460958')
+        for value in ['', '1', '98765', 'call me', '+0123456789']:
+            self.assertIsNone(normalize_phone(value), value)
+
+    def test_variants_collapse_to_one_patient(self):
+        self.assertEqual(self.book('9:00 AM').status_code, 201)
+        variant = {'name': 'Asha R', 'email': 'Asha@Example.com', 'phone': '+91 98765 43210'}
+        self.assertEqual(self.book('10:00 AM', **variant).status_code, 201)
+        self.assertEqual(self.book('11:00 AM', email='other@example.com').status_code, 201)
+        self.assertEqual(self.book('12:00 PM', phone='12-34').status_code, 400)
+        import_appointments([
+            '{"name": "Asha", "email": "ASHA@example.com", "phone": "09876543210", "date": "2024-03-01", "time": "9:00 AM"}',
+            '{"name": "Legacy", "email": "legacy@example.com", "phone": "n/a", "date": "2024-03-01", "time": "10:00 AM"}',
+        ])
+
+        asha = Patient.objects.get(email='asha@example.com')
+        self.assertEqual((asha.phone, asha.name), ('+919876543210', 'Asha'))
+        self.assertEqual(Patient.objects.count(), 2)
+        self.assertEqual(asha.appointments.count(), 3)
+        self.assertIsNone(Appointment.objects.get(name='Legacy').patient_id)
+
+    def test_alternative_create_view_rejects_invalid_phone(self):
+        response = self.client.post(reverse('appointments:appointment-create-alt'), {
+            'name': 'Asha', 'email': 'asha@example.com', 'phone': 'abc', 'date': '2030-01-07', 'time': '9:00 AM',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Appointment.objects.exists())
+
+    def test_shared_phone_keeps_patients_apart(self):
+        # A patient is the (phone, email) pair: relatives booking on one
+        # phone with their own emails stay separate, and both match a lookup
+        self.book('9:00 AM')
+        self.book('10:00 AM', name='Ravi', email='ravi@example.com', phone='+91 98765 43210')
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+
+        patients = self.client.get(self.lookup_url, {'phone': '9876543210'}).json()['patients']
+        self.assertEqual(sorted(p['email'] for p in patients), ['asha@example.com', 'ravi@example.com'])
+        self.assertEqual({p['phone'] for p in patients}, {'+919876543210'})
+
+    def test_lookup_and_history(self):
+        for slot_time in ['9:00 AM', '10:00 AM', '11:00 AM']:
+            self.book(slot_time)
+        self.book('9:00 AM', date='2030-01-08')
+        patient = Patient.objects.get()
+        history_url = reverse('appointments:patient-history', args=[patient.id])
+        self.assertEqual(self.client.get(self.lookup_url, {'phone': '9876543210'}).status_code, 403)
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+
+        query = {'phone': '+91 98765 43210', 'email': 'ASHA@example.com'}
+        patients = self.client.get(self.lookup_url, query).json()['patients']
+        self.assertEqual([p['id'] for p in patients], [patient.id])
+        self.assertEqual(self.client.get(self.lookup_url, {'email': 'nobody@example.com'}).json()['patients'], [])
+        self.assertEqual(self.client.get(self.lookup_url).status_code, 400)
+
+        with self.assertNumQueries(4):  # session, user, patient, appointments
+            body = self.client.get(history_url, {'limit': 3}).json()
+        self.assertEqual(
+            [(a['date'], a['time']) for a in body['appointments']],
+            [('2030-01-08', '9:00 AM'), ('2030-01-07', '11:00 AM'), ('2030-01-07', '10:00 AM')],
+        )
+        self.assertTrue(body['has_more'])
+        self.assertFalse(self.client.get(history_url).json()['has_more'])
+        self.assertEqual(self.client.get(reverse('appointments:patient-history', args=[0])).status_code, 404)
+
+    def test_backfill_migration(self):
+        link = import_module('appointments.migrations.0013_patients').link_existing
+        # bulk_create skips linking, like rows written before patients existed
+        Appointment.objects.bulk_create([
+            Appointment(name='A', email='A@example.com', phone='98765 43210', date=date(2024, 3, 1), time='9:00 AM'),
+            Appointment(name='A2', email='a@example.com', phone='+919876543210', date=date(2024, 3, 2), time='9:00 AM'),
+            Appointment(name='B', email='b@example.com', phone='?', date=date(2024, 3, 3), time='9:00 AM'),
+        ])
+        with redirect_stdout(io.StringIO()) as report:
+            link(apps, connection.schema_editor())
+
+        patient = Patient.objects.get()
+        self.assertEqual((patient.name, patient.email, patient.phone), ('A2', 'a@example.com', '+919876543210'))
+        self.assertEqual(
+            dict(Appointment.objects.values_list('name', 'patient_id')),
+            {'A': patient.id, 'A2': patient.id, 'B': None},
+        )
+        self.assertIn('1 appointments have a phone number', report.getvalue())
+
+
+class PartitionTests(TestCase):
+    def test_month_arithmetic(self):
+        self.assertEqual(add_months(date(2025, 11, 1), 3), date(2026, 2, 1))
+        self.assertEqual(add_months(date(2026, 1, 1), -1), date(2025, 12, 1))
+        self.assertEqual(partition_name(month_start(date(2026, 2, 17))), 'appointments_p202602')
+
+    def test_command_needs_a_partitioned_table(self):
+        if is_partitioned(connection):
+            self.skipTest('appointments is partitioned on this database')
+        with self.assertRaises(CommandError):
+            call_command('partition_appointments', dry_run=True)
+
+
+class ProfilingTests(TestCase):
+    url = reverse('appointments:profile-list')
+
+    def setUp(self):
+        clear_caches()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.settings_override = override_settings(
+            APPOINTMENTS_PROFILE_DIR=directory.name, APPOINTMENTS_PROFILE_MAX=3,
+            APPOINTMENTS_PROFILE_INTERVAL_MS=1,
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.staff = User.objects.create_user('staff', password='x', is_staff=True)
+
+    def test_token_requests_are_profiled_and_listed(self):
+        listing = reverse('appointments:appointment-create')
+        self.client.get(listing)
+        self.client.get(listing, headers={'X-Profile-Token': 'forged'})
+        self.assertEqual(get_profile_store().ids(), [])
+
+        for limit in range(1, 5):
+            self.client.get(listing, {'limit': limit}, headers={'X-Profile-Token': make_token()})
+        self.assertEqual(len(get_profile_store().ids()), 3)
+
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_login(self.staff)
+        profiles = self.client.get(self.url).json()['profiles']
+        self.assertEqual(profiles[0]['view'], 'appointments:appointment-create')
+        self.assertEqual(profiles[0]['queries'], 1)
+        self.assertNotIn('stacks', profiles[0])
+
+        response = self.client.get(profiles[0]['url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(reverse('appointments:profile-detail', args=['..x'])).status_code, 404)
+
+    def test_sampler_cuts_stacks_at_the_root(self):
+        def view():
+            deadline = clock.perf_counter() + 0.05
+            while clock.perf_counter() < deadline:
+                pass
+
+        def root():
+            with StackSampler(threading.get_ident(), 0.001, root.__code__) as sampler:
+                view()
+            return sampler
+
+        stacks = root().stacks
+        self.assertTrue(any(stack.startswith('view (tests.py') for stack in stacks))
+        self.assertFalse(any('test_sampler_cuts_stacks_at_the_root' in stack for stack in stacks))
+
+
+class AdminChangelistTests(TestCase):
+    def test_search_and_filters(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(admin_user)
+        make_appointment(name='Asha Rao', status='confirmed')
+        make_appointment(name='Ravi Kumar')
+        url = reverse('admin:appointments_appointment_changelist')
+
+        response = self.client.get(url, {'q': 'asha', 'status__exact': 'confirmed'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_paginator_counts_exactly_without_postgres(self):
+        make_appointment()
+        paginator = EstimatedCountPaginator(Appointment.objects.all(), 10)
+        self.assertEqual(paginator.count, 1)
+
+
+class AsyncAppointmentViewTests(TestCase):
+    url = reverse('appointments:appointment-async')
+
+    def setUp(self):
+        clear_caches()
+
+    async def test_create_and_list(self):
+        payload = {
+            'name': 'Test Patient', 'email': 'patient@example.com', 'phone': '9876543210',
+            'date': '2030-01-07', 'time': '9:00 AM',
+        }
+
+        created = await self.async_client.post(self.url, payload, content_type='application/json')
+        clash = await self.async_client.post(self.url, payload, content_type='application/json')
+        listing = await self.async_client.get(self.url)
+
+        self.assertEqual(created.status_code, 201)
+        self.assertEqual(clash.status_code, 409)
+        self.assertEqual([row['id'] for row in listing.json()['appointments']], [created.json()['appointment_id']])
+
+
+    async def test_non_string_fields_are_rejected_on_every_create_route(self):
+        payload = {
+            'name': 'Test Patient', 'email': 'patient@example.com', 'phone': '9876543210',
+            'date': '2030-01-07', 'time': '9:00 AM',
+        }
+        urls = [self.url, reverse('appointments:appointment-create-alt'), reverse('appointments:appointment-create')]
+        for field, value in [('date', 20300107), ('time', 930), ('phone', 9876543210)]:
+            for url in urls:
+                with self.subTest(field=field, url=url):
+                    response = await self.async_client.post(
+                        url, {**payload, field: value}, content_type='application/json',
+                    )
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.json()['error'], f'{field} must be a string')
+
+class ListingCacheTests(TestCase):
+    url = reverse('appointments:appointment-create')
+
+    def setUp(self):
+        clear_caches()
+
+    def test_an_evicted_version_never_serves_an_old_listing(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_appointment()
+        # The version is evicted; the listing from before the write is not
+        get_cache().delete(VERSION_KEY)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.json()['appointments']), 1)
+
+    def test_writes_invalidate_cached_listings(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = make_appointment()
+
+        first = self.client.get(self.url)
+        second = self.client.get(self.url)
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(first.content, second.content)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.status = 'confirmed'
+            appointment.save()
+
+        third = self.client.get(self.url)
+        self.assertEqual(third['X-Cache'], 'MISS')
+        self.assertEqual(third.json()['appointments'][0]['status'], 'confirmed')
+
+    def test_stats_endpoint(self):
+        stats_url = reverse('appointments:appointment-cache-stats')
+        self.client.get(self.url)
+        self.client.get(self.url)
+
+        self.assertEqual(self.client.get(stats_url).status_code, 403)
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        stats = self.client.get(stats_url).json()['cache']
+
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+
+class IdempotencyTests(TestCase):
+    payload = {
+        'name': 'Test Patient', 'email': 'patient@example.com', 'phone': '9876543210',
+        'date': '2030-01-07', 'time': '9:00 AM',
+    }
+
+    def setUp(self):
+        get_store.cache_clear()
+        self.addCleanup(get_store.cache_clear)
+
+    def post(self, url, key, payload=None):
+        return self.client.post(
+            reverse(url), payload or self.payload, content_type='application/json',
+            headers={'Idempotency-Key': key},
+        )
+
+    def assert_replays(self):
+        for url in ('appointments:appointment-create', 'appointments:appointment-create-alt'):
+            first = self.post(url, 'key-1')
+            retry = self.post(url, 'key-1')
+            self.assertEqual(first.status_code, 201)
+            self.assertEqual((retry.status_code, retry.content), (201, first.content))
+            self.assertEqual(retry['Idempotent-Replayed'], 'true')
+            self.assertEqual(self.post(url, 'key-1', {**self.payload, 'time': '10:00 AM'}).status_code, 422)
+            Appointment.objects.all().delete()
+
+    def test_memory_store(self):
+        self.assert_replays()
+
+    @override_settings(APPOINTMENTS_IDEMPOTENCY_STORE='database')
+    def test_database_store(self):
+        self.assert_replays()
+        self.assertEqual(IdempotencyKey.objects.count(), 2)
+
+    def test_concurrent_duplicates_run_the_view_once(self):
+        store = MemoryIdempotencyStore(ttl=60, max_keys=10)
+        calls = []
+
+        def request():
+            if store.begin('key', 'body') is None:
+                calls.append(1)
+                clock.sleep(0.05)
+                store.complete('key', StoredResponse(201, 'application/json', b'{}'))
+
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+
+    def test_memory_store_is_bounded(self):
+        store = MemoryIdempotencyStore(ttl=60, max_keys=2)
+        for key in ('a', 'b', 'c'):
+            store.begin(key, 'body')
+            store.complete(key, StoredResponse(201, 'application/json', key.encode()))
+
+        self.assertIsNone(store.begin('a', 'body'))
+        self.assertEqual(store.begin('c', 'body').content, b'c')
+
+    def test_memory_store_keeps_keys_in_progress(self):
+        store = MemoryIdempotencyStore(ttl=60, max_keys=2)
+        store.begin('running', 'body')
+        for key in ('a', 'b', 'c'):
+            store.begin(key, 'body')
+            store.complete(key, StoredResponse(201, 'application/json', key.encode()))
+
+        with self.assertRaises(KeyReused):
+            store.begin('running', 'other body')
+        self.assertEqual(store.begin('c', 'body').content, b'c')
+
+    async def test_concurrent_async_duplicates(self):
+        # The duplicate must wait on the event loop: waiting on the thread
+        # sync_to_async shares would stall the first request until the timeout
+        url = reverse('appointments:appointment-async')
+        first, retry = await asyncio.gather(*(
+            self.async_client.post(
+                url, self.payload, content_type='application/json', headers={'Idempotency-Key': 'key-1'},
+            )
+            for _ in range(2)
+        ))
+
+        self.assertEqual((first.status_code, retry.status_code), (201, 201))
+        self.assertEqual(first.content, retry.content)
+        self.assertEqual(await Appointment.objects.acount(), 1)
+
+
+@override_settings(APPOINTMENTS_INTAKE_MODE='queued')
+class QueuedIntakeTests(TestCase):
+    url = reverse('appointments:appointment-create')
+
+    def setUp(self):
+        clear_caches()
+
+    def book(self, slot_time):
+        return self.client.post(self.url, {
+            'name': 'Test Patient', 'email': 'patient@example.com', 'phone': '9876543210',
+            'date': '2030-01-07', 'time': slot_time,
+        }, content_type='application/json')
+
+    def test_queued_bookings_are_flushed_and_resolved(self):
+        accepted = [self.book('9:00 AM'), self.book('9:00'), self.book('10:00 AM')]
+        self.assertEqual([response.status_code for response in accepted], [202, 202, 202])
+        self.assertFalse(Appointment.objects.exists())
+        status_urls = [response.json()['status_url'] for response in accepted]
+        self.assertEqual(self.client.get(status_urls[0]).json()['status'], 'queued')
+
+        self.assertEqual(flush_queue(), 3)
+
+        statuses = [self.client.get(url).json() for url in status_urls]
+        self.assertEqual([s['status'] for s in statuses], ['booked', 'rejected', 'booked'])
+        self.assertEqual(
+            {s['appointment_id'] for s in statuses if s['appointment_id']},
+            set(Appointment.objects.values_list('id', flat=True)),
+        )
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+        self.assertEqual(flush_queue(), 0)
+
+    @override_settings(APPOINTMENTS_INTAKE_MAX_QUEUE=1)
+    def test_backpressure_when_the_queue_is_full(self):
+        self.assertEqual(self.book('9:00 AM').status_code, 202)
+        clear_caches()
+
+        response = self.book('10:00 AM')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
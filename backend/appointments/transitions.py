@@ -0,0 +1,106 @@
+"""Status changes as single conditional UPDATE statements.
+
+``transition`` moves every selected appointment whose current status allows
+it to the target status in a single ``UPDATE ... RETURNING`` statement. The
+allowed source statuses are part of the statement's WHERE clause, so a
+cancelled appointment can never be completed, even by a request racing
+another status change. Rows the predicate rejects are simply not updated
+and come back as skipped.
+
+``change_status`` does the same for one appointment at a known ``version``
+(optimistic concurrency): no row is read first, only the changed columns
+are written, and a row someone else changed since is left alone.
+"""
+from datetime import date
+from django.db import connections, transaction
+from django.utils import timezone
+from .models import Appointment
+from .signals import appointments_bulk_changed, publish_freed_slots
+
+# Target status -> statuses it may be reached from. Cancelled and completed
+# are final: reinstating a cancelled booking has to go through booking again
+# so the slot is checked.
+ALLOWED_SOURCES = {
+    'confirmed': ('pending',),
+    'completed': ('pending', 'confirmed'),
+    'cancelled': ('pending', 'confirmed'),
+}
+# Most ids accepted by one call of the HTTP endpoint
+MAX_BULK_IDS = 1000
+
+
+def _as_date(value):
+    # SQLite hands RETURNING columns back as text
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _update(connection, status, where, where_params):
+    """Run the status UPDATE for rows matching ``where``; returns (id, date,
+    version, start_minute) rows"""
+    if status not in ALLOWED_SOURCES:
+        raise ValueError(f'Cannot change appointments to status: {status}')
+    sources = ALLOWED_SOURCES[status]
+    quote = connection.ops.quote_name
+    updated_at = Appointment._meta.get_field('updated_at').get_db_prep_value(
+        timezone.now(), connection
+    )
+    assignments = [
+        f'{quote("status")} = %s',
+        f'{quote("updated_at")} = %s',
+        f'{quote("version")} = {quote("version")} + 1',
+    ]
+    # Cancelled and completed appointments leave the reminder queue
+    if status not in Appointment.REMINDED_STATUSES:
+        assignments.append(f'{quote("remind_at")} = NULL')
+    placeholders = ', '.join(['%s'] * len(sources))
+    sql = (
+        f'UPDATE {quote(Appointment._meta.db_table)} SET {", ".join(assignments)} '
+        f'WHERE {where} AND {quote("status")} IN ({placeholders}) '
+        f'RETURNING {quote("id")}, {quote("date")}, {quote("version")}, {quote("start_minute")}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [status, updated_at, *where_params, *sources])
+        rows = cursor.fetchall()
+    if rows:
+        appointments_bulk_changed.send(
+            sender=Appointment, dates={_as_date(day) for _, day, _, _ in rows}
+        )
+        if status == 'cancelled':
+            publish_freed_slots((_as_date(day), minute) for _, day, _, minute in rows if minute is not None)
+    return rows
+
+
+def transition(queryset, status):
+    """Move the appointments of ``queryset`` to ``status`` where allowed.
+
+    Returns the ids of the updated appointments.
+    """
+    connection = connections[queryset.db]
+    selected, params = queryset.order_by().values('id').query.sql_with_params()
+    with transaction.atomic(using=queryset.db):
+        rows = _update(connection, status, f'{connection.ops.quote_name("id")} IN ({selected})', params)
+    return [appointment_id for appointment_id, _, _, _ in rows]
+
+
+def transition_ids(ids, status):
+    """``transition`` over a list of ids; returns (updated ids, skipped ids)"""
+    ids = list(dict.fromkeys(ids))
+    updated = transition(Appointment.objects.filter(id__in=ids), status)
+    done = set(updated)
+    return sorted(updated), [i for i in ids if i not in done]
+
+
+def change_status(appointment_id, version, status, using='default'):
+    """Move one appointment from ``version`` to ``status``.
+
+    Returns the new version, or None when the appointment does not exist,
+    is at another version or is in a status that does not allow the change.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    with transaction.atomic(using=using):
+        rows = _update(
+            connection, status, f'{quote("id")} = %s AND {quote("version")} = %s',
+            [appointment_id, version],
+        )
+    return rows[0][2] if rows else None
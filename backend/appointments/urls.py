@@ -1,5 +1,28 @@
 from django.urls import path
-from .views import AppointmentCreateView, create_appointment
+from .views import (
+    AppointmentCreateView,
+    AsyncAppointmentView,
+    appointment_availability,
+    appointment_calendar,
+    appointment_status,
+    appointment_schedule,
+    booking_status,
+    bulk_status_view,
+    create_appointment,
+    export_appointments_view,
+    import_appointments_view,
+    listing_cache_stats,
+    next_available_slot,
+    patient_history,
+    patient_lookup,
+    profile_detail,
+    profile_list,
+    series_create,
+    series_occurrence,
+    slot_hold,
+    slot_release,
+    waitlist_join,
+)
 
 app_name = 'appointments'
 
@@ -7,6 +30,56 @@ urlpatterns = [
     # Class-based view
     path('api/appointments/', AppointmentCreateView.as_view(), name='appointment-create'),
     
+    # Async create/list for ASGI deployments (config/asgi.py)
+    path('api/async/appointments/', AsyncAppointmentView.as_view(), name='appointment-async'),
+    
+    # Free slots per day
+    path('api/appointments/availability/', appointment_availability, name='appointment-availability'),
+    
+    # Appointments per status for each day, from the daily rollup (staff only)
+    path('api/appointments/calendar/', appointment_calendar, name='appointment-calendar'),
+    
+    # One day's appointments in clock order, and the next free slot
+    path('api/appointments/schedule/', appointment_schedule, name='appointment-schedule'),
+    path('api/appointments/next-available/', next_available_slot, name='appointment-next-available'),
+    
+    # Short-lived slot holds while the booking form is filled in
+    path('api/appointments/holds/', slot_hold, name='slot-hold'),
+    path('api/appointments/holds/<str:token>/', slot_release, name='slot-release'),
+    
+    # Bulk NDJSON/CSV import (staff only)
+    path('api/appointments/import/', import_appointments_view, name='appointment-import'),
+    
+    # Streaming CSV/NDJSON export (staff only)
+    path('api/appointments/export/', export_appointments_view, name='appointment-export'),
+    
+    # Bulk status changes, one UPDATE per request (staff only)
+    path('api/appointments/status/', bulk_status_view, name='appointment-bulk-status'),
+    
+    # Status change of one appointment at a known version (staff only)
+    path('api/appointments/<int:appointment_id>/status/', appointment_status, name='appointment-status'),
+    
+    # Status of a booking accepted in queued intake mode
+    path('api/appointments/intake/<uuid:tracking_id>/', booking_status, name='booking-status'),
+    
+    # Listing cache hit/miss counters (staff only)
+    path('api/appointments/cache-stats/', listing_cache_stats, name='appointment-cache-stats'),
+    
+    # Request profiles recorded by ProfilingMiddleware (staff only)
+    path('api/appointments/profiles/', profile_list, name='profile-list'),
+    path('api/appointments/profiles/<str:profile_id>/', profile_detail, name='profile-detail'),
+    
+    # Recurring series, and changes to one of their occurrences (staff only)
+    path('api/series/', series_create, name='series-create'),
+    path('api/series/<int:series_id>/occurrences/<str:day>/', series_occurrence, name='series-occurrence'),
+    
+    # Waiting for a slot a cancellation frees
+    path('api/waitlist/', waitlist_join, name='waitlist-join'),
+    
+    # Patients by phone/email, and one patient's appointments (staff only)
+    path('api/patients/', patient_lookup, name='patient-lookup'),
+    path('api/patients/<int:patient_id>/appointments/', patient_history, name='patient-history'),
+    
     # Function-based view alternative
     path('api/appointments/create/', create_appointment, name='appointment-create-alt'),
 ] 
\ No newline at end of file
@@ -1,65 +1,141 @@
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.urls import reverse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import require_GET, require_http_methods
 from django.utils.decorators import method_decorator
 from django.views import View
+import codecs
 import json
-from datetime import datetime
-from .models import Appointment
+from datetime import date, timedelta
+from asgiref.sync import sync_to_async
+from .availability import (
+    MAX_AVAILABILITY_DAYS,
+    aclinic_schedule,
+    day_schedule,
+    free_slots,
+    next_available,
+)
+from .booking import (
+    INVALID_TIME,
+    BookingError,
+    book_appointment,
+    check_clinic_hours,
+    check_hold,
+    create_booking,
+    create_series,
+    hold_slot,
+    materialize_occurrence,
+    parse_booking,
+    parse_waitlist,
+    validate_booking,
+)
+from .cache import (
+    aget_listing,
+    alisting_key,
+    aset_listing,
+    get_listing,
+    listing_key,
+    reset_stats as reset_cache_stats,
+    set_listing,
+    stats as cache_stats,
+)
+from .export import (
+    CONTENT_TYPES as EXPORT_CONTENT_TYPES,
+    FORMATS as EXPORT_FORMATS,
+    export_appointments,
+    export_filename,
+)
+from .filters import filter_appointments, listing_appointments, parse_date
+from .holds import release_hold
+from .idempotency import idempotent
+from .importer import FORMATS as IMPORT_FORMATS, import_appointments
+from .intake import QueueFull, enqueue_booking, queued_mode
+from .models import Appointment, Patient, QueuedBooking
+from .pagination import akeyset_page, keyset_page, parse_limit
+from .patients import PATIENT_FIELDS, normalize_email, normalize_phone
+from .profiling import collapsed_stacks, get_store as get_profile_store
+from .rollups import MAX_CALENDAR_DAYS, calendar
+from .series import (
+    LISTING_WINDOW_DAYS,
+    MAX_SERIES_DAYS,
+    clock_order,
+    occurrence_rows,
+    series_data,
+    window_occurrences,
+)
+from .serializers import (
+    appointment_data,
+    appointment_rows,
+    appointment_values,
+    json_response,
+    row_position,
+)
+from .slots import format_minute, parse_time_of_day
+from .transitions import ALLOWED_SOURCES, MAX_BULK_IDS, change_status, transition_ids
+from .waitlist import entry_data, join_waitlist
 
 # Create your views here.
 
+def cached_json_response(content):
+    """Replay a cached JSON body"""
+    response = HttpResponse(content, content_type='application/json')
+    response['X-Cache'] = 'HIT'
+    return response
+
+
+def listing_occurrences(params):
+    """Series occurrences for the first listing page of a date window of
+    up to LISTING_WINDOW_DAYS; None otherwise"""
+    if params.get('cursor'):
+        return None
+    return window_occurrences(params, LISTING_WINDOW_DAYS)
+
+def queued_booking_response(fields):
+    """Stage a validated booking and answer 202, or 503 when the queue is full"""
+    try:
+        booking = enqueue_booking(fields)
+    except QueueFull:
+        response = JsonResponse({
+            'error': 'Too many booking requests, please retry shortly'
+        }, status=503)
+        response['Retry-After'] = '1'
+        return response
+
+    return JsonResponse({
+        'success': True,
+        'message': 'Appointment request accepted',
+        'tracking_id': str(booking.tracking_id),
+        'status_url': reverse('appointments:booking-status', args=[booking.tracking_id])
+    }, status=202)
+
+
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(idempotent, name='post')
 class AppointmentCreateView(View):
     def post(self, request):
         try:
             # Parse JSON data
             data = json.loads(request.body)
             
-            # Validate required fields (removed 'reason' from required fields)
-            required_fields = ['name', 'email', 'phone', 'date', 'time']
-            for field in required_fields:
-                if not data.get(field):
-                    return JsonResponse({
-                        'error': f'{field} is required'
-                    }, status=400)
+            # In queued intake mode, stage the booking and answer 202
+            if queued_mode():
+                return queued_booking_response(validate_booking(data))
             
-            # Validate date format
-            try:
-                appointment_date = datetime.strptime(data['date'], '%Y-%m-%d').date()
-            except ValueError:
-                return JsonResponse({
-                    'error': 'Invalid date format. Use YYYY-MM-DD'
-                }, status=400)
+            # Validate and create appointment
+            appointment = create_booking(data)
             
-            # Create appointment
-            appointment = Appointment.objects.create(
-                name=data['name'],
-                email=data['email'],
-                phone=data['phone'],
-                date=appointment_date,
-                time=data['time'],
-                message=data.get('message', '')
-            )
-            
-            return JsonResponse({
+            return json_response({
                 'success': True,
                 'message': 'Appointment created successfully',
                 'appointment_id': appointment.id,
-                'data': {
-                    'id': appointment.id,
-                    'name': appointment.name,
-                    'email': appointment.email,
-                    'phone': appointment.phone,
-                    'date': appointment.date.strftime('%Y-%m-%d'),
-                    'time': appointment.time,
-                    'message': appointment.message,
-                    'status': appointment.status,
-                    'created_at': appointment.created_at.isoformat()
-                }
+                'data': appointment_data(appointment)
             }, status=201)
             
+        except BookingError as e:
+            return JsonResponse({
+                'error': e.message
+            }, status=e.status)
         except json.JSONDecodeError:
             return JsonResponse({
                 'error': 'Invalid JSON data'
@@ -70,52 +146,646 @@ class AppointmentCreateView(View):
             }, status=500)
     
     def get(self, request):
-        """Get all appointments (optional for admin use)"""
-        appointments = Appointment.objects.all()
-        appointments_data = []
-        
-        for appointment in appointments:
-            appointments_data.append({
-                'id': appointment.id,
-                'name': appointment.name,
-                'email': appointment.email,
-                'phone': appointment.phone,
-                'date': appointment.date.strftime('%Y-%m-%d'),
-                'time': appointment.time,
-                'message': appointment.message,
-                'status': appointment.status,
-                'created_at': appointment.created_at.isoformat(),
-                'updated_at': appointment.updated_at.isoformat()
-            })
-        
+        """List appointments newest first, one keyset page at a time (admin use)"""
+        key = listing_key(request.GET)
+        content = get_listing(key)
+        if content is not None:
+            return cached_json_response(content)
+
+        try:
+            limit = parse_limit(request.GET.get('limit'))
+            appointments = listing_appointments(request.GET)
+            appointments, next_cursor = keyset_page(
+                appointment_values(appointments), cursor=request.GET.get('cursor'), limit=limit,
+                position=row_position,
+            )
+            occurrences = listing_occurrences(request.GET)
+        except ValueError as e:
+            return JsonResponse({
+                'error': str(e)
+            }, status=400)
+
+        response = json_response({
+            'success': True,
+            'appointments': appointment_rows(appointments),
+            'occurrences': occurrences,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        })
+        set_listing(key, response.content)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(idempotent, name='post')
+class AsyncAppointmentView(View):
+    """Async counterpart of AppointmentCreateView for ASGI deployments.
+
+    Reads use the async ORM. The insert itself runs in a worker thread,
+    because transactions and the occupancy signals are synchronous.
+    """
+
+    async def post(self, request):
+        try:
+            data = json.loads(request.body)
+            fields = parse_booking(data)
+            check_clinic_hours(await aclinic_schedule(), fields)
+            await sync_to_async(check_hold)(fields, data.get('hold'))
+            if queued_mode():
+                return await sync_to_async(queued_booking_response)(fields)
+            appointment = await sync_to_async(book_appointment)(fields)
+            if data.get('hold'):
+                await sync_to_async(release_hold)(data['hold'])
+        except BookingError as e:
+            return JsonResponse({
+                'error': e.message
+            }, status=e.status)
+        except json.JSONDecodeError:
+            return JsonResponse({
+                'error': 'Invalid JSON data'
+            }, status=400)
+
+        return json_response({
+            'success': True,
+            'message': 'Appointment created successfully',
+            'appointment_id': appointment.id,
+            'data': appointment_data(appointment)
+        }, status=201)
+
+    async def get(self, request):
+        """Async version of AppointmentCreateView.get"""
+        key = await alisting_key(request.GET)
+        content = await aget_listing(key)
+        if content is not None:
+            return cached_json_response(content)
+
+        try:
+            limit = parse_limit(request.GET.get('limit'))
+            appointments = listing_appointments(request.GET)
+            appointments, next_cursor = await akeyset_page(
+                appointment_values(appointments), cursor=request.GET.get('cursor'), limit=limit,
+                position=row_position,
+            )
+            occurrences = await sync_to_async(listing_occurrences)(request.GET)
+        except ValueError as e:
+            return JsonResponse({
+                'error': str(e)
+            }, status=400)
+
+        response = json_response({
+            'success': True,
+            'appointments': appointment_rows(appointments),
+            'occurrences': occurrences,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        })
+        await aset_listing(key, response.content)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+@require_GET
+def appointment_availability(request):
+    """Free slots per day for a date range (``start``, optional ``end``)"""
+    try:
+        start = parse_date(request.GET.get('start', ''), 'start')
+        end = parse_date(request.GET['end'], 'end') if request.GET.get('end') else start
+    except ValueError as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
+
+    if end < start or (end - start).days >= MAX_AVAILABILITY_DAYS:
+        return JsonResponse({
+            'error': f'Date range must be between 1 and {MAX_AVAILABILITY_DAYS} days'
+        }, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'days': free_slots(start, end)
+    })
+
+@require_GET
+def appointment_calendar(request):
+    """Per-day counts by status for ``start`` (today) to ``end`` (90 days on); staff only"""
+    if not request.user.is_staff:
+        return JsonResponse({
+            'error': 'Staff access required'
+        }, status=403)
+
+    try:
+        start = parse_date(request.GET['start'], 'start') if request.GET.get('start') else date.today()
+        end = parse_date(request.GET['end'], 'end') if request.GET.get('end') else start + timedelta(days=89)
+    except ValueError as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
+
+    if end < start or (end - start).days >= MAX_CALENDAR_DAYS:
+        return JsonResponse({
+            'error': f'Date range must be between 1 and {MAX_CALENDAR_DAYS} days'
+        }, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'days': calendar(start, end)
+    })
+
+@require_GET
+def appointment_schedule(request):
+    """One day's appointments in clock order (``date``; staff only)"""
+    if not request.user.is_staff:
+        return JsonResponse({
+            'error': 'Staff access required'
+        }, status=403)
+
+    try:
+        day = parse_date(request.GET.get('date', ''), 'date')
+    except ValueError as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
+
+    rows = appointment_rows(appointment_values(day_schedule(day))) + occurrence_rows(day, day)
+    rows.sort(key=clock_order)
+    return json_response({
+        'success': True,
+        'date': day,
+        'appointments': rows
+    })
+
+@require_GET
+def next_available_slot(request):
+    """Earliest free slot from ``date`` (default today) and optional ``time``"""
+    try:
+        day = parse_date(request.GET['date'], 'date') if request.GET.get('date') else date.today()
+    except ValueError as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
+
+    minute = 0
+    if request.GET.get('time'):
+        minute = parse_time_of_day(request.GET['time'])
+        if minute is None:
+            return JsonResponse({
+                'error': INVALID_TIME
+            }, status=400)
+
+    slot = next_available(day, minute)
+    return JsonResponse({
+        'success': True,
+        'slot': {
+            'date': slot[0].strftime('%Y-%m-%d'),
+            'time': format_minute(slot[1])
+        } if slot else None
+    })
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def slot_hold(request):
+    """Hold a free slot for APPOINTMENTS_HOLD_MINUTES while the patient books it"""
+    try:
+        data = json.loads(request.body)
+        hold, expires_at = hold_slot(data)
+    except BookingError as e:
+        return JsonResponse({
+            'error': e.message
+        }, status=e.status)
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'error': 'Invalid JSON data'
+        }, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'hold': hold,
+        'date': data['date'],
+        'time': data['time'],
+        'expires_at': expires_at
+    }, status=201)
+
+@csrf_exempt
+@require_http_methods(["DELETE"])
+def slot_release(request, token):
+    """Give up a hold before it expires"""
+    try:
+        released = release_hold(token)
+    except ValueError as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'released': released
+    })
+
+@require_http_methods(["POST"])
+def import_appointments_view(request):
+    """Bulk import NDJSON or CSV appointments streamed in the request body (staff only)"""
+    if not request.user.is_staff:
+        return JsonResponse({
+            'error': 'Staff access required'
+        }, status=403)
+
+    fmt = request.GET.get('format')
+    if not fmt:
+        fmt = 'csv' if request.content_type == 'text/csv' else 'ndjson'
+    if fmt not in IMPORT_FORMATS:
+        return JsonResponse({
+            'error': f'Unsupported format: {fmt}'
+        }, status=400)
+
+    # Iterating the request reads the body line by line instead of loading it
+    lines = codecs.iterdecode(request, 'utf-8')
+    try:
+        result = import_appointments(lines, fmt=fmt)
+    except UnicodeDecodeError:
+        return JsonResponse({
+            'error': 'Request body must be UTF-8'
+        }, status=400)
+
+    return JsonResponse({
+        'success': True,
+        **result.as_dict()
+    })
+
+@require_GET
+def export_appointments_view(request):
+    """Stream appointments as CSV or NDJSON, optionally gzipped (staff only)"""
+    if not request.user.is_staff:
+        return JsonResponse({
+            'error': 'Staff access required'
+        }, status=403)
+
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return JsonResponse({
+            'error': f'Unsupported format: {fmt}'
+        }, status=400)
+    try:
+        appointments = filter_appointments(Appointment.objects.all(), request.GET)
+        occurrences = window_occurrences(request.GET, MAX_SERIES_DAYS)
+    except ValueError as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
+
+    compress = request.GET.get('gzip') in ('1', 'true')
+    response = StreamingHttpResponse(
+        export_appointments(appointments, fmt=fmt, compress=compress, occurrences=occurrences),
+        content_type='application/gzip' if compress else EXPORT_CONTENT_TYPES[fmt],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(fmt, compress)}"'
+    return response
+
+@require_http_methods(["POST"])
+def bulk_status_view(request):
+    """Move many appointments to one status in a single UPDATE (staff only)"""
+    if not request.user.is_staff:
+        return JsonResponse({
+            'error': 'Staff access required'
+        }, status=403)
+
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'error': 'Invalid JSON data'
+        }, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({
+            'error': 'Expected a JSON object with "ids" and "status"'
+        }, status=400)
+
+    status = data.get('status')
+    if status not in ALLOWED_SOURCES:
+        return JsonResponse({
+            'error': f'status must be one of: {", ".join(ALLOWED_SOURCES)}'
+        }, status=400)
+    ids = data.get('ids')
+    if (not isinstance(ids, list) or not ids
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)):
+        return JsonResponse({
+            'error': 'ids must be a non-empty list of appointment ids'
+        }, status=400)
+    if len(ids) > MAX_BULK_IDS:
+        return JsonResponse({
+            'error': f'At most {MAX_BULK_IDS} ids per request'
+        }, status=400)
+
+    updated, skipped = transition_ids(ids, status)
+    return JsonResponse({
+        'success': True,
+        'status': status,
+        'updated': len(updated),
+        'skipped': len(skipped),
+        'updated_ids': updated,
+        'skipped_ids': skipped
+    })
+
+@require_http_methods(["PATCH"])
+def appointment_status(request, appointment_id):
+    """Change one appointment's status if it is still at the given ``version`` (staff only)"""
+    if not request.user.is_staff:
+        return JsonResponse({
+            'error': 'Staff access required'
+        }, status=403)
+
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'error': 'Invalid JSON data'
+        }, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({
+            'error': 'Expected a JSON object with "status" and "version"'
+        }, status=400)
+
+    status = data.get('status')
+    if status not in ALLOWED_SOURCES:
+        return JsonResponse({
+            'error': f'status must be one of: {", ".join(ALLOWED_SOURCES)}'
+        }, status=400)
+    version = data.get('version')
+    if not isinstance(version, int) or isinstance(version, bool):
+        return JsonResponse({
+            'error': 'version is required'
+        }, status=400)
+
+    new_version = change_status(appointment_id, version, status)
+    if new_version is not None:
         return JsonResponse({
             'success': True,
-            'appointments': appointments_data
+            'id': appointment_id,
+            'status': status,
+            'version': new_version
         })
 
+    # The UPDATE matched nothing; only now read the row to say why
+    current = Appointment.objects.filter(id=appointment_id).values('status', 'version').first()
+    if current is None:
+        return JsonResponse({
+            'error': 'Appointment not found'
+        }, status=404)
+    if current['version'] != version:
+        error = 'Appointment was changed by someone else; reload it and try again'
+    else:
+        error = f'Cannot change a {current["status"]} appointment to {status}'
+    return JsonResponse({
+        'error': error,
+        **current
+    }, status=409)
+
+@require_http_methods(["POST"])
+def series_create(request):
+    """Book a recurring series: a booking plus ``frequency``, ``interval`` and
+    ``count`` or ``until`` (staff only)"""
+    if not request.user.is_staff:
+        return JsonResponse({
+            'error': 'Staff access required'
+        }, status=403)
+
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            raise BookingError('Expected a JSON object')
+        series = create_series(data)
+    except BookingError as e:
+        return JsonResponse({
+            'error': e.message
+        }, status=e.status)
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'error': 'Invalid JSON data'
+        }, status=400)
+
+    return json_response({
+        'success': True,
+        'series': series_data(series)
+    }, status=201)
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def waitlist_join(request):
+    """Wait for a cancelled slot from ``date_from`` to ``date_to``, optionally
+    between ``earliest_time`` and ``latest_time``"""
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            raise BookingError('Expected a JSON object')
+        entry = join_waitlist(parse_waitlist(data))
+    except BookingError as e:
+        return JsonResponse({
+            'error': e.message
+        }, status=e.status)
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'error': 'Invalid JSON data'
+        }, status=400)
+
+    return json_response({
+        'success': True,
+        'entry': entry_data(entry)
+    }, status=201)
+
+@require_http_methods(["POST"])
+def series_occurrence(request, series_id, day):
+    """Move, cancel or change the status of one occurrence (``date``,
+    ``time``, ``status``), storing it as an appointment (staff only)"""
+    if not request.user.is_staff:
+        return JsonResponse({
+            'error': 'Staff access required'
+        }, status=403)
+
+    try:
+        occurrence_date = parse_date(day, 'occurrence date')
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            raise BookingError('Expected a JSON object')
+        appointment = materialize_occurrence(series_id, occurrence_date, data)
+    except BookingError as e:
+        return JsonResponse({
+            'error': e.message
+        }, status=e.status)
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'error': 'Invalid JSON data'
+        }, status=400)
+    except ValueError as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
+
+    return json_response({
+        'success': True,
+        'appointment_id': appointment.id,
+        'data': appointment_data(appointment)
+    }, status=201)
+
+@require_GET
+def patient_lookup(request):
+    """Patients matching ``phone`` and/or ``email`` in any spelling (staff only)"""
+    if not request.user.is_staff:
+        return JsonResponse({
+            'error': 'Staff access required'
+        }, status=403)
+
+    phone = request.GET.get('phone')
+    email = request.GET.get('email')
+    if not phone and not email:
+        return JsonResponse({
+            'error': 'phone or email is required'
+        }, status=400)
+
+    patients = Patient.objects.all()
+    if phone:
+        phone = normalize_phone(phone)
+        if phone is None:
+            return JsonResponse({
+                'error': 'Invalid phone number'
+            }, status=400)
+        patients = patients.filter(phone=phone)
+    if email:
+        patients = patients.filter(email=normalize_email(email))
+    return json_response({
+        'success': True,
+        'patients': list(patients.order_by('id').values(*PATIENT_FIELDS))
+    })
+
+@require_GET
+def patient_history(request, patient_id):
+    """A patient's appointments, latest date first (staff only)"""
+    if not request.user.is_staff:
+        return JsonResponse({
+            'error': 'Staff access required'
+        }, status=403)
+
+    try:
+        limit = parse_limit(request.GET.get('limit'))
+    except ValueError as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
+
+    patient = Patient.objects.filter(id=patient_id).values(*PATIENT_FIELDS).first()
+    if patient is None:
+        return JsonResponse({
+            'error': 'Patient not found'
+        }, status=404)
+
+    # Served by appt_patient_date_idx; one extra row tells whether there are more
+    rows = list(appointment_values(
+        Appointment.objects.filter(patient_id=patient_id).order_by('-date', '-id')[:limit + 1]
+    ))
+    return json_response({
+        'success': True,
+        'patient': patient,
+        'appointments': appointment_rows(rows[:limit]),
+        'has_more': len(rows) > limit
+    })
+
+@require_GET
+def booking_status(request, tracking_id):
+    """Resolve a queued booking's tracking id"""
+    booking = QueuedBooking.objects.filter(tracking_id=tracking_id).first()
+    if booking is None:
+        return JsonResponse({
+            'error': 'Unknown tracking id'
+        }, status=404)
+
+    return JsonResponse({
+        'success': True,
+        'tracking_id': str(booking.tracking_id),
+        'status': booking.status,
+        'appointment_id': booking.appointment_id,
+        'error': booking.error or None
+    })
+
+
+@require_http_methods(["GET", "DELETE"])
+def listing_cache_stats(request):
+    """Listing cache hit/miss counters; DELETE resets them (staff only)"""
+    if not request.user.is_staff:
+        return JsonResponse({
+            'error': 'Staff access required'
+        }, status=403)
+    if request.method == 'DELETE':
+        reset_cache_stats()
+    return JsonResponse({
+        'success': True,
+        'cache': cache_stats()
+    })
+
+@require_GET
+def profile_list(request):
+    """Recent request profiles without their stacks, newest first (staff only)"""
+    if not request.user.is_staff:
+        return JsonResponse({
+            'error': 'Staff access required'
+        }, status=403)
+
+    store = get_profile_store()
+    view = request.GET.get('view')
+    profiles = []
+    for profile_id in store.ids():
+        profile = store.get(profile_id)
+        if profile is None or (view and profile['view'] != view):
+            continue
+        profile.pop('stacks')
+        profile['url'] = reverse('appointments:profile-detail', args=[profile_id])
+        profiles.append(profile)
+    return JsonResponse({
+        'success': True,
+        'profiles': profiles
+    })
+
+@require_GET
+def profile_detail(request, profile_id):
+    """Download one profile: collapsed stacks for flame graphs, or ``format=json`` (staff only)"""
+    if not request.user.is_staff:
+        return JsonResponse({
+            'error': 'Staff access required'
+        }, status=403)
+
+    profile = get_profile_store().get(profile_id)
+    if profile is None:
+        return JsonResponse({
+            'error': 'Unknown profile'
+        }, status=404)
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse(profile)
+    response = HttpResponse(collapsed_stacks(profile), content_type='text/plain; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{profile_id}.folded"'
+    return response
+
 # Function-based view alternative (if needed)
 @csrf_exempt
 @require_http_methods(["POST"])
+@idempotent
 def create_appointment(request):
     """Alternative function-based view for creating appointments"""
     try:
         data = json.loads(request.body)
         
-        # Create appointment
-        appointment = Appointment.objects.create(
-            name=data['name'],
-            email=data['email'],
-            phone=data['phone'],
-            date=data['date'],
-            time=data['time'],
-            message=data.get('message', '')
-        )
+        # Same validation as AppointmentCreateView: clinic hours, phone, holds
+        if queued_mode():
+            return queued_booking_response(validate_booking(data))
+        appointment = create_booking(data)
         
         return JsonResponse({
             'success': True,
             'appointment_id': appointment.id
         }, status=201)
         
+    except BookingError as e:
+        return JsonResponse({
+            'error': e.message
+        }, status=e.status)
     except Exception as e:
         return JsonResponse({
             'error': str(e)
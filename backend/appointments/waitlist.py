@@ -0,0 +1,133 @@
+"""Waitlist for slots freed by cancellations.
+
+A patient joins with a date range (up to MAX_WAITLIST_DAYS) and a window of
+start times. Besides the ``WaitlistEntry`` row, every day the entry covers
+gets a ``WaitlistDay`` row carrying the window: an interval index cut into
+days, kept only while the entry waits. The queue for a freed slot is the
+index range for its date in entry order, so the matcher reads forward from
+the longest waiting entry and stops at the first window that fits, however
+long the waitlist is.
+
+Cancellations, status changes, moves and deletes publish the slots they
+free once committed (signals.slots_freed). ``offer_slots`` holds each slot
+for APPOINTMENTS_WAITLIST_OFFER_MINUTES (holds.py), claims the first
+matching entry with a conditional UPDATE, so two processes never offer one
+entry twice, and queues the offer in the outbox with the hold token to
+book with. An offer that is not taken up simply expires with its hold,
+and the slot is open to everyone again.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .availability import slot_taken
+from .holds import place_hold, release_hold
+from .models import OutboxMessage, WaitlistDay, WaitlistEntry
+from .patients import link_patients
+from .slots import format_minute
+
+# Longest date range one entry may wait for
+MAX_WAITLIST_DAYS = 31
+WAITLIST_OFFER = 'waitlist_offer'
+# Entries read per index probe; more only when all of them were just claimed
+CANDIDATE_BATCH = 10
+# One entry in API responses
+ENTRY_FIELDS = ['id', 'name', 'email', 'phone', 'date_from', 'date_to', 'status', 'created_at']
+
+
+def entry_days(entry):
+    """Unsaved WaitlistDay rows of a waiting ``entry``"""
+    return [
+        WaitlistDay(
+            entry_id=entry.id, date=entry.date_from + timedelta(days=offset),
+            earliest_minute=entry.earliest_minute, latest_minute=entry.latest_minute,
+        )
+        for offset in range((entry.date_to - entry.date_from).days + 1)
+    ]
+
+
+def index_entries(entries):
+    """Rebuild the day rows of ``entries``: one per day while waiting, none otherwise"""
+    WaitlistDay.objects.filter(entry__in=[entry.id for entry in entries]).delete()
+    WaitlistDay.objects.bulk_create(
+        [day for entry in entries if entry.status == 'waiting' for day in entry_days(entry)]
+    )
+
+
+def join_waitlist(fields):
+    """Add a patient to the waitlist with validated ``fields``; the post_save
+    signal indexes the entry's days"""
+    with transaction.atomic():
+        entry = WaitlistEntry(**fields)
+        link_patients([entry])
+        entry.save()
+    return entry
+
+
+def entry_data(entry):
+    return {
+        **{field: getattr(entry, field) for field in ENTRY_FIELDS},
+        'earliest_time': format_minute(entry.earliest_minute),
+        'latest_time': format_minute(entry.latest_minute),
+    }
+
+
+def offer_text(entry, day, minute, minutes):
+    return (
+        f'Hello {entry.name}, a slot on {day:%A %d %B %Y} at {format_minute(minute)} has opened up. '
+        f'It is held for you for {minutes} minutes; book it with hold {entry.hold}.'
+    )
+
+
+def _claim(day, minute, hold):
+    """Offer the slot to the first waiting entry whose window fits; returns it or None"""
+    queue = (
+        WaitlistDay.objects
+        .filter(date=day, earliest_minute__lte=minute, latest_minute__gte=minute)
+        .order_by('entry_id').values_list('entry_id', flat=True)
+    )
+    now = timezone.now()
+    while True:
+        candidates = list(queue[:CANDIDATE_BATCH])
+        if not candidates:
+            return None
+        for entry_id in candidates:
+            # Only the first of two matchers reaching an entry updates it;
+            # either way the entry no longer waits and leaves the index
+            claimed = WaitlistEntry.objects.filter(id=entry_id, status='waiting').update(
+                status='offered', offered_date=day, offered_minute=minute, hold=hold, offered_at=now,
+            )
+            WaitlistDay.objects.filter(entry_id=entry_id).delete()
+            if claimed:
+                return WaitlistEntry.objects.get(id=entry_id)
+
+
+def offer_slot(day, minute):
+    """Offer one freed slot to the longest waiting match; returns the entry offered it"""
+    now = timezone.localtime()
+    if (day, minute) <= (now.date(), now.hour * 60 + now.minute) or slot_taken(day, minute):
+        return None
+    minutes = settings.APPOINTMENTS_WAITLIST_OFFER_MINUTES
+    hold = place_hold(day, minute, minutes)
+    if hold is None:
+        return None
+    with transaction.atomic():
+        entry = _claim(day, minute, hold[0])
+        if entry is not None:
+            text = offer_text(entry, day, minute, minutes)
+            OutboxMessage.objects.bulk_create([
+                OutboxMessage(
+                    kind=WAITLIST_OFFER, channel=channel,
+                    recipient=entry.email if channel == 'email' else entry.phone,
+                    subject='An appointment slot is free', body=text,
+                )
+                for channel in settings.APPOINTMENTS_CONFIRMATION_CHANNELS
+            ])
+    if entry is None:
+        release_hold(hold[0])
+    return entry
+
+
+def offer_slots(slots):
+    """``offer_slot`` for each (date, start minute) of ``slots`` in time order"""
+    return [entry for entry in (offer_slot(day, minute) for day, minute in sorted(slots)) if entry]
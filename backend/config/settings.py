@@ -12,7 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
-from decouple import Config, RepositoryEnv
+import sys
+from decouple import Config, Csv, RepositoryEnv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -55,6 +56,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Last, so that profiles cover just the view
+    'appointments.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -80,17 +83,138 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': config('DB_NAME', default='doctor_db'),
-        'USER': config('DB_USER',),
-        'PASSWORD': config('DB_PASSWORD',),
-        'HOST': config('DB_HOST', default='localhost'),
-        'PORT': config('DB_PORT', default='5432'),
+DB_ENGINE = config('DB_ENGINE', default='postgresql')
+
+if DB_ENGINE == 'sqlite':
+    # Lightweight fallback for tests and local benchmarks
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='doctor_db'),
+            'USER': config('DB_USER',),
+            'PASSWORD': config('DB_PASSWORD',),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            # psycopg 3 pool shared by the threads of each worker process;
+            # CONN_MAX_AGE must stay 0 when pooling
+            'OPTIONS': {
+                'pool': {
+                    'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+                    'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+                    'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+                },
+            },
+        }
     }
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+APPOINTMENTS_CACHE_URL = config('APPOINTMENTS_CACHE_URL', default='')
+APPOINTMENTS_HOLD_CACHE_URL = config('APPOINTMENTS_HOLD_CACHE_URL', default='')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Appointment listing responses; point APPOINTMENTS_CACHE_URL at Redis
+    # (redis://host:6379/0, needs the redis package) to share it between
+    # worker processes
+    'appointments': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': APPOINTMENTS_CACHE_URL,
+    } if APPOINTMENTS_CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'appointments',
+    },
+    # Slot holds, apart from the listing churn above: an evicted hold lets a
+    # second patient book the held slot. Local memory never culls them; a
+    # Redis at APPOINTMENTS_HOLD_CACHE_URL must not evict either
+    # (maxmemory-policy noeviction)
+    'appointment_holds': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': APPOINTMENTS_HOLD_CACHE_URL,
+    } if APPOINTMENTS_HOLD_CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'appointment_holds',
+        'OPTIONS': {'MAX_ENTRIES': sys.maxsize},
+    },
 }
 
+APPOINTMENTS_CACHE = 'appointments'
+APPOINTMENTS_HOLD_CACHE = 'appointment_holds'
+APPOINTMENTS_CACHE_TIMEOUT = config('APPOINTMENTS_CACHE_TIMEOUT', default=300, cast=int)
+
+# GET /api/appointments/ without date_from or date_to lists appointments dated
+# from this many days ago onward, so on PostgreSQL it reads recent and future
+# partitions only
+APPOINTMENTS_LISTING_DAYS = config('APPOINTMENTS_LISTING_DAYS', default=90, cast=int)
+
+# Idempotency-Key handling for the create endpoints: 'memory' (one worker
+# process) or 'database' (shared by every process)
+APPOINTMENTS_IDEMPOTENCY_STORE = config('APPOINTMENTS_IDEMPOTENCY_STORE', default='memory')
+APPOINTMENTS_IDEMPOTENCY_TTL = config('APPOINTMENTS_IDEMPOTENCY_TTL', default=24 * 60 * 60, cast=int)
+APPOINTMENTS_IDEMPOTENCY_MAX_KEYS = config('APPOINTMENTS_IDEMPOTENCY_MAX_KEYS', default=10_000, cast=int)
+
+# 'direct' inserts bookings in the request; 'queued' stages them for
+# manage.py flush_booking_queue and answers 202 with a tracking id
+APPOINTMENTS_INTAKE_MODE = config('APPOINTMENTS_INTAKE_MODE', default='direct')
+# Queued bookings allowed before the create views answer 503
+APPOINTMENTS_INTAKE_MAX_QUEUE = config('APPOINTMENTS_INTAKE_MAX_QUEUE', default=50_000, cast=int)
+
+# Request profiling: fraction of requests to profile (0 = only requests
+# with a signed X-Profile-Token header), sampling interval, and where the
+# newest APPOINTMENTS_PROFILE_MAX profiles are kept
+APPOINTMENTS_PROFILE_RATE = config('APPOINTMENTS_PROFILE_RATE', default=0.0, cast=float)
+APPOINTMENTS_PROFILE_INTERVAL_MS = config('APPOINTMENTS_PROFILE_INTERVAL_MS', default=5, cast=int)
+APPOINTMENTS_PROFILE_DIR = config('APPOINTMENTS_PROFILE_DIR', default=str(BASE_DIR / 'profiles'))
+APPOINTMENTS_PROFILE_MAX = config('APPOINTMENTS_PROFILE_MAX', default=200, cast=int)
+
+# Appointment reminders, sent by manage.py send_reminders: hours before the
+# slot, and the sender ('console', 'file', 'email' or 'sms'). The file
+# sender appends to APPOINTMENTS_REMINDER_FILE. A failed reminder is
+# retried after APPOINTMENTS_REMINDER_RETRY_SECONDS.
+APPOINTMENTS_REMINDER_HOURS = config('APPOINTMENTS_REMINDER_HOURS', default='24,2', cast=Csv(int))
+APPOINTMENTS_REMINDER_SENDER = config('APPOINTMENTS_REMINDER_SENDER', default='console')
+APPOINTMENTS_REMINDER_FILE = config('APPOINTMENTS_REMINDER_FILE', default=str(BASE_DIR / 'reminders.ndjson'))
+APPOINTMENTS_REMINDER_RETRY_SECONDS = config('APPOINTMENTS_REMINDER_RETRY_SECONDS', default=300, cast=int)
+
+# Booking confirmations go through the outbox (manage.py deliver_outbox) on
+# these channels. A failed message is retried with exponential backoff
+# starting at APPOINTMENTS_OUTBOX_RETRY_SECONDS and marked failed after
+# APPOINTMENTS_OUTBOX_MAX_ATTEMPTS attempts.
+APPOINTMENTS_CONFIRMATION_CHANNELS = config('APPOINTMENTS_CONFIRMATION_CHANNELS', default='email', cast=Csv())
+APPOINTMENTS_OUTBOX_RETRY_SECONDS = config('APPOINTMENTS_OUTBOX_RETRY_SECONDS', default=30, cast=int)
+APPOINTMENTS_OUTBOX_MAX_ATTEMPTS = config('APPOINTMENTS_OUTBOX_MAX_ATTEMPTS', default=8, cast=int)
+
+# Email and SMS delivery. The console backend prints emails; set
+# EMAIL_BACKEND=django.core.mail.backends.smtp.EmailBackend (and EMAIL_HOST
+# etc.) to send them. SMS is POSTed as JSON to APPOINTMENTS_SMS_URL.
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='appointments@localhost')
+APPOINTMENTS_SMS_URL = config('APPOINTMENTS_SMS_URL', default='')
+
+# Country code given to 10-digit national phone numbers when bookings are
+# matched to patients (normalized to E.164)
+APPOINTMENTS_DEFAULT_COUNTRY_CODE = config('APPOINTMENTS_DEFAULT_COUNTRY_CODE', default='91')
+
+# How long POST /api/appointments/holds/ keeps a slot for one patient. Holds
+# live in APPOINTMENTS_HOLD_CACHE, which must be Redis when several processes
+# serve the API
+APPOINTMENTS_HOLD_MINUTES = config('APPOINTMENTS_HOLD_MINUTES', default=5, cast=int)
+
+# How long a slot freed by a cancellation stays held for the waitlisted
+# patient it is offered to
+APPOINTMENTS_WAITLIST_OFFER_MINUTES = config('APPOINTMENTS_WAITLIST_OFFER_MINUTES', default=30, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -157,4 +281,5 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',
 ]